@@ -1,30 +1,39 @@
 import sys
+import uuid
+import argparse
 from typing import Dict, Any
-from langgraph.graph import StateGraph, END
-from utils.groq_client import GroqClient
+from shared import load_cli_env
 from utils.conversation_logger import ConversationLogger
-from agents.main_doctor import MainDoctor
-from agents.cardiologist import Cardiologist
-from agents.neurologist import Neurologist
-from agents.dermatologist import Dermatologist
-from agents.orthopedist import Orthopedist
-from agents.endocrinologist import Endocrinologist
+from utils.emergency import detect_emergency
+from streaming import BackgroundLoop, TokenPrinter
 
 class MedicalAIBot:
-    def __init__(self):
+    def __init__(self, verbose: bool = False, fast_path: bool = False):
+        # Verbose mode reports time to first token and total time for each turn
+        self.verbose = verbose
+        # Fast path: one specialist call gives the assessment and the patient summary
+        self.fast_path = fast_path
         # Initialize components
         try:
+            # Heavy imports (langchain, langchain_groq) are deferred until the
+            # bot is built so the welcome banner appears immediately
+            load_cli_env()
+            from utils.groq_client import GroqClient
+            from agents.main_doctor import MainDoctor
+            from agents.specialists import build_specialists
+            from consultation_graph import ConsultationGraph, create_checkpointer
+
             self.groq_client = GroqClient()
             self.llm = self.groq_client.get_llm()
             self.logger = ConversationLogger()
             
             # Initialize all doctor agents
             self.main_doctor = MainDoctor(self.llm, self.logger)
-            self.cardiologist = Cardiologist(self.llm, self.logger)
-            self.neurologist = Neurologist(self.llm, self.logger)
-            self.dermatologist = Dermatologist(self.llm, self.logger)
-            self.orthopedist = Orthopedist(self.llm, self.logger)
-            self.endocrinologist = Endocrinologist(self.llm, self.logger)
+            self.specialists = build_specialists(self.llm, self.logger)
+            self.graph = ConsultationGraph(self.main_doctor, self.specialists, create_checkpointer())
+            
+            # Replies stream from an event loop while prompts stay on this thread
+            self.loop = BackgroundLoop()
             
         except Exception as e:
             print(f"❌ Failed to initialize Medical AI Bot: {str(e)}")
@@ -34,21 +43,23 @@ class MedicalAIBot:
     def run_consultation(self, first_input: str):
         """Run an interactive medical consultation with follow-up questions"""
         try:
-            # Initialize conversation memory and state
-            memory = []  # Stores full conversation for context
-            state = {"question_count": 0}  # Tracks consultation state
+            # Consultation state; the graph returns the updated copy after each turn
+            session_id = str(uuid.uuid4())
+            state = {"stage": "history_taking", "question_count": 0}
             
             patient_input = first_input
             
             # Interactive consultation loop
             while True:
                 # Main doctor processes input and either asks follow-up or triages
-                result = self.main_doctor.ask_or_triage(patient_input, memory, state)
+                self.logger.log_patient_message(patient_input)
+                self._check_emergency(patient_input, state)
+                state = self._run_turn(session_id, patient_input, state)
                 
                 # Check if patient has been triaged to specialist
-                if result["triaged"]:
+                if state["stage"] in ("specialist_handoff", "specialist_consultation"):
                     # Get specialist details
-                    specialist_name = state["next_agent"]
+                    specialist_name = state.get("specialist_selected") or ""
                     clinical_summary = state["clinical_summary"]
                     
                     # Inform patient about specialist referral
@@ -58,41 +69,24 @@ class MedicalAIBot:
                     print("Please wait while I transfer your case...")
                     print("=" * 60)
                     
-                    # Route to appropriate specialist
-                    specialist_agents = {
-                        "cardiologist": self.cardiologist,
-                        "neurologist": self.neurologist,
-                        "dermatologist": self.dermatologist,
-                        "orthopedist": self.orthopedist,
-                        "endocrinologist": self.endocrinologist
-                    }
-                    
-                    # Get specialist consultation
-                    specialist_agent = specialist_agents[specialist_name]
-                    specialist_state = {
-                        "consultation_request": clinical_summary,
-                        "specialist_response": ""
-                    }
-                    
-                    # Run specialist consultation
-                    result_state = specialist_agent.consult(clinical_summary, specialist_state)
-                    
-                    # Provide final summary from main doctor
-                    state["specialist_response"] = result_state["specialist_response"]
-                    final_summary = self.main_doctor.provide_final_summary(state)
+                    # Same graph step as the server's handoff turn: the referred specialists
+                    # in parallel, then the final summary alongside extraction. The fast
+                    # path already consulted in the turn that made the referral.
+                    if state["stage"] == "specialist_handoff":
+                        state = self._run_turn(session_id, None, state, with_summary=True)
                     
                     # Save conversation log
                     self.logger.save_session()
                     
                     return {
                         "clinical_summary": clinical_summary,
-                        "specialist_response": result_state["specialist_response"],
-                        "final_summary": final_summary,
+                        "specialist_response": state.get("specialist_response"),
+                        "final_summary": state.get("final_summary"),
                         "specialist_consulted": specialist_name
                     }
                 
                 # Continue with follow-up questions
-                follow_up_question = result["follow_up"]
+                follow_up_question = state["follow_up"]
                 
                 # Safety check for question limit
                 if state.get("question_count", 0) >= self.main_doctor.MAX_QUESTIONS:
@@ -101,8 +95,9 @@ class MedicalAIBot:
                     patient_input = "Please proceed with your assessment based on the information provided."
                     continue
                 
-                # Ask follow-up question to patient
-                print(f"\n🩺 Dr. Chen: {follow_up_question}")
+                # Ask follow-up question to patient, unless it is the reply just streamed
+                if follow_up_question != state["doctor_response"]:
+                    print(f"\n🩺 Dr. Chen: {follow_up_question}")
                 patient_input = input("🤒 Patient: ").strip()
                 
                 if not patient_input:
@@ -123,6 +118,28 @@ class MedicalAIBot:
             self.logger.log_message("System", error_msg, "error")
             print(f"\n❌ {error_msg}")
             return {"error": error_msg}
+    
+    def _check_emergency(self, patient_input: str, state: dict):
+        """Print the emergency-care template before any LLM call; the consultation then carries on"""
+        emergency = detect_emergency(patient_input, state.get("emergency_alerts", ()))
+        if emergency:
+            state["emergency_alerts"] = state.get("emergency_alerts", []) + [emergency.category]
+            self.logger.log_message("System", emergency.message, "emergency", echo=False)
+            print(f"\n{emergency.message}")
+            print("=" * 60)
+    
+    def _run_turn(self, session_id: str, message, state: dict, with_summary: bool = False):
+        """Run one graph turn on the event loop, streaming replies to the terminal.
+        
+        Ctrl-C cancels the requests in flight and raises KeyboardInterrupt here.
+        """
+        printer = TokenPrinter(self.verbose)
+        try:
+            return self.loop.run(self.graph.arun_turn(
+                session_id, message, state, self.logger, with_summary, printer.on_token, self.fast_path
+            ))
+        finally:
+            printer.finish()
 
 def print_welcome():
     """Print welcome message"""
@@ -147,12 +164,19 @@ def print_welcome():
     print("   In emergencies, call your local emergency services immediately.")
     print("="*80)
 
-def main():
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Interactive medical consultation")
+    parser.add_argument("--verbose", "-v", action="store_true",
+                        help="Report time to first token and total time for each turn")
+    parser.add_argument("--fast", action="store_true",
+                        help="Merge the specialist assessment and final summary into one call")
+    args = parser.parse_args(argv)
+    
     print_welcome()
     
     # Initialize the bot
     print("\n🔧 Initializing Interactive Medical AI Bot...")
-    bot = MedicalAIBot()
+    bot = MedicalAIBot(verbose=args.verbose, fast_path=args.fast)
     print("✅ System ready for consultation!")
     
     while True:
@@ -196,7 +220,7 @@ def main():
                 print("\n" + "="*80)
                 print("✅ CONSULTATION COMPLETED!")
                 print(f"🏥 Specialist Consulted: {result.get('specialist_consulted', 'N/A').replace('_', ' ').title()}")
-                print("📝 Complete consultation saved to 'conversation_log.json'")
+                print("📝 Complete consultation saved to 'conversation_logs/'")
                 print("="*80)
             
             # Ask if user wants another consultation
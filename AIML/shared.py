@@ -0,0 +1,19 @@
+"""The CLI runs the same agents and utilities as the server.
+
+They live in ../Doctor; importing this module puts that directory on
+sys.path so `agents` and `utils` resolve to the shared implementation.
+"""
+import os
+import sys
+
+AIML_DIR = os.path.dirname(os.path.abspath(__file__))
+DOCTOR_DIR = os.path.join(os.path.dirname(AIML_DIR), "Doctor")
+if DOCTOR_DIR not in sys.path:
+    sys.path.insert(0, DOCTOR_DIR)
+
+
+def load_cli_env():
+    """Load AIML/.env; the shared modules would otherwise only look next to the server"""
+    from dotenv import load_dotenv
+
+    load_dotenv(os.path.join(AIML_DIR, ".env"))
@@ -1,6 +1,6 @@
 import sys
 import os
-from utils.groq_client import GroqClient
+import importlib.util
 
 
 def check_dependencies():
@@ -11,14 +11,14 @@ def check_dependencies():
         "langgraph",
         "dotenv",
         "colorama",
+        "httpx",
     ]
 
     missing_packages = []
 
     for package in required_packages:
-        try:
-            __import__(package)
-        except ImportError:
+        # find_spec locates the package without executing it
+        if importlib.util.find_spec(package) is None:
             if package == "dotenv":
                 missing_packages.append("python-dotenv")
             else:
@@ -61,6 +61,11 @@ def check_env_file():
 def test_groq_connection():
     """Test connection to Groq API"""
     try:
+        from shared import load_cli_env
+
+        load_cli_env()
+        from utils.groq_client import GroqClient
+
         client = GroqClient()
         success, message = client.test_connection()
 
@@ -0,0 +1,107 @@
+"""Streaming support for the interactive CLI.
+
+BackgroundLoop keeps one asyncio loop on a daemon thread so the blocking
+input() prompts stay on the main thread, where Ctrl-C is delivered, while
+every LLM request of a turn runs on the loop. TokenPrinter writes each
+agent's reply to the terminal as it is generated.
+"""
+import time
+import asyncio
+import threading
+
+from utils.conversation_logger import format_agent_header
+
+
+class BackgroundLoop:
+    """An asyncio event loop on a daemon thread, driven from blocking code"""
+
+    def __init__(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="cli-event-loop", daemon=True)
+        self._thread.start()
+
+    def run(self, coro, cancel_timeout: float = 5.0):
+        """Run a coroutine on the loop and wait for its result.
+
+        Ctrl-C while waiting cancels the coroutine, which aborts its HTTP
+        requests, and re-raises KeyboardInterrupt once it has unwound.
+        """
+        unwound = threading.Event()
+
+        async def tracked():
+            try:
+                return await coro
+            finally:
+                unwound.set()
+
+        future = asyncio.run_coroutine_threadsafe(tracked(), self.loop)
+        try:
+            return future.result()
+        except KeyboardInterrupt:
+            future.cancel()
+            unwound.wait(cancel_timeout)
+            raise
+
+
+class TokenPrinter:
+    """Prints streamed replies for one turn and times them.
+
+    Only one agent streams live at a time; text from agents running in
+    parallel with it is buffered and printed when the live one finishes.
+    All callbacks arrive on the event loop thread.
+    """
+
+    def __init__(self, verbose: bool = False):
+        self.verbose = verbose
+        self.start = time.perf_counter()
+        self.first_token = None
+        self._live = None
+        self._buffered = {}  # agent -> chunks not yet printed
+        self._done = set()
+
+    def on_token(self, agent_name: str, text):
+        if text is None:
+            self._finish_agent(agent_name)
+            return
+        if self.first_token is None:
+            self.first_token = time.perf_counter()
+        if self._live is None:
+            self._go_live(agent_name)
+        if agent_name == self._live:
+            print(text, end="", flush=True)
+        else:
+            self._buffered.setdefault(agent_name, []).append(text)
+
+    def _go_live(self, agent_name: str):
+        self._live = agent_name
+        print(format_agent_header(agent_name))
+        print("".join(self._buffered.pop(agent_name, [])), end="", flush=True)
+
+    def _finish_agent(self, agent_name: str):
+        if agent_name != self._live:
+            self._done.add(agent_name)
+            return
+        print()
+        print("-" * 80)
+        self._live = None
+        # Catch up on agents that streamed meanwhile; the first still running goes live
+        for other in list(self._buffered):
+            self._go_live(other)
+            if other not in self._done:
+                return
+            self._finish_agent(other)
+
+    def finish(self):
+        """Flush anything left (e.g. after a cancelled turn) and, in verbose mode, report timings"""
+        if self._live is not None:
+            print()
+            self._live = None
+        for agent_name, chunks in self._buffered.items():
+            print(format_agent_header(agent_name))
+            print("".join(chunks))
+        self._buffered.clear()
+
+        if self.verbose:
+            total = time.perf_counter() - self.start
+            ttft = f"{self.first_token - self.start:.2f}s" if self.first_token is not None else "n/a"
+            print(f"⏱️  first token {ttft} · total {total:.2f}s")
@@ -65,6 +65,11 @@ const tempConversationSchema = new mongoose.Schema(
       type: Boolean,
       default: true,
     },
+    // Set after an emergency reply until the consultation turn running behind it has been fetched
+    awaitingPendingReply: {
+      type: Boolean,
+      default: false,
+    },
     expiresAt: {
       type: Date,
       default: Date.now,
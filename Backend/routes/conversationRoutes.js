@@ -8,6 +8,36 @@ const { v4: uuidv4 } = require('uuid');
 
 const router = express.Router();
 
+// A client's Idempotency-Key, scoped to its user so keys from different users never collide
+const idempotencyKey = (req) => {
+    const key = req.get('Idempotency-Key');
+    return key ? `${req.user._id}:${key}` : undefined;
+};
+
+// Chat message for a Flask consultation reply
+const botMessageFor = (data) => {
+    const botMessage = {
+        role: data.consultation_stage === 'specialist_consultation' ? 'specialist' : 'doctor',
+        content: data.doctor_response,
+        timestamp: new Date()
+    };
+
+    if (data.specialist_name) {
+        botMessage.agentName = data.specialist_name;
+        botMessage.agentSpecialty = data.specialist_name.split('(')[1]?.replace(')', '') || 'Specialist';
+    } else {
+        botMessage.agentName = 'Dr. Sarah Chen';
+        botMessage.agentSpecialty = 'Primary Care Physician';
+    }
+    return botMessage;
+};
+
+// Emergency fields of a Flask reply; the consultation's own reply is then fetched from /pending
+const emergencyFields = (data) => data.emergency ? {
+    emergency: data.emergency,
+    consultationPending: data.consultation_pending
+} : {};
+
 // Start new medical consultation
 router.post('/start',
     auth,
@@ -25,7 +55,7 @@ router.post('/start',
             const sessionId = uuidv4();
 
             // Call Flask service to start consultation
-            const flaskResponse = await flaskService.startConsultation(message);
+            const flaskResponse = await flaskService.startConsultation(message, idempotencyKey(req));
 
             if (!flaskResponse.success) {
                 return res.status(500).json({
@@ -53,7 +83,8 @@ router.post('/start',
                         agentSpecialty: 'Primary Care Physician'
                     }
                 ],
-                currentStage: flaskResponse.data.consultation_stage || 'history_taking'
+                currentStage: flaskResponse.data.consultation_stage || 'history_taking',
+                awaitingPendingReply: Boolean(flaskResponse.data.consultation_pending)
             });
 
             await tempConversation.save();
@@ -68,7 +99,8 @@ router.post('/start',
                     doctorName: flaskResponse.data.doctor_name,
                     isQuestion: flaskResponse.data.is_question,
                     questionCount: flaskResponse.data.question_count,
-                    maxQuestions: flaskResponse.data.max_questions
+                    maxQuestions: flaskResponse.data.max_questions,
+                    ...emergencyFields(flaskResponse.data)
                 }
             });
 
@@ -107,7 +139,9 @@ router.post('/continue/:sessionId',
             }
 
             // Send message to Flask service
-            const flaskResponse = await flaskService.sendMessage(tempConversation.flaskSessionId, message);
+            const flaskResponse = await flaskService.sendMessage(
+                tempConversation.flaskSessionId, message, idempotencyKey(req)
+            );
 
             if (!flaskResponse.success) {
                 return res.status(500).json({
@@ -124,21 +158,11 @@ router.post('/continue/:sessionId',
             });
 
             // Add bot response
-            const botMessage = {
-                role: flaskResponse.data.consultation_stage === 'specialist_consultation' ? 'specialist' : 'doctor',
-                content: flaskResponse.data.doctor_response,
-                timestamp: new Date()
-            };
-
-            if (flaskResponse.data.specialist_name) {
-                botMessage.agentName = flaskResponse.data.specialist_name;
-                botMessage.agentSpecialty = flaskResponse.data.specialist_name.split('(')[1]?.replace(')', '') || 'Specialist';
-            } else {
-                botMessage.agentName = 'Dr. Sarah Chen';
-                botMessage.agentSpecialty = 'Primary Care Physician';
-            }
-
+            const botMessage = botMessageFor(flaskResponse.data);
             tempConversation.messages.push(botMessage);
+            if (flaskResponse.data.consultation_pending) {
+                tempConversation.awaitingPendingReply = true;
+            }
 
             // Update conversation stage and info
             tempConversation.currentStage = flaskResponse.data.consultation_stage;
@@ -166,7 +190,8 @@ router.post('/continue/:sessionId',
                 conversation: {
                     stage: flaskResponse.data.consultation_stage,
                     doctorResponse: flaskResponse.data.doctor_response,
-                    isQuestion: flaskResponse.data.is_question
+                    isQuestion: flaskResponse.data.is_question,
+                    ...emergencyFields(flaskResponse.data)
                 }
             };
 
@@ -190,6 +215,63 @@ router.post('/continue/:sessionId',
     }
 );
 
+// Consultation reply that was still running when an emergency reply was sent; poll until pending is false
+router.get('/pending/:sessionId', auth, async (req, res) => {
+    try {
+        const { sessionId } = req.params;
+
+        const tempConversation = await TempConversation.findOne({
+            sessionId: sessionId,
+            userId: req.user._id,
+            isActive: true
+        });
+
+        if (!tempConversation) {
+            return res.status(404).json({ message: 'Conversation session not found or expired' });
+        }
+
+        if (!tempConversation.awaitingPendingReply) {
+            return res.json({ pending: false, conversation: null });
+        }
+
+        const flaskResponse = await flaskService.getSessionStatus(tempConversation.flaskSessionId);
+
+        if (!flaskResponse.success) {
+            return res.status(500).json({
+                message: 'Failed to get consultation status from medical bot',
+                error: flaskResponse.error
+            });
+        }
+
+        const { consultation_pending: pending, pending_response: reply } = flaskResponse.data;
+        if (pending) {
+            return res.json({ pending: true, conversation: null });
+        }
+
+        // Finished (or failed, with no reply): stored once, so later polls return nothing new
+        tempConversation.awaitingPendingReply = false;
+        if (reply) {
+            tempConversation.messages.push(botMessageFor(reply));
+            tempConversation.currentStage = reply.consultation_stage;
+        }
+        await tempConversation.save();
+
+        res.json({
+            pending: false,
+            conversation: reply ? {
+                stage: reply.consultation_stage,
+                doctorResponse: reply.doctor_response,
+                isQuestion: reply.is_question,
+                specialistName: reply.specialist_name
+            } : null
+        });
+
+    } catch (error) {
+        console.error('Get pending reply error:', error);
+        res.status(500).json({ message: 'Internal server error' });
+    }
+});
+
 // End consultation and save to user's medical history
 router.post('/end/:sessionId', auth, async (req, res) => {
     try {
@@ -1,24 +1,55 @@
 const axios = require('axios');
+const { v4: uuidv4 } = require('uuid');
+
+// Worth retrying: no response at all (network error, timeout), or the server was busy or cut the turn short
+const RETRYABLE_STATUSES = [502, 503, 504];
+const MAX_RETRY_AFTER_SECONDS = 10;
 
 class FlaskService {
   constructor() {
     this.baseURL = process.env.FLASK_SERVER_URL;
     this.timeout = parseInt(process.env.FLASK_API_TIMEOUT) || 30000;
+    const retries = parseInt(process.env.FLASK_API_RETRIES);
+    this.maxRetries = Number.isNaN(retries) ? 2 : retries;
     
     this.client = axios.create({
       baseURL: this.baseURL,
       timeout: this.timeout,
       headers: {
-        'Content-Type': 'application/json'
+        'Content-Type': 'application/json',
+        // Lets the Flask server stop LLM work once this client has given up
+        'X-Request-Timeout-Ms': String(this.timeout)
       }
     });
   }
 
-  async startConsultation(message) {
+  // Mutating calls carry one Idempotency-Key for the whole operation, retries included, so a
+  // retry is answered from the first attempt's result instead of advancing the consultation again
+  async postIdempotent(path, body, idempotencyKey) {
+    const config = { headers: { 'Idempotency-Key': idempotencyKey || uuidv4() } };
+    for (let attempt = 0; ; attempt++) {
+      try {
+        return await this.client.post(path, body, config);
+      } catch (error) {
+        const retryable = !error.response || RETRYABLE_STATUSES.includes(error.response.status);
+        if (!retryable || attempt >= this.maxRetries) {
+          throw error;
+        }
+        const retryAfter = parseInt(error.response?.headers?.['retry-after']);
+        const delay = Number.isNaN(retryAfter)
+          ? 500 * 2 ** attempt
+          : Math.min(retryAfter, MAX_RETRY_AFTER_SECONDS) * 1000;
+        console.warn(`Flask ${path} failed (${error.message}), retry ${attempt + 1} in ${delay} ms`);
+        await new Promise(resolve => setTimeout(resolve, delay));
+      }
+    }
+  }
+
+  async startConsultation(message, idempotencyKey) {
     try {
-      const response = await this.client.post('/api/start-consultation', {
+      const response = await this.postIdempotent('/api/start-consultation', {
         message: message
-      });
+      }, idempotencyKey);
       return { success: true, data: response.data };
     } catch (error) {
       console.error('Flask startConsultation error:', error.message);
@@ -29,12 +60,12 @@ class FlaskService {
     }
   }
 
-  async sendMessage(sessionId, message) {
+  async sendMessage(sessionId, message, idempotencyKey) {
     try {
-      const response = await this.client.post('/api/send-message', {
+      const response = await this.postIdempotent('/api/send-message', {
         session_id: sessionId,
         message: message
-      });
+      }, idempotencyKey);
       return { success: true, data: response.data };
     } catch (error) {
       console.error('Flask sendMessage error:', error.message);
@@ -1,61 +1,59 @@
-from langchain_core.messages import HumanMessage
-from langchain_core.tools import tool
-from typing import Literal
-
-
-@tool
-def consult_cardiologist(summary: str) -> str:
-    """Send the compiled clinical summary to the cardiologist."""
-    return f"HANDOFF_TO_CARDIOLOGIST: {summary}"
-
-
-@tool
-def consult_neurologist(summary: str) -> str:
-    """Send the compiled clinical summary to the neurologist."""
-    return f"HANDOFF_TO_NEUROLOGIST: {summary}"
-
-
-@tool
-def consult_dermatologist(summary: str) -> str:
-    """Send the compiled clinical summary to the dermatologist."""
-    return f"HANDOFF_TO_DERMATOLOGIST: {summary}"
-
-
-@tool
-def consult_orthopedist(summary: str) -> str:
-    """Send the compiled clinical summary to the orthopedist."""
-    return f"HANDOFF_TO_ORTHOPEDIST: {summary}"
-
-
-@tool
-def consult_endocrinologist(summary: str) -> str:
-    """Send the compiled clinical summary to the endocrinologist."""
-    return f"HANDOFF_TO_ENDOCRINOLOGIST: {summary}"
-
-
-class MainDoctor:
-    """Primary care physician that conducts interactive history taking before specialist referral."""
-
-    def __init__(self, llm, logger):
-        self.llm = llm
-        self.logger = logger
-        self.name = "Dr. Sarah Chen"
-        self.specialty = "Primary Care Physician & Medical Supervisor"
-        self.MAX_QUESTIONS = 5  # Maximum follow-up questions to ask
-
-        self.tools = [
-            consult_cardiologist,
-            consult_neurologist,
-            consult_dermatologist,
-            consult_orthopedist,
-            consult_endocrinologist,
-        ]
-
-        self.system_prompt = f"""You are {self.name}, an experienced Primary Care Physician conducting a medical consultation.
+import os
+
+from agents.specialists import REFERRAL_GUIDE, SPECIALISTS, TOOL_SCHEMAS, TOOL_TO_SPECIALIST
+from utils.metrics import metrics
+
+NAME = "Dr. Sarah Chen"
+MAX_QUESTIONS = 5  # Maximum follow-up questions to ask
+
+# Refer without further questions once the doctor's own triage confidence reaches this (above 1 disables)
+TRIAGE_CONFIDENCE_THRESHOLD = float(os.getenv("TRIAGE_CONFIDENCE_THRESHOLD", 0.85))
+
+# Facts the doctor reports as still missing, and the question asked when the reply carries no text
+KEY_FACTS = {
+    "onset": "When did your symptoms first start?",
+    "duration": "How long do the symptoms last, and are they constant or do they come and go?",
+    "severity": "On a scale of 1 to 10, how severe are your symptoms?",
+    "location": "Where exactly do you feel the symptoms?",
+}
+GENERIC_QUESTION = "Could you tell me more about your symptoms?"
+
+ASSESSMENT_TOOL = "triage_assessment"
+ASSESSMENT_SCHEMA = {
+    "type": "function",
+    "function": {
+        "name": ASSESSMENT_TOOL,
+        "description": "Report how ready you are to refer the patient. Call this with every reply.",
+        "parameters": {
+            "properties": {
+                "confidence": {
+                    "type": "number",
+                    "description": "0 to 1: how sure you are which specialist the patient needs",
+                },
+                "missing_facts": {
+                    "type": "array",
+                    "items": {"type": "string", "enum": list(KEY_FACTS)},
+                    "description": "Key facts you still do not know",
+                },
+                "specialist": {"type": "string", "enum": list(SPECIALISTS)},
+                "summary": {"type": "string", "description": "Structured clinical summary so far"},
+            },
+            "required": ["confidence", "missing_facts", "specialist", "summary"],
+            "type": "object",
+        },
+    },
+}
+
+REFERRAL_MESSAGE = (
+    "Thank you for providing those details. Based on your symptoms, I believe you should see our "
+    "{display_name}. Let me connect you with them now."
+)
+
+SYSTEM_PROMPT = f"""You are {NAME}, an experienced Primary Care Physician conducting a medical consultation.
 
 Your role is to:
 1. Take a focused but thorough medical history through targeted questions
-2. Ask relevant follow-up questions based on patient responses (maximum {self.MAX_QUESTIONS} questions)
+2. Ask relevant follow-up questions based on patient responses (maximum {MAX_QUESTIONS} questions)
 3. Once you have sufficient information, create a structured clinical summary
 4. Select the most appropriate specialist and refer the patient
 5. Inform the patient about the referral politely
@@ -68,11 +66,7 @@ IMPORTANT GUIDELINES:
 - Always emphasize this is educational only and recommend real medical consultation
 
 Available specialists:
-- Cardiologist: Heart and cardiovascular issues (chest pain, palpitations, shortness of breath)
-- Neurologist: Brain, nerves, headaches, seizures, weakness, numbness
-- Dermatologist: Skin, hair, nail conditions, rashes, lesions
-- Orthopedist: Bones, joints, muscles, fractures, sprains, back pain
-- Endocrinologist: Diabetes, thyroid, hormones, weight issues, fatigue
+{REFERRAL_GUIDE}
 
 When you have enough information, say:
 "Thank you for providing those details. Based on your symptoms, I believe you should see our [SPECIALIST NAME]. Let me connect you with them now."
@@ -83,9 +77,29 @@ OUTPUT FORMAT:
 - Either ask ONE follow-up question
 - OR provide the referral statement and call the specialist tool
 
+TRIAGE ASSESSMENT:
+With every reply, also call {ASSESSMENT_TOOL} with your confidence (0 to 1) that you know
+which specialist the patient needs, the key facts still missing (onset, duration, severity,
+location), the specialist you would choose now and a clinical summary of what you know.
+
 Remember: This is for educational purposes only. Always advise seeking real medical care."""
 
-    def ask_or_triage(self, patient_message: str, memory: list, state: dict):
+
+class MainDoctor:
+    """Primary care physician that conducts interactive history taking before specialist referral."""
+
+    def __init__(self, llm, logger=None):
+        self.llm = llm
+        self.logger = logger
+        self.name = NAME
+        self.specialty = "Primary Care Physician & Medical Supervisor"
+        self.MAX_QUESTIONS = MAX_QUESTIONS
+        self.confidence_threshold = TRIAGE_CONFIDENCE_THRESHOLD
+        self.tools = TOOL_SCHEMAS + [ASSESSMENT_SCHEMA]
+
+        self.system_prompt = SYSTEM_PROMPT
+
+    def ask_or_triage(self, patient_message: str, memory: list, state: dict, logger=None):
         """
         Interactive consultation method that either asks follow-up questions or triages to specialist.
 
@@ -93,59 +107,93 @@ Remember: This is for educational purposes only. Always advise seeking real medi
             patient_message: Current patient input
             memory: Conversation history list
             state: Shared state dictionary
+            logger: Session logger, when this agent is shared between sessions
 
         Returns:
             dict with follow_up question or triage decision
         """
+        llm_with_tools, messages = self._history_request(patient_message, memory, state)
+        response = llm_with_tools.invoke(messages)
+        return self._handle_reply(response, state, logger or self.logger)
+
+    async def aask_or_triage(self, patient_message: str, memory: list, state: dict, logger=None, on_token=None):
+        """ask_or_triage on the event loop, streaming the reply's text to on_token as it arrives"""
+        llm_with_tools, messages = self._history_request(patient_message, memory, state)
+        response = await llm_with_tools.ainvoke(messages, on_token)
+        return self._handle_reply(response, state, logger or self.logger, echo=on_token is None)
+
+    def _history_request(self, patient_message: str, memory: list, state: dict):
+        """Model and messages for the next history-taking turn"""
         # Add patient message to conversation memory
         memory.append({"role": "user", "content": patient_message})
 
         # Prepare messages for LLM
         messages = [{"role": "system", "content": self.system_prompt}] + memory
 
-        # Get LLM response with tools
-        llm_with_tools = self.llm.bind_tools(self.tools)
-        response = llm_with_tools.invoke(messages)
-
-        # Log the doctor's response
-        self.logger.log_message(self.name, response.content)
-
-        # Track question count
-        if "?" in response.content:
+        # Once the question budget is spent the doctor is expected to refer
+        stage = (
+            "triage"
+            if state.get("question_count", 0) >= self.MAX_QUESTIONS
+            else "history_taking"
+        )
+
+        # LLM with the referral tools bound
+        llm_with_tools = self.llm.for_stage(stage, "main_doctor").bind_tools(self.tools)
+        return llm_with_tools, messages
+
+    def _handle_reply(self, response, state: dict, logger, echo: bool = True):
+        """Log the doctor's reply and turn it into a follow-up question or a referral"""
+        assessment = _triage_assessment(response.tool_calls)
+        if assessment is not None:
+            state["triage_confidence"] = assessment["confidence"]
+            state["missing_facts"] = assessment["missing_facts"]
+
+        agent_msg = response.content
+        referral_calls = [call for call in response.tool_calls if call["name"] in TOOL_TO_SPECIALIST]
+        if referral_calls:
+            clinical_summary = referral_calls[0]["args"]["summary"]
+            referrals = [TOOL_TO_SPECIALIST[call["name"]] for call in referral_calls]
+        elif assessment is not None and self._confident(assessment):
+            # Sure enough already: refer now instead of spending another question
+            metrics.increment("triage_early_referrals")
+            clinical_summary = assessment["summary"]
+            referrals = [assessment["specialist"]]
+            agent_msg = REFERRAL_MESSAGE.format(display_name=SPECIALISTS[assessment["specialist"]]["display_name"])
+        else:
+            referrals = []
+            if not agent_msg.strip():
+                # The model only filed its assessment; ask for the first fact it is missing
+                missing = assessment["missing_facts"] if assessment is not None else []
+                agent_msg = KEY_FACTS[missing[0]] if missing else GENERIC_QUESTION
+
+        if not referrals:
+            # Any reply that does not refer is a follow-up question
             state["question_count"] = state.get("question_count", 0) + 1
 
-        # Prepare result
-        result = {"agent_msg": response.content, "follow_up": None, "triaged": False}
+        # Log the doctor's response; echo it if it is not what was streamed
+        logger.log_message(
+            self.name, agent_msg, usage=response.usage_metadata, echo=echo or agent_msg != response.content,
+            question_count=state.get("question_count", 0)
+        )
 
-        # Check if tools were called (specialist referral)
-        if response.tool_calls:
-            tool_call = response.tool_calls[0]
-            tool_name = tool_call["name"]
-            clinical_summary = tool_call["args"]["summary"]
+        # Prepare result
+        result = {"agent_msg": agent_msg, "follow_up": None, "triaged": False}
 
+        if referrals:
             # Store clinical summary
             state["clinical_summary"] = clinical_summary
 
-            # Determine next agent
-            if "cardiologist" in tool_name:
-                state["next_agent"] = "cardiologist"
-            elif "neurologist" in tool_name:
-                state["next_agent"] = "neurologist"
-            elif "dermatologist" in tool_name:
-                state["next_agent"] = "dermatologist"
-            elif "orthopedist" in tool_name:
-                state["next_agent"] = "orthopedist"
-            elif "endocrinologist" in tool_name:
-                state["next_agent"] = "endocrinologist"
+            # Every specialist referred to, in order; the consultation graph asks them all
+            state["referrals"] = list(dict.fromkeys(referrals))
+            state["next_agent"] = state["referrals"][0]
 
             result["triaged"] = True
         else:
-            # It's a follow-up question
-            result["follow_up"] = response.content
+            result["follow_up"] = agent_msg
 
             # Safety check for maximum questions
             if state.get("question_count", 0) >= self.MAX_QUESTIONS:
-                self.logger.log_message(
+                logger.log_message(
                     self.name,
                     "I have enough information now. Let me determine the best specialist for you. do u want to continue ?",
                 )
@@ -156,8 +204,32 @@ Remember: This is for educational purposes only. Always advise seeking real medi
 
         return result
 
-    def provide_final_summary(self, state: dict):
+    def _confident(self, assessment: dict) -> bool:
+        return (
+            assessment["confidence"] >= self.confidence_threshold
+            and assessment["specialist"] in SPECIALISTS
+            and bool(assessment["summary"])
+        )
+
+    def provide_final_summary(self, state: dict, logger=None):
         """Provide final consultation summary (kept for compatibility)"""
+        response = self.llm.for_stage("summary", "main_doctor").invoke(self._summary_messages(state))
+        final_summary = f"CONSULTATION SUMMARY:\n{response.content}"
+        (logger or self.logger).log_message(self.name, final_summary)
+
+        return final_summary
+
+    async def aprovide_final_summary(self, state: dict, logger=None, on_token=None):
+        """provide_final_summary on the event loop, streaming the summary to on_token"""
+        if on_token is not None:
+            on_token("CONSULTATION SUMMARY:\n")
+        response = await self.llm.for_stage("summary", "main_doctor").ainvoke(self._summary_messages(state), on_token)
+        final_summary = f"CONSULTATION SUMMARY:\n{response.content}"
+        (logger or self.logger).log_message(self.name, final_summary, echo=on_token is None)
+
+        return final_summary
+
+    def _summary_messages(self, state: dict):
         specialist_input = state.get("specialist_response", "")
         clinical_summary = state.get("clinical_summary", "")
 
@@ -173,13 +245,25 @@ Please provide:
 4. Reminder about seeking professional medical care
 """
 
-        messages = [
+        return [
             {"role": "system", "content": self.system_prompt},
             {"role": "user", "content": summary_prompt},
         ]
 
-        response = self.llm.invoke(messages)
-        final_summary = f"CONSULTATION SUMMARY:\n{response.content}"
-        self.logger.log_message(self.name, final_summary)
 
-        return final_summary
+def _triage_assessment(tool_calls):
+    """The doctor's triage_assessment arguments, normalized, or None if it did not file one"""
+    for call in tool_calls:
+        if call["name"] == ASSESSMENT_TOOL:
+            args = call.get("args") or {}
+            try:
+                confidence = min(max(float(args.get("confidence", 0)), 0.0), 1.0)
+            except (TypeError, ValueError):
+                confidence = 0.0
+            return {
+                "confidence": confidence,
+                "missing_facts": [fact for fact in args.get("missing_facts") or [] if fact in KEY_FACTS],
+                "specialist": args.get("specialist"),
+                "summary": args.get("summary") or "",
+            }
+    return None
@@ -0,0 +1,398 @@
+"""Specialist registry.
+
+Every specialty is one entry here: who the specialist is, when the main doctor
+should refer to them, and their prompts. The main doctor's referral tools,
+dispatch table and the display names shown to patients are all derived from
+this table once per process, so adding a specialty is a data change only.
+"""
+
+SPECIALISTS = {
+    "cardiologist": {
+        "name": "Dr. Michael Rodriguez",
+        "specialty": "Cardiologist",
+        "title": "Cardiologist",
+        "referral": "Heart and cardiovascular issues (chest pain, palpitations, shortness of breath)",
+        "system_prompt": """You are {name}, a board-certified Cardiologist with 15 years of experience.
+
+Your expertise includes:
+- Coronary artery disease
+- Heart failure
+- Arrhythmias
+- Hypertension
+- Valvular heart disease
+- Congenital heart conditions
+- Cardiac rehabilitation
+
+When consulted, provide:
+1. Professional assessment of cardiac-related symptoms
+2. Possible cardiac conditions to consider
+3. Recommended cardiac tests or evaluations
+4. Risk factors assessment
+5. Lifestyle recommendations
+
+Always emphasize:
+- This is educational consultation only
+- Emergency symptoms require immediate medical attention
+- Importance of proper cardiac workup by real physicians
+- Never provide definitive diagnoses
+
+Be thorough, professional, and use appropriate medical terminology while explaining clearly.
+""",
+        "consultation_prompt": """A patient presents with the following symptoms that may be cardiac-related:
+
+{symptoms}
+
+Please provide your expert cardiological assessment including:
+1. Cardiac differential diagnosis considerations
+2. Recommended cardiac investigations
+3. Risk stratification
+4. Immediate concerns or red flags
+5. General cardiac health recommendations
+
+Remember to emphasize this is educational only and recommend proper medical evaluation.
+""",
+    },
+    "neurologist": {
+        "name": "Dr. David Kim",
+        "specialty": "Neurologist",
+        "title": "Neurologist",
+        "referral": "Brain, nerves, headaches, seizures, weakness, numbness",
+        "system_prompt": """You are {name}, a board-certified Neurologist with expertise in brain and nervous system disorders.
+
+Your areas of expertise include:
+- Headaches and migraines
+- Epilepsy and seizure disorders
+- Stroke and cerebrovascular disease
+- Movement disorders (Parkinson's, tremors)
+- Multiple sclerosis and demyelinating diseases
+- Neuropathy and nerve disorders
+- Memory and cognitive disorders
+- Sleep disorders
+
+When consulted, provide:
+1. Neurological assessment of symptoms
+2. Possible neurological conditions to consider
+3. Recommended neurological tests or evaluations
+4. Red flag symptoms requiring immediate attention
+5. Neurological risk factors
+
+Always emphasize:
+- This is educational consultation only
+- Neurological emergencies require immediate medical attention
+- Importance of proper neurological examination by real physicians
+- Never provide definitive diagnoses
+
+Be thorough, professional, and explain complex neurological concepts clearly.
+""",
+        "consultation_prompt": """A patient presents with the following symptoms that may be neurological:
+
+{symptoms}
+
+Please provide your expert neurological assessment including:
+1. Neurological differential diagnosis considerations
+2. Recommended neurological investigations (imaging, tests)
+3. Assessment of urgency and red flags
+4. Potential neurological risk factors
+5. General neurological health recommendations
+
+Remember to emphasize this is educational only and recommend proper neurological evaluation.
+""",
+    },
+    "dermatologist": {
+        "name": "Dr. Maria Garcia",
+        "specialty": "Dermatologist",
+        "title": "Dermatologist",
+        "referral": "Skin, hair, nail conditions, rashes, lesions",
+        "system_prompt": """You are {name}, a board-certified Dermatologist with expertise in skin, hair, and nail disorders.
+
+Your areas of expertise include:
+- Acne and rosacea
+- Eczema and dermatitis
+- Psoriasis and autoimmune skin conditions
+- Skin cancer screening and moles
+- Hair loss and alopecia
+- Nail disorders
+- Infectious skin conditions
+- Cosmetic dermatology
+- Pediatric dermatology
+
+When consulted, provide:
+1. Dermatological assessment of symptoms
+2. Possible skin conditions to consider
+3. Recommended dermatological evaluations
+4. Skin care recommendations
+5. Warning signs requiring immediate attention
+
+Always emphasize:
+- This is educational consultation only
+- Skin changes should be evaluated by real dermatologists
+- Importance of professional skin examination
+- Never provide definitive diagnoses
+- Skin cancer concerns require immediate professional evaluation
+
+Be thorough, professional, and explain dermatological concepts clearly.
+""",
+        "consultation_prompt": """A patient presents with the following skin, hair, or nail related symptoms:
+
+{symptoms}
+
+Please provide your expert dermatological assessment including:
+1. Dermatological differential diagnosis considerations
+2. Recommended dermatological examinations or tests
+3. Skin care and management recommendations
+4. Warning signs or red flags
+5. General dermatological health advice
+
+Remember to emphasize this is educational only and recommend proper dermatological evaluation.
+""",
+    },
+    "orthopedist": {
+        "name": "Dr. James Thompson",
+        "specialty": "Orthopedic Surgeon",
+        "title": "Orthopedist",
+        "referral": "Bones, joints, muscles, fractures, sprains, back pain",
+        "system_prompt": """You are {name}, a board-certified Orthopedic Surgeon with expertise in musculoskeletal disorders.
+
+Your areas of expertise include:
+- Fractures and trauma
+- Joint disorders (arthritis, joint pain)
+- Sports injuries
+- Spine disorders
+- Shoulder and elbow conditions
+- Hip and knee problems
+- Foot and ankle disorders
+- Bone and joint infections
+- Pediatric orthopedics
+
+When consulted, provide:
+1. Orthopedic assessment of symptoms
+2. Possible musculoskeletal conditions to consider
+3. Recommended orthopedic evaluations and imaging
+4. Activity modifications and rehabilitation advice
+5. Red flag symptoms requiring immediate attention
+
+Always emphasize:
+- This is educational consultation only
+- Musculoskeletal injuries should be evaluated by real orthopedists
+- Importance of proper physical examination and imaging
+- Never provide definitive diagnoses
+- Fractures and severe injuries require immediate medical attention
+
+Be thorough, professional, and explain orthopedic concepts clearly.
+""",
+        "consultation_prompt": """A patient presents with the following musculoskeletal symptoms:
+
+{symptoms}
+
+Please provide your expert orthopedic assessment including:
+1. Orthopedic differential diagnosis considerations
+2. Recommended orthopedic examinations and imaging studies
+3. Activity modifications and conservative management
+4. Red flags requiring immediate orthopedic attention
+5. General musculoskeletal health recommendations
+
+Remember to emphasize this is educational only and recommend proper orthopedic evaluation.
+""",
+    },
+    "endocrinologist": {
+        "name": "Dr. Lisa Patel",
+        "specialty": "Endocrinologist",
+        "title": "Endocrinologist",
+        "referral": "Diabetes, thyroid, hormones, weight issues, fatigue",
+        "system_prompt": """You are {name}, a board-certified Endocrinologist with expertise in hormone and metabolic disorders.
+
+Your areas of expertise include:
+- Diabetes mellitus (Type 1 and Type 2)
+- Thyroid disorders (hypothyroidism, hyperthyroidism)
+- Adrenal disorders
+- Pituitary disorders
+- Reproductive hormone disorders
+- Osteoporosis and bone metabolism
+- Obesity and metabolic syndrome
+- Polycystic ovary syndrome (PCOS)
+- Growth disorders
+
+When consulted, provide:
+1. Endocrinological assessment of symptoms
+2. Possible hormone-related conditions to consider
+3. Recommended endocrine tests and evaluations
+4. Lifestyle and dietary recommendations
+5. Metabolic risk factors assessment
+
+Always emphasize:
+- This is educational consultation only
+- Hormone disorders require proper laboratory testing
+- Importance of endocrine evaluation by real physicians
+- Never provide definitive diagnoses
+- Diabetes emergencies require immediate medical attention
+
+Be thorough, professional, and explain endocrine concepts clearly.
+""",
+        "consultation_prompt": """A patient presents with the following symptoms that may be endocrine-related:
+
+{symptoms}
+
+Please provide your expert endocrinological assessment including:
+1. Endocrine differential diagnosis considerations
+2. Recommended hormone tests and laboratory evaluations
+3. Metabolic and lifestyle assessment
+4. Potential complications or concerns
+5. General endocrine health recommendations
+
+Remember to emphasize this is educational only and recommend proper endocrinological evaluation.
+""",
+    },
+}
+
+
+def _tool_schema(key: str) -> dict:
+    # Same shape langchain's convert_to_openai_tool produced for the old @tool functions
+    return {
+        "type": "function",
+        "function": {
+            "name": f"consult_{key}",
+            "description": f"Send the compiled clinical summary to the {key}.",
+            "parameters": {
+                "properties": {"summary": {"type": "string"}},
+                "required": ["summary"],
+                "type": "object",
+            },
+        },
+    }
+
+
+for _key, _spec in SPECIALISTS.items():
+    _spec["system_prompt"] = _spec["system_prompt"].format(name=_spec["name"])
+    _spec["display_name"] = f"{_spec['name']} ({_spec['title']})"
+    _spec["tool_schema"] = _tool_schema(_key)
+
+# Referral tools offered to the main doctor, and tool name -> specialist key
+TOOL_SCHEMAS = [spec["tool_schema"] for spec in SPECIALISTS.values()]
+TOOL_TO_SPECIALIST = {spec["tool_schema"]["function"]["name"]: key for key, spec in SPECIALISTS.items()}
+
+# Lines for the main doctor's prompt, e.g. "- Cardiologist: Heart and ..."
+REFERRAL_GUIDE = "\n".join(f"- {spec['title']}: {spec['referral']}" for spec in SPECIALISTS.values())
+
+
+# Fast path: one structured call from the specialist replaces the separate
+# specialist consult and final summary calls
+FAST_CONSULT_TOOL = "record_consultation"
+FAST_CONSULT_SCHEMA = {
+    "type": "function",
+    "function": {
+        "name": FAST_CONSULT_TOOL,
+        "description": "Record the outcome of the specialist consultation.",
+        "parameters": {
+            "properties": {
+                "clinical_summary": {"type": "string", "description": "Structured clinical summary of the case"},
+                "assessment": {"type": "string", "description": "Your full specialist assessment"},
+                "patient_summary": {
+                    "type": "string",
+                    "description": "Brief summary for the patient: key findings, recommendations, next steps",
+                },
+            },
+            "required": ["clinical_summary", "assessment", "patient_summary"],
+            "type": "object",
+        },
+    },
+}
+
+FAST_CONSULT_PROMPT = """A primary care physician has referred this patient to you.
+
+Referral summary:
+{summary}
+
+What the patient told the physician:
+{statements}
+
+Call """ + FAST_CONSULT_TOOL + """ once with:
+- clinical_summary: a structured clinical summary of the case
+- assessment: your full specialist assessment, in the format described above
+- patient_summary: a brief summary for the patient covering key findings, your recommendations,
+  important next steps and a reminder to seek professional medical care"""
+
+
+class Specialist:
+    """A consulting specialist; everything specific to the specialty comes from SPECIALISTS"""
+
+    def __init__(self, key: str, llm, logger=None):
+        spec = SPECIALISTS[key]
+        self.key = key
+        self.llm = llm
+        self.logger = logger
+        self.name = spec["name"]
+        self.specialty = spec["specialty"]
+
+        self.system_prompt = spec["system_prompt"]
+        self.consultation_prompt = spec["consultation_prompt"]
+
+    def consult(self, symptoms: str, state: dict, logger=None):
+        response = self.llm.for_stage("specialist", self.key).invoke(self._messages(symptoms))
+        (logger or self.logger).log_message(self.name, response.content, usage=response.usage_metadata)
+        return self._record(response, state)
+
+    async def aconsult(self, symptoms: str, state: dict, logger=None, on_token=None):
+        """consult on the event loop, streaming the assessment to on_token as it arrives"""
+        response = await self.llm.for_stage("specialist", self.key).ainvoke(self._messages(symptoms), on_token)
+        (logger or self.logger).log_message(
+            self.name, response.content, usage=response.usage_metadata, echo=on_token is None
+        )
+        return self._record(response, state)
+
+    def fast_consult(self, summary: str, patient_statements: list, logger=None) -> dict:
+        """Clinical summary, assessment and patient summary from one structured call"""
+        llm = self._fast_llm()
+        response = llm.invoke(self._fast_messages(summary, patient_statements))
+        return self._record_fast(response, summary, logger or self.logger)
+
+    async def afast_consult(self, summary: str, patient_statements: list, logger=None) -> dict:
+        """fast_consult on the event loop"""
+        llm = self._fast_llm()
+        response = await llm.ainvoke(self._fast_messages(summary, patient_statements))
+        return self._record_fast(response, summary, logger or self.logger)
+
+    def _fast_llm(self):
+        return self.llm.for_stage("fast_consult", self.key).bind_tools(
+            [FAST_CONSULT_SCHEMA], tool_choice=FAST_CONSULT_TOOL
+        )
+
+    def _fast_messages(self, summary: str, patient_statements: list):
+        statements = "\n".join(f"- {statement}" for statement in patient_statements) or "- (none recorded)"
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": FAST_CONSULT_PROMPT.format(summary=summary, statements=statements)},
+        ]
+
+    def _record_fast(self, response, summary: str, logger) -> dict:
+        args = next((call["args"] for call in response.tool_calls if call["name"] == FAST_CONSULT_TOOL), None)
+        if args is None:
+            # The model answered in prose; keep it as the assessment and the referral summary as is
+            args = {"clinical_summary": summary, "assessment": response.content, "patient_summary": ""}
+        result = {
+            "clinical_summary": args.get("clinical_summary") or summary,
+            "assessment": args.get("assessment") or "",
+            "final_summary": (
+                f"CONSULTATION SUMMARY:\n{args['patient_summary']}" if args.get("patient_summary") else None
+            ),
+        }
+        logger.log_message(self.name, result["assessment"], usage=response.usage_metadata)
+        if result["final_summary"]:
+            logger.log_message(self.name, result["final_summary"])
+        return result
+
+    def _messages(self, symptoms: str):
+        return [
+            {"role": "system", "content": self.system_prompt},
+            {"role": "user", "content": self.consultation_prompt.format(symptoms=symptoms)},
+        ]
+
+    def _record(self, response, state: dict):
+        state["specialist_response"] = response.content
+        state["next_agent"] = "main_doctor_summary"
+
+        return state
+
+
+def build_specialists(llm, logger=None) -> dict:
+    """One Specialist per registry entry, keyed like SPECIALISTS"""
+    return {key: Specialist(key, llm, logger) for key in SPECIALISTS}
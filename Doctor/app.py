@@ -1,10 +1,25 @@
-from flask import Flask, request, jsonify, session
+from flask import Flask, Response, g, request, jsonify, session, stream_with_context
 from flask_cors import CORS
 import os
+import hmac
+import json
 import uuid
+from functools import partial, wraps
 from datetime import datetime
-from server_bot import ServerMedicalBot
+from server_bot import ServerMedicalBot, get_shared_agents
 from session_manager import SessionManager
+from session_store import create_session_store
+from batch import BatchStats, parse_cases, run_batch
+from utils.metrics import metrics
+from utils.deadline import RequestAbandoned, request_deadline
+from utils.admission import BATCH_PRIORITY, Overloaded, background_slot, get_admission_controller
+from utils.red_flags import triage_priority
+from utils.emergency import detect_emergency
+from utils.idempotency import IDEMPOTENCY_HEADER, IdempotencyCache, IdempotencyConflict, request_fingerprint
+from utils.groq_client import llm_flight
+from utils.http_pool import pool_stats
+from utils.transcript_log import get_transcript_log
+from utils.http_encoding import StaticJSON, install as install_http_encoding
 import logging
 
 # Configure logging
@@ -13,12 +28,57 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get('SECRET_KEY', 'your-secret-key-change-in-production')
+install_http_encoding(app)
 
 # Enable CORS for production
-CORS(app, origins=['*'], methods=['GET', 'POST', 'OPTIONS'], allow_headers=['Content-Type', 'Authorization'])
+CORS(app, origins=['*'], methods=['GET', 'POST', 'OPTIONS'],
+     allow_headers=['Content-Type', 'Authorization', IDEMPOTENCY_HEADER])
+
+# Headers kept when a response is stored for Idempotency-Key replays
+REPLAYED_HEADERS = ('content-type', 'retry-after')
 
 # Initialize components
-session_manager = SessionManager()
+session_manager = SessionManager(
+    store=create_session_store(),
+    restore_bot=ServerMedicalBot.from_snapshot,
+    max_sessions=int(os.environ.get('MAX_SESSIONS', 10000)),
+    memory_high_watermark_mb=float(os.environ.get('SESSION_MEMORY_HIGH_WATERMARK_MB', 0)) or None,
+    idle_offload_seconds=float(os.environ.get('SESSION_IDLE_OFFLOAD_SECONDS', 120)) or None
+)
+
+# Start requests have no session yet, so their keys share one bounded cache per worker
+start_idempotency = IdempotencyCache(int(os.environ.get('IDEMPOTENCY_START_ENTRIES', 1024)), name="idempotency_start")
+
+# Built once: the body, its ETag and compressed variants never change while the server runs
+SPECIALIST_DIRECTORY = StaticJSON({
+    "success": True,
+    "specialists": [
+        {
+            "id": "neurologist",
+            "name": "Dr. David Kim",
+            "specialty": "Neurologist",
+            "experience": "15+ years",
+            "rating": 4.9,
+            "avatar": "🧠"
+        },
+        {
+            "id": "cardiologist", 
+            "name": "Dr. Michael Rodriguez",
+            "specialty": "Cardiologist",
+            "experience": "12+ years",
+            "rating": 4.8,
+            "avatar": "❤️"
+        },
+        {
+            "id": "general",
+            "name": "Dr. Sarah Chen", 
+            "specialty": "General Medicine",
+            "experience": "10+ years",
+            "rating": 4.7,
+            "avatar": "🩺"
+        }
+    ]
+})
 
 @app.route('/', methods=['GET'])
 def health_check():
@@ -39,7 +99,244 @@ def api_health_check():
         "timestamp": datetime.now().isoformat()
     })
 
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """Expose in-process server metrics"""
+    metrics.set_gauge("llm_singleflight_in_flight", llm_flight.in_flight())
+    metrics.set_gauge("active_sessions", session_manager.get_active_sessions_count())
+    for tier, count in session_manager.get_tier_counts().items():
+        metrics.set_gauge(f"sessions_{tier}", count)
+    for name, value in pool_stats().items():
+        metrics.set_gauge(f"llm_http_pool.{name}", value)
+    admission = get_admission_controller()
+    if admission is not None:
+        for name, value in admission.stats().items():
+            metrics.set_gauge(f"admission.{name}", value)
+    return jsonify({
+        "success": True,
+        "metrics": metrics.snapshot(),
+        "timestamp": datetime.now().isoformat()
+    })
+
+def abandoned_response(e: RequestAbandoned):
+    """Reply for a turn cut short by its deadline or a departed client (who will not read it)"""
+    return jsonify({
+        "error": "The consultation took too long to respond. Please send your message again.",
+        "reason": e.reason,
+        "success": False
+    }), 504
+
+def request_session(session_id: str):
+    """The session for this request, pinned in memory until the request has finished"""
+    session_data = session_manager.get_session(session_id, pin=True)
+    if session_data is not None:
+        g.setdefault('pinned_sessions', []).append(session_data)
+    return session_data
+
+@app.teardown_request
+def release_sessions(exc):
+    for session_data in g.pop('pinned_sessions', []):
+        session_manager.release(session_data)
+
+def record_late(deadline):
+    """Count work that finished after the caller had already given up on it"""
+    if deadline.expired():
+        metrics.increment("requests_completed_after_deadline")
+
+def track_pending_turn(session_id: str, session_data):
+    """Store the session again once a turn left running behind an emergency reply has finished.
+    
+    The session stays pinned in memory meanwhile; update_session adds it back
+    and snapshots it should it have left memory anyway.
+    """
+    bot = session_data.bot
+    pending = bot.pending_turn
+    if pending is None:
+        return
+    session_manager.pin(session_data)
+    
+    def finished(future):
+        try:
+            if future.exception() is not None:
+                logger.error(f"Background turn failed for session {session_id}: {future.exception()}")
+            # Stored either way, so the session status reports the outcome
+            session_manager.update_session(session_id, {"stage": bot.session_state.get("stage", "history_taking")},
+                                           session_data)
+        finally:
+            session_manager.release(session_data)
+    
+    pending.add_done_callback(finished)
+
+def emergency_fields(result: dict) -> dict:
+    if not result.get("emergency"):
+        return {}
+    return {
+        "emergency": result["emergency"],
+        "consultation_pending": result["consultation_pending"]
+    }
+
+def consultation_priority(data: dict, session_data) -> str:
+    """Scheduling class from red flags in everything the patient has said, including this message"""
+    statements = []
+    if session_data:
+        statements = [m["content"] for m in session_data.bot.conversation_memory if m["role"] == "user"]
+    if isinstance(data.get("message"), str):
+        statements.append(data["message"])
+    return triage_priority(statements)
+
+def admit(view, data: dict, session_data):
+    """Run the view once admitted, or answer 503 with Retry-After"""
+    admission = get_admission_controller()
+    if admission is None:
+        return view()
+    priority = consultation_priority(data, session_data)
+    metrics.increment(f"requests_by_priority.{priority}")
+    try:
+        with admission.admit(max_wait=g.deadline.remaining(), priority=priority):
+            return view()
+    except Overloaded as e:
+        logger.warning(f"Rejected {priority} request to {request.path}: {e}")
+        response = jsonify({
+            "error": "The server is busy. Please try again shortly.",
+            "retry_after": e.retry_after,
+            "success": False
+        })
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+
+def freeze_response(rv) -> tuple:
+    """(body, status, headers) of a view's return value, so it can be replayed"""
+    response = app.make_response(rv)
+    headers = [(name, value) for name, value in response.headers if name.lower() in REPLAYED_HEADERS]
+    return response.get_data(), response.status_code, headers
+
+def message_emergency(data: dict, session_data):
+    """Clear emergency in the request's message, skipping kinds the session was already alerted to"""
+    message = data.get("message")
+    if not isinstance(message, str):
+        return None
+    alerted = session_data.bot.session_state.get("emergency_alerts", ()) if session_data else ()
+    return detect_emergency(message, alerted)
+
+def keep_idempotent_result(session_id: str, key: str, fingerprint: str, result: tuple):
+    """Keep a new Idempotency-Key result in its session's snapshot, so a retry on any worker replays it"""
+    session_data = request_session(session_id)
+    if session_data is None:
+        return
+    session_data.bot.idempotency_cache().seed(key, fingerprint, result)
+    session_manager.save_session(session_id)
+
+def consultation_request(view):
+    """Admit an LLM-bound request within its deadline, replaying it if its Idempotency-Key was seen.
+    
+    Red-flag presentations go ahead of routine ones while requests queue. A
+    clear emergency (g.emergency) is not queued at all: the view answers it
+    with the emergency template before any LLM call. A duplicate of a
+    request still running waits for it instead of taking a slot. The
+    deadline starts before any queueing and is left in g.deadline for the
+    view. Results are kept with their session (see keep_idempotent_result).
+    A start request has no session yet: its key is scoped to the caller's
+    address in this worker's start cache, whose stored reply carries the
+    session id the first attempt created.
+    """
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        g.deadline = request_deadline(request.headers, request.environ)
+        data = request.get_json(silent=True)
+        data = data if isinstance(data, dict) else {}
+        session_data = request_session(data["session_id"]) if data.get("session_id") else None
+        g.emergency = message_emergency(data, session_data)
+        run_view = partial(view, *args, **kwargs)
+        # Checked before admission, so an emergency is answered even when the server is full
+        execute = run_view if g.emergency else partial(admit, run_view, data, session_data)
+        
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if request.path == '/api/start-consultation':
+            session_id = None
+            cache = start_idempotency
+            cache_key = f"{request.remote_addr}|{key}"
+        else:
+            session_id = data.get("session_id")
+            # Keys are scoped to their session; an unknown session is left to the view's 404
+            cache = session_data.bot.idempotency_cache() if session_data else None
+            cache_key = key
+        if not key or cache is None:
+            return execute()
+        
+        fingerprint = request_fingerprint(request.path, request.get_data())
+        try:
+            (body, status, headers), replayed = cache.run(
+                cache_key,
+                fingerprint,
+                lambda: freeze_response(execute()),
+                # Server errors and overload are not stored, so the client's retry runs again
+                retryable=lambda stored: stored[1] >= 500,
+                timeout=g.deadline.remaining()
+            )
+        except IdempotencyConflict as e:
+            return jsonify({"error": str(e), "success": False}), 422
+        except TimeoutError:
+            return abandoned_response(RequestAbandoned("deadline"))
+        
+        if not replayed and status < 500 and session_id:
+            keep_idempotent_result(session_id, key, fingerprint, (body, status, headers))
+        
+        response = Response(body, status=status, headers=headers)
+        if replayed:
+            response.headers["Idempotent-Replayed"] = "true"
+        return response
+    return wrapper
+
+def message_response(session_id: str, result: dict) -> dict:
+    """Reply body for a consultation turn, with the fields of the stage it reached"""
+    response_data = {
+        "success": True,
+        "session_id": session_id,
+        "doctor_response": result["doctor_response"],
+        "is_question": result["is_question"],
+        "consultation_stage": result["stage"]
+    }
+    
+    # Add stage-specific data
+    if result.get("emergency"):
+        # Instant safety reply; the turn's own reply is fetched from session-status when ready
+        response_data.update(emergency_fields(result))
+    elif result["stage"] == "history_taking":
+        response_data.update({
+            "doctor_name": "Dr. Sarah Chen",
+            "question_count": result["question_count"],
+            "max_questions": 5
+        })
+    elif result["stage"] == "specialist_handoff":
+        response_data.update({
+            "specialist_name": result["specialist_name"],
+            "handoff_message": result["handoff_message"]
+        })
+    elif result["stage"] == "specialist_consultation":
+        response_data.update({
+            "specialist_name": result["specialist_name"],
+            "clinical_summary": result.get("clinical_summary", ""),
+            "specialist_assessment": result["doctor_response"],
+            "recommendations": result.get("recommendations", []),
+            "medications": result.get("medications", []),
+            "specialist_assessments": result.get("specialist_assessments", {}),
+            "is_specialist": True
+        })
+        # Fast path: the referral and the assessment arrive together, with the patient summary
+        for key in ("handoff_message", "final_summary"):
+            if result.get(key):
+                response_data[key] = result[key]
+    elif result["stage"] == "consultation_complete":
+        response_data.update({
+            "final_summary": result.get("final_summary", ""),
+            "specialist_consulted": result.get("specialist_name", ""),
+            "clinical_summary": result.get("clinical_summary", "")
+        })
+    return response_data
+
 @app.route('/api/start-consultation', methods=['POST'])
+@consultation_request
 def start_consultation():
     """Start a new medical consultation session"""
     try:
@@ -61,11 +358,13 @@ def start_consultation():
         session_id = str(uuid.uuid4())
         bot = ServerMedicalBot()
         
-        # Start consultation
-        result = bot.start_consultation(patient_message, session_id)
+        # Start consultation within the caller's time budget
+        result = bot.start_consultation(patient_message, session_id, g.deadline, g.emergency)
+        record_late(g.deadline)
         
         # Store session
-        session_manager.create_session(session_id, bot, result)
+        session_data = session_manager.create_session(session_id, bot, result)
+        track_pending_turn(session_id, session_data)
         
         logger.info(f"Started consultation for session: {session_id}")
         
@@ -77,9 +376,13 @@ def start_consultation():
             "is_question": result["is_question"],
             "consultation_stage": "history_taking",
             "question_count": result["question_count"],
-            "max_questions": 5
+            "max_questions": 5,
+            **emergency_fields(result)
         })
         
+    except RequestAbandoned as e:
+        logger.warning(f"Abandoned consultation start ({e.reason})")
+        return abandoned_response(e)
     except Exception as e:
         logger.error(f"Error starting consultation: {str(e)}")
         return jsonify({
@@ -88,6 +391,7 @@ def start_consultation():
         }), 500
 
 @app.route('/api/send-message', methods=['POST'])
+@consultation_request
 def send_message():
     """Send message in ongoing consultation"""
     try:
@@ -108,60 +412,31 @@ def send_message():
             }), 400
 
         # Get session
-        session_data = session_manager.get_session(session_id)
+        session_data = request_session(session_id)
         if not session_data:
             return jsonify({
                 "error": "Invalid or expired session",
                 "success": False
             }), 404
 
-        bot = session_data['bot']
+        bot = session_data.bot
         
-        # Continue consultation
-        result = bot.continue_consultation(patient_message, session_id)
+        # Continue consultation within the caller's time budget
+        result = bot.continue_consultation(patient_message, session_id, g.deadline, g.emergency)
+        record_late(g.deadline)
         
         # Update session
-        session_manager.update_session(session_id, result)
+        session_manager.update_session(session_id, result, session_data)
+        track_pending_turn(session_id, session_data)
         
-        response_data = {
-            "success": True,
-            "session_id": session_id,
-            "doctor_response": result["doctor_response"],
-            "is_question": result["is_question"],
-            "consultation_stage": result["stage"]
-        }
-        
-        # Add stage-specific data
-        if result["stage"] == "history_taking":
-            response_data.update({
-                "doctor_name": "Dr. Sarah Chen",
-                "question_count": result["question_count"],
-                "max_questions": 5
-            })
-        elif result["stage"] == "specialist_handoff":
-            response_data.update({
-                "specialist_name": result["specialist_name"],
-                "handoff_message": result["handoff_message"]
-            })
-        elif result["stage"] == "specialist_consultation":
-            response_data.update({
-                "specialist_name": result["specialist_name"],
-                "clinical_summary": result.get("clinical_summary", ""),
-                "specialist_assessment": result["doctor_response"],
-                "recommendations": result.get("recommendations", []),
-                "medications": result.get("medications", []),
-                "is_specialist": True
-            })
-        elif result["stage"] == "consultation_complete":
-            response_data.update({
-                "final_summary": result.get("final_summary", ""),
-                "specialist_consulted": result.get("specialist_name", ""),
-                "clinical_summary": result.get("clinical_summary", "")
-            })
+        response_data = message_response(session_id, result)
         
         logger.info(f"Message processed for session: {session_id}, stage: {result['stage']}")
         return jsonify(response_data)
         
+    except RequestAbandoned as e:
+        logger.warning(f"Abandoned message for session: {data['session_id']} ({e.reason})")
+        return abandoned_response(e)
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
         return jsonify({
@@ -183,10 +458,11 @@ def end_consultation():
         session_id = data['session_id']
         
         # Get final summary
-        session_data = session_manager.get_session(session_id)
+        session_data = request_session(session_id)
         if session_data:
-            bot = session_data['bot']
+            bot = session_data.bot
             summary = bot.get_consultation_summary()
+            bot.logger.save_session()
         else:
             summary = "Session not found"
         
@@ -213,20 +489,24 @@ def end_consultation():
 def get_session_status(session_id):
     """Get current session status"""
     try:
-        session_data = session_manager.get_session(session_id)
+        session_data = request_session(session_id)
         if not session_data:
             return jsonify({
                 "error": "Session not found",
                 "success": False
             }), 404
         
+        pending, pending_response = session_data.bot.pending_result()
         return jsonify({
             "success": True,
             "session_id": session_id,
-            "stage": session_data['current_state']['stage'],
-            "question_count": session_data['current_state'].get('question_count', 0),
-            "created_at": session_data['created_at'],
-            "last_activity": session_data['last_activity']
+            "stage": session_data.stage,
+            "question_count": session_data.question_count,
+            "created_at": session_data.created_at_iso(),
+            "last_activity": session_data.last_activity_iso(),
+            # After an emergency reply: whether the consultation turn is still running, then its reply
+            "consultation_pending": pending,
+            "pending_response": message_response(session_id, pending_response) if pending_response else None
         })
         
     except Exception as e:
@@ -236,6 +516,36 @@ def get_session_status(session_id):
             "success": False
         }), 500
 
+@app.route('/api/session-transcript/<session_id>', methods=['GET'])
+def get_session_transcript(session_id):
+    """Get the logged transcript of a consultation"""
+    try:
+        transcript = get_transcript_log().get(session_id)
+        if transcript is None:
+            # Consultations still in progress are not in the log yet
+            session_data = request_session(session_id)
+            if session_data:
+                transcript = session_data.bot.logger.current_session
+        
+        if transcript is None:
+            return jsonify({
+                "error": "Transcript not found",
+                "success": False
+            }), 404
+        
+        return jsonify({
+            "success": True,
+            "session_id": session_id,
+            "transcript": transcript
+        })
+        
+    except Exception as e:
+        logger.error(f"Error getting session transcript: {str(e)}")
+        return jsonify({
+            "error": f"Failed to get session transcript: {str(e)}",
+            "success": False
+        }), 500
+
 @app.route('/api/connect-specialist', methods=['POST'])
 def connect_specialist():
     """Connect to specialist"""
@@ -260,40 +570,88 @@ def connect_specialist():
             "success": False
         }), 500
 
+def batch_authorized() -> bool:
+    """Batch runs need the BATCH_API_TOKEN bearer token; without one configured they are disabled"""
+    token = os.environ.get('BATCH_API_TOKEN')
+    if not token:
+        return False
+    return hmac.compare_digest(request.headers.get('Authorization', ''), f"Bearer {token}")
+
+@app.route('/api/batch-consultation', methods=['POST'])
+def batch_consultation():
+    """Run a batch of case vignettes and stream one JSON result per line.
+    
+    Each case takes an admission slot at the lowest priority, so batches
+    never hold back interactive consultations. To resume a batch that was
+    cut off, send it again with the case_ids already received in
+    "completed" (or ?completed=id1,id2 for a JSONL body); those are skipped.
+    """
+    if not batch_authorized():
+        return jsonify({
+            "error": "Batch consultations need a valid API token",
+            "success": False
+        }), 403
+    
+    try:
+        # Accept either a JSONL body or {"cases": [...], "concurrency": n, "completed": [case_id, ...]}
+        if request.is_json:
+            data = request.get_json()
+            if not data or not isinstance(data.get('cases'), list):
+                return jsonify({
+                    "error": "A list of cases is required",
+                    "success": False
+                }), 400
+            cases = list(parse_cases(json.dumps(case) for case in data['cases']))
+            try:
+                requested = int(data['concurrency']) if data.get('concurrency') is not None else None
+            except (TypeError, ValueError):
+                raise ValueError("'concurrency' must be an integer")
+            consult = data.get('consult', True)
+            completed = data.get('completed', [])
+            if not isinstance(completed, list) or not all(isinstance(case_id, (str, int)) for case_id in completed):
+                raise ValueError("'completed' must be a list of case_ids")
+            completed = set(completed)
+        else:
+            cases = list(parse_cases(request.get_data(as_text=True).splitlines()))
+            requested = request.args.get('concurrency', type=int)
+            consult = request.args.get('consult', 'true').lower() == 'true'
+            completed = set(filter(None, request.args.get('completed', '').split(',')))
+    except ValueError as e:
+        return jsonify({
+            "error": f"Invalid batch: {str(e)}",
+            "success": False
+        }), 400
+    
+    if not cases:
+        return jsonify({
+            "error": "Batch contains no cases",
+            "success": False
+        }), 400
+    
+    skipped = sum(1 for case in cases if case["case_id"] in completed)
+    cases = [case for case in cases if case["case_id"] not in completed]
+    
+    max_concurrency = int(os.environ.get('BATCH_MAX_CONCURRENCY', 4))
+    concurrency = max(1, min(requested or max_concurrency, max_concurrency))
+    
+    main_doctor, specialists = get_shared_agents()
+    logger.info(f"Starting batch of {len(cases)} cases ({skipped} already completed) with concurrency {concurrency}")
+    
+    def generate():
+        stats = BatchStats()
+        stats.skipped = skipped
+        for result in run_batch(main_doctor, specialists, cases, concurrency, consult=consult, slot=partial(background_slot, BATCH_PRIORITY)):
+            stats.record(result)
+            yield json.dumps(result) + "\n"
+        # Trailing line with throughput for the whole batch
+        yield json.dumps({"summary": stats.summary()}) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route('/api/specialists', methods=['GET'])
 def get_specialists():
     """Get available specialists"""
-    specialists = [
-        {
-            "id": "neurologist",
-            "name": "Dr. David Kim",
-            "specialty": "Neurologist",
-            "experience": "15+ years",
-            "rating": 4.9,
-            "avatar": "🧠"
-        },
-        {
-            "id": "cardiologist", 
-            "name": "Dr. Michael Rodriguez",
-            "specialty": "Cardiologist",
-            "experience": "12+ years",
-            "rating": 4.8,
-            "avatar": "❤️"
-        },
-        {
-            "id": "general",
-            "name": "Dr. Sarah Chen", 
-            "specialty": "General Medicine",
-            "experience": "10+ years",
-            "rating": 4.7,
-            "avatar": "🩺"
-        }
-    ]
-    
-    return jsonify({
-        "success": True,
-        "specialists": specialists
-    })
+    return SPECIALIST_DIRECTORY.response(request, app.response_class)
 
 @app.errorhandler(404)
 def not_found(error):
@@ -0,0 +1,235 @@
+"""Run recorded case vignettes through triage and specialist assessment.
+
+Each line of the input is a JSON case:
+    {"case_id": "...", "message": "...", "answers": ["...", ...]}
+"answers" are the scripted patient replies to the doctor's follow-up
+questions; once they run out the patient has nothing more to add. Results
+are written one JSON line per case as they finish. Re-running with --resume
+skips cases that already have a successful result in the output file.
+
+Usage:
+    python batch.py cases.jsonl --output results.jsonl --concurrency 8 --resume
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, Iterable, Iterator, Optional, Set
+
+from utils.conversation_logger import ConversationLogger
+from utils.metrics import metrics
+
+NO_MORE_INFO = "No additional information to add."
+
+
+class QuietLogger(ConversationLogger):
+    """Conversation logger that keeps entries but does not print them"""
+
+    def _print_colored_message(self, agent_name: str, message: str, message_type: str):
+        pass
+
+
+def run_case(main_doctor, specialists, case: dict, consult: bool = True, logger=None):
+    """Drive one case through history taking, triage and specialist consult.
+
+    Scripted answers are fed in order; once they run out the patient says
+    there is nothing more to add.
+    """
+    memory = []
+    state = {"question_count": 0}
+    answers = list(case.get("answers", []))
+    patient_message = case["message"]
+    turns = 0
+    start = time.perf_counter()
+
+    while True:
+        turns += 1
+        result = main_doctor.ask_or_triage(patient_message, memory, state, logger)
+        if result["triaged"] or turns > main_doctor.MAX_QUESTIONS + 1:
+            break
+        patient_message = answers.pop(0) if answers else NO_MORE_INFO
+
+    specialist = state.get("next_agent") if result["triaged"] else None
+    specialist_response = None
+    if consult and specialist in specialists:
+        specialist_state = {
+            "consultation_request": state["clinical_summary"],
+            "specialist_response": "",
+        }
+        specialists[specialist].consult(state["clinical_summary"], specialist_state, logger)
+        specialist_response = specialist_state["specialist_response"]
+
+    return {
+        "case_id": case.get("case_id"),
+        "turns": turns,
+        "questions": state.get("question_count", 0),
+        "specialist": specialist,
+        "expected_specialist": case.get("expected_specialist"),
+        "triage_confidence": state.get("triage_confidence"),
+        "missing_facts": state.get("missing_facts"),
+        "clinical_summary": state.get("clinical_summary"),
+        "specialist_response": specialist_response,
+        "elapsed": time.perf_counter() - start,
+    }
+
+
+def parse_cases(lines: Iterable[str]) -> Iterator[dict]:
+    """Yield cases from JSONL lines, numbering any case without a case_id"""
+    for number, line in enumerate(lines, 1):
+        line = line.strip()
+        if not line:
+            continue
+        case = json.loads(line)
+        if not isinstance(case, dict) or not isinstance(case.get("message"), str):
+            raise ValueError(f"Line {number}: each case needs a 'message' string")
+        case.setdefault("case_id", f"line-{number}")
+        yield case
+
+
+def completed_case_ids(path: str) -> Set[str]:
+    """Case ids with a successful result in an existing output file"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r") as f:
+        for line in f:
+            try:
+                result = json.loads(line)
+            except ValueError:
+                # A line cut short by an interruption; that case is simply re-run
+                continue
+            if isinstance(result, dict) and "error" not in result and "case_id" in result:
+                done.add(result["case_id"])
+    return done
+
+
+def run_batch(main_doctor, specialists, cases: Iterable[dict], concurrency: int = 4,
+              consult: bool = True, slot: Optional[Callable[[], ContextManager]] = None) -> Iterator[dict]:
+    """Run cases on a bounded thread pool and yield results as they complete.
+
+    At most `concurrency` cases are in flight, so the input is read lazily
+    and arbitrarily large files stay in constant memory. A failing case is
+    reported as a result with an "error" field instead of stopping the batch.
+    `slot`, if given, is entered around each case, e.g. to take a server
+    admission slot.
+    """
+    slot = slot or nullcontext
+
+    def process(case):
+        try:
+            with slot():
+                return run_case(main_doctor, specialists, case, consult, QuietLogger())
+        except Exception as e:
+            return {"case_id": case.get("case_id"), "error": f"{type(e).__name__}: {e}"}
+
+    cases = iter(cases)
+    with ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="batch") as pool:
+        pending = set()
+        exhausted = False
+        while pending or not exhausted:
+            while not exhausted and len(pending) < concurrency:
+                case = next(cases, None)
+                if case is None:
+                    exhausted = True
+                else:
+                    pending.add(pool.submit(process, case))
+            if not pending:
+                break
+            finished, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in finished:
+                result = future.result()
+                metrics.increment("batch_cases_failed" if "error" in result else "batch_cases_completed")
+                yield result
+
+
+class BatchStats:
+    """Running totals for throughput reporting"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.start = time.perf_counter()
+        self.completed = 0
+        self.failed = 0
+        self.skipped = 0
+
+    def record(self, result: dict):
+        with self._lock:
+            if "error" in result:
+                self.failed += 1
+            else:
+                self.completed += 1
+
+    def summary(self) -> Dict:
+        elapsed = time.perf_counter() - self.start
+        processed = self.completed + self.failed
+        return {
+            "completed": self.completed,
+            "failed": self.failed,
+            "skipped": self.skipped,
+            "elapsed_seconds": round(elapsed, 3),
+            "cases_per_second": round(processed / elapsed, 3) if elapsed > 0 else 0.0,
+        }
+
+
+def main(argv: Optional[list] = None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("cases", help="JSONL file of cases, or - for stdin")
+    parser.add_argument("--output", "-o", help="JSONL results file (default: stdout)")
+    parser.add_argument("--concurrency", "-c", type=int, default=4)
+    parser.add_argument("--resume", action="store_true",
+                        help="Skip cases already completed in the output file and append to it")
+    parser.add_argument("--no-consult", action="store_true",
+                        help="Stop after triage without asking the specialist")
+    parser.add_argument("--progress-every", type=int, default=100)
+    args = parser.parse_args(argv)
+
+    if args.resume and not args.output:
+        parser.error("--resume needs --output")
+
+    from server_bot import get_shared_agents
+    main_doctor, specialists = get_shared_agents()
+
+    done = completed_case_ids(args.output) if args.resume else set()
+    source = sys.stdin if args.cases == "-" else open(args.cases, "r")
+    output = open(args.output, "a" if args.resume else "w") if args.output else sys.stdout
+    if args.resume and output.tell() > 0:
+        # Terminate a line cut short by the interruption so new results start cleanly
+        with open(args.output, "rb") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                output.write("\n")
+    stats = BatchStats()
+
+    def pending_cases():
+        for case in parse_cases(source):
+            if case["case_id"] in done:
+                stats.skipped += 1
+                continue
+            yield case
+
+    try:
+        for result in run_batch(main_doctor, specialists, pending_cases(), args.concurrency,
+                                consult=not args.no_consult):
+            # Flush per line so an interrupted run loses at most the cases in flight
+            output.write(json.dumps(result) + "\n")
+            output.flush()
+            stats.record(result)
+            processed = stats.completed + stats.failed
+            if args.progress_every and processed % args.progress_every == 0:
+                print(f"progress: {json.dumps(stats.summary())}", file=sys.stderr)
+    except KeyboardInterrupt:
+        print("interrupted; re-run with --resume to continue", file=sys.stderr)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if output is not sys.stdout:
+            output.close()
+        print(f"summary: {json.dumps(stats.summary())}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
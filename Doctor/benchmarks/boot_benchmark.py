@@ -0,0 +1,127 @@
+"""Compare preload-and-warm boot against plain gunicorn boot.
+
+Starts gunicorn with gunicorn.conf.py twice (PRELOAD_APP=true and false),
+waits for the server to answer, then measures:
+  - latency of the first /api/start-consultation request
+  - unique (private) and proportional RSS of every worker, from
+    /proc/<pid>/smaps_rollup (Linux only)
+
+Needs gunicorn installed and GROQ_API_KEY set.
+
+Usage:
+    python benchmarks/boot_benchmark.py --workers 4
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import time
+import urllib.request
+
+DOCTOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def post_json(url: str, payload: dict, timeout: float = 120):
+    request = urllib.request.Request(
+        url,
+        data=json.dumps(payload).encode("utf-8"),
+        headers={"Content-Type": "application/json"},
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+def wait_until_up(base_url: str, timeout: float = 60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(f"{base_url}/api/health", timeout=1).read()
+            return
+        except Exception:
+            time.sleep(0.2)
+    raise RuntimeError("Server did not come up in time")
+
+
+def worker_pids(master_pid: int):
+    with open(f"/proc/{master_pid}/task/{master_pid}/children") as f:
+        return [int(pid) for pid in f.read().split()]
+
+
+def memory_kb(pid: int):
+    fields = {}
+    with open(f"/proc/{pid}/smaps_rollup") as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                fields[parts[0][:-1]] = int(parts[1])
+    return {
+        "rss_kb": fields.get("Rss", 0),
+        "pss_kb": fields.get("Pss", 0),
+        "uss_kb": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+
+def run(preload: bool, workers: int, port: int, message: str):
+    env = dict(
+        os.environ,
+        PRELOAD_APP=str(preload).lower(),
+        WARM_LLM_ON_BOOT=str(preload).lower(),
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(port),
+    )
+    server = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"],
+        cwd=DOCTOR_DIR,
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        boot_start = time.perf_counter()
+        wait_until_up(base_url)
+        boot_seconds = time.perf_counter() - boot_start
+
+        start = time.perf_counter()
+        post_json(f"{base_url}/api/start-consultation", {"message": message})
+        first_request = time.perf_counter() - start
+
+        memory = [memory_kb(pid) for pid in worker_pids(server.pid)]
+        return {
+            "preload": preload,
+            "boot_s": boot_seconds,
+            "first_request_s": first_request,
+            "mean_worker_uss_kb": sum(m["uss_kb"] for m in memory) / len(memory),
+            "mean_worker_pss_kb": sum(m["pss_kb"] for m in memory) / len(memory),
+            "workers": memory,
+        }
+    finally:
+        server.send_signal(signal.SIGTERM)
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--message", default="I have had a headache for three days")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    results = [run(preload, args.workers, args.port, args.message) for preload in (False, True)]
+    for result in results:
+        label = "preload+warm" if result["preload"] else "plain"
+        print(
+            f"{label:<13} boot {result['boot_s']:5.2f}s  first request {result['first_request_s']:5.2f}s  "
+            f"worker USS {result['mean_worker_uss_kb'] / 1024:6.1f} MiB  PSS {result['mean_worker_pss_kb'] / 1024:6.1f} MiB"
+        )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
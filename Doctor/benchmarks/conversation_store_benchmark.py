@@ -0,0 +1,101 @@
+"""Measure SQLite conversation store write throughput and reporting query latency.
+
+Feeds synthetic consultations (patient and doctor turns, stage transitions,
+a specialist assessment with token counts) through SQLiteConversationStore's
+batched writer into a temporary database, then times the reporting queries.
+
+Usage:
+    python benchmarks/conversation_store_benchmark.py --messages 2000000
+"""
+import argparse
+import os
+import random
+import shutil
+import tempfile
+import time
+import uuid
+
+from harness import SYNTHETIC_ASSESSMENT, SYNTHETIC_DOCTOR_TURN, SYNTHETIC_PATIENT_TURN
+from utils.conversation_store import SQLiteConversationStore
+
+SPECIALISTS = {
+    "cardiologist": "Dr. Michael Rodriguez",
+    "neurologist": "Dr. David Kim",
+    "dermatologist": "Dr. Maria Garcia",
+    "orthopedist": "Dr. James Thompson",
+    "endocrinologist": "Dr. Lisa Patel",
+}
+
+
+def feed_consultation(store, now: float, max_questions: int) -> int:
+    """Record one consultation spread over the last week; returns messages written"""
+    session_id = str(uuid.uuid4())
+    t = now - random.uniform(0, 7 * 24 * 3600)
+    questions = random.randint(1, max_questions)
+    specialist = random.choice(list(SPECIALISTS))
+    store.record_stage(session_id, t, None, "history_taking")
+    for question in range(1, questions + 1):
+        store.record_message(session_id, t, "Patient", "patient", SYNTHETIC_PATIENT_TURN)
+        t += 2
+        store.record_message(session_id, t, "Dr. Sarah Chen", "response", SYNTHETIC_DOCTOR_TURN,
+                             {"input_tokens": 600, "output_tokens": 40}, question_count=question)
+    store.record_stage(session_id, t, "history_taking", "specialist_handoff", questions, specialist)
+    store.record_message(session_id, t, "Patient", "patient", "Yes, please connect me.")
+    t += 8
+    store.record_message(session_id, t, SPECIALISTS[specialist], "response", SYNTHETIC_ASSESSMENT,
+                         {"input_tokens": 450, "output_tokens": 900})
+    store.record_stage(session_id, t, "specialist_handoff", "specialist_consultation", questions, specialist)
+    store.record_session_end(session_id, t)
+    return questions * 2 + 2
+
+
+def timed(fn, *args, repeat: int = 5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        rows = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, len(rows)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=1_000_000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--max-questions", type=int, default=5)
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="conversation-store-")
+    try:
+        path = os.path.join(directory, "conversations.db")
+        # Large queue so the producer measures the writer, not backpressure drops
+        store = SQLiteConversationStore(path, batch_size=args.batch_size, max_queue=args.messages * 2)
+        now = time.time()
+        written = 0
+        sessions = 0
+        start = time.perf_counter()
+        while written < args.messages:
+            written += feed_consultation(store, now, args.max_questions)
+            sessions += 1
+        store.flush()
+        write_seconds = time.perf_counter() - start
+        store.close()
+
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in os.listdir(directory))
+        print(f"written             : {written:,} messages in {sessions:,} sessions, {write_seconds:.1f}s "
+              f"({written / write_seconds:,.0f} messages/s), {size / 2**20:.0f} MiB")
+
+        day_ago = now - 24 * 3600
+        for label, fn, query_args in (
+            ("per specialist/hour", store.consultations_per_specialist_per_hour, (day_ago,)),
+            ("at question limit", store.sessions_at_question_limit, (args.max_questions, 100)),
+            ("tokens per agent/day", store.tokens_per_agent, (day_ago,)),
+        ):
+            seconds, rows = timed(fn, *query_args)
+            print(f"{label:<20}: {seconds * 1000:7.1f} ms ({rows} rows)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""Sweep the early-triage confidence threshold over logged consultations.
+
+Replays each logged session's patient turns through the live agents once per
+threshold and reports, against a run with early triage disabled:
+  - doctor turns per session and turns saved
+  - how often the chosen specialist still agrees (with the disabled run and
+    with the specialist chosen in the original log)
+  - how many referrals were made early on confidence alone
+
+Only triage is replayed (no specialist call), so a sweep costs roughly one
+history-taking consultation per session and threshold. GROQ_API_KEY must be
+set.
+
+Usage:
+    python benchmarks/early_triage_benchmark.py --log conversation_logs --thresholds 0.95,0.85,0.75
+"""
+import os
+import argparse
+import json
+from concurrent.futures import ThreadPoolExecutor
+
+from replay import parse_session, replay_session
+from utils.transcript_log import TranscriptLog
+from utils.metrics import metrics
+from agents.specialists import SPECIALISTS
+
+DISABLED = 1.01  # above any confidence the doctor can report
+
+
+def sweep(logged: list, router, thresholds: list, concurrency: int, max_questions: int = None):
+    """Replay every session at every threshold.
+
+    Returns {threshold: ([replay, ...] in session order, early referrals)}.
+    """
+    runs = {}
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for threshold in [DISABLED] + thresholds:
+            early = metrics.counters["triage_early_referrals"]
+            replays = list(pool.map(
+                lambda session: replay_session(session, router, False, max_questions, threshold), logged
+            ))
+            runs[threshold] = (replays, metrics.counters["triage_early_referrals"] - early)
+    return runs
+
+
+def compare(logged: list, baseline: list, replays: list, threshold: float, early_referrals: int) -> dict:
+    n = len(logged)
+    turns = sum(r["turns"] for r in replays) / n
+    baseline_turns = sum(r["turns"] for r in baseline) / n
+    with_original = [(s["original"]["specialist"], r["specialist"]) for s, r in zip(logged, replays)
+                     if s["original"]["specialist"]]
+    return {
+        "threshold": threshold,
+        "turns": round(turns, 3),
+        "turns_saved": round(baseline_turns - turns, 3),
+        "agreement_with_disabled": round(
+            sum(b["specialist"] == r["specialist"] for b, r in zip(baseline, replays)) / n, 3
+        ),
+        "agreement_with_log": round(
+            sum(a == b for a, b in with_original) / len(with_original), 3
+        ) if with_original else None,
+        "early_referrals": early_referrals,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default="conversation_logs")
+    parser.add_argument("--thresholds", default="0.95,0.9,0.85,0.8,0.7")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--profile", help="Routing profile for the live run")
+    parser.add_argument("--max-questions", type=int, default=None, help="Override MainDoctor.MAX_QUESTIONS")
+    parser.add_argument("--output", help="Write the sweep report to this JSON file")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.log):
+        sessions = list(TranscriptLog(args.log).iter_sessions())
+    else:
+        with open(args.log, "r") as f:
+            sessions = json.load(f)
+    specialist_keys = {spec["name"]: key for key, spec in SPECIALISTS.items()}
+    logged = [s for s in (parse_session(session, specialist_keys) for session in sessions) if s]
+    if args.limit:
+        logged = logged[:args.limit]
+    if not logged:
+        print(f"No replayable sessions in {args.log}")
+        return
+
+    from utils.groq_client import GroqClient
+    router = GroqClient(routing_profile=args.profile).get_llm()
+    thresholds = [float(value) for value in args.thresholds.split(",")]
+    runs = sweep(logged, router, thresholds, args.concurrency, args.max_questions)
+
+    baseline, _ = runs[DISABLED]
+    report = []
+    for threshold in thresholds:
+        replays, early_referrals = runs[threshold]
+        report.append(compare(logged, baseline, replays, threshold, early_referrals))
+    print(f"sessions: {len(logged)}, early triage disabled: "
+          f"{sum(r['turns'] for r in baseline) / len(logged):.2f} turns/session")
+    print(f"{'threshold':>9}  {'turns':>6}  {'saved':>6}  {'agree/off':>9}  {'agree/log':>9}  {'early':>5}")
+    for row in report:
+        agree_log = f"{row['agreement_with_log']:.0%}" if row["agreement_with_log"] is not None else "n/a"
+        print(f"{row['threshold']:>9.2f}  {row['turns']:>6.2f}  {row['turns_saved']:>+6.2f}  "
+              f"{row['agreement_with_disabled']:>9.0%}  {agree_log:>9}  {row['early_referrals']:>5}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sessions": len(logged), "thresholds": report}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
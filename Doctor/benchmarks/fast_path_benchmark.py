@@ -0,0 +1,183 @@
+"""Compare the fast path (one structured specialist call) with the multi-call path.
+
+Each case is triaged once against the live Groq API (GROQ_API_KEY must be
+set), then both post-referral paths run from the same clinical summary:
+  - multi-call: the specialist assessment, then the doctor's final summary
+  - fast path: specialist.fast_consult, which returns the clinical summary,
+    assessment and patient summary from one forced tool call
+
+Reports latency, input and output tokens and truncations for each path, and
+quality proxies: recommendations and medications extracted from the
+assessment and whether a patient summary came back. With --judge the model
+also picks the better of each pair of assessments (order is randomized).
+
+Usage:
+    python benchmarks/fast_path_benchmark.py --limit 5
+    python benchmarks/fast_path_benchmark.py --judge --output fast_path.json
+"""
+import argparse
+import json
+import random
+
+from harness import (
+    DEFAULT_CASES,
+    QuietLogger,
+    RecordingRouter,
+    build_agents,
+    load_cases,
+    run_case,
+    summarize_calls,
+)
+from batch import NO_MORE_INFO
+from consultation_graph import extract_medications, extract_recommendations
+
+JUDGE_PROMPT = """Two specialist assessments were written for the same patient.
+
+Clinical summary: {summary}
+
+Assessment A:
+{a}
+
+Assessment B:
+{b}
+
+Which assessment is more accurate, complete and useful to the patient? Answer with exactly one letter: A, B, or T for a tie."""
+
+
+def patient_statements(case: dict, turns: int) -> list:
+    """The patient messages run_case sent before triage"""
+    answers = list(case.get("answers", []))
+    statements = [case["message"]]
+    for _ in range(turns - 1):
+        statements.append(answers.pop(0) if answers else NO_MORE_INFO)
+    return statements
+
+
+def quality(assessment: str, final_summary) -> dict:
+    return {
+        "recommendations": len(extract_recommendations(assessment)),
+        "medications": len(set(extract_medications(assessment))),
+        "summary": bool(final_summary),
+        "assessment_chars": len(assessment),
+    }
+
+
+def run_paths(case: dict, router: RecordingRouter, main_doctor, specialists) -> dict:
+    triage = run_case(main_doctor, specialists, case, consult=False)
+    router.take_calls()  # history taking is shared, so it is not compared
+    specialist = specialists.get(triage["specialist"])
+    if specialist is None:
+        return None
+
+    # Multi-call path, as the server runs it after the referral
+    state = {"clinical_summary": triage["clinical_summary"], "specialist_response": ""}
+    specialist.consult(triage["clinical_summary"], state)
+    final_summary = main_doctor.provide_final_summary(state)
+    multi_calls = router.take_calls()
+    multi_assessment = state["specialist_response"]
+
+    fast = specialist.fast_consult(triage["clinical_summary"], patient_statements(case, triage["turns"]))
+    fast_calls = router.take_calls()
+
+    return {
+        "case_id": case.get("case_id"),
+        "specialist": triage["specialist"],
+        "clinical_summary": triage["clinical_summary"],
+        "multi": {"assessment": multi_assessment, "calls": multi_calls,
+                  "quality": quality(multi_assessment, final_summary)},
+        "fast": {"assessment": fast["assessment"], "calls": fast_calls,
+                 "quality": quality(fast["assessment"], fast["final_summary"])},
+    }
+
+
+def judge(llm, result: dict, rng: random.Random) -> str:
+    """'fast', 'multi' or 'tie' according to the model's pairwise preference"""
+    sides = ["multi", "fast"]
+    rng.shuffle(sides)
+    prompt = JUDGE_PROMPT.format(
+        summary=result["clinical_summary"],
+        a=result[sides[0]]["assessment"],
+        b=result[sides[1]]["assessment"],
+    )
+    answer = llm.for_stage("default").invoke([{"role": "user", "content": prompt}]).content.strip().upper()
+    if answer.startswith("A"):
+        return sides[0]
+    if answer.startswith("B"):
+        return sides[1]
+    return "tie"
+
+
+def totals(results: list, path: str) -> dict:
+    n = len(results)
+    calls = [call for result in results for call in result[path]["calls"]]
+    stages = summarize_calls(calls)
+    return {
+        "calls": len(calls) / n,
+        "latency": sum(call["latency"] for call in calls) / n,
+        "input_tokens": sum(call["input_tokens"] for call in calls) / n,
+        "output_tokens": sum(call["output_tokens"] for call in calls) / n,
+        "truncated": sum(entry["truncated"] for entry in stages.values()),
+        "recommendations": sum(r[path]["quality"]["recommendations"] for r in results) / n,
+        "medications": sum(r[path]["quality"]["medications"] for r in results) / n,
+        "summary_rate": sum(r[path]["quality"]["summary"] for r in results) / n,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--profile", help="Routing profile for the live run")
+    parser.add_argument("--judge", action="store_true", help="Ask the model which assessment is better")
+    parser.add_argument("--seed", type=int, default=0, help="Seed for the judge's A/B order")
+    parser.add_argument("--output", help="Write the per-case results to this JSON file")
+    args = parser.parse_args()
+
+    from utils.groq_client import GroqClient
+    llm = GroqClient(routing_profile=args.profile).get_llm()
+    router = RecordingRouter(llm)
+    main_doctor, specialists = build_agents(router, QuietLogger())
+
+    results = []
+    for case in load_cases(args.cases, args.limit):
+        result = run_paths(case, router, main_doctor, specialists)
+        if result is None:
+            print(f"  {case.get('case_id')}: not triaged, skipped")
+            continue
+        results.append(result)
+    if not results:
+        print("No triaged cases to compare")
+        return
+
+    report = {"cases": len(results), "multi": totals(results, "multi"), "fast": totals(results, "fast")}
+    if args.judge:
+        rng = random.Random(args.seed)
+        verdicts = [judge(llm, result, rng) for result in results]
+        for result, verdict in zip(results, verdicts):
+            result["preferred"] = verdict
+        report["preferred"] = {side: verdicts.count(side) for side in ("multi", "fast", "tie")}
+
+    print(f"cases compared: {report['cases']}")
+    print(f"{'':<17} {'multi-call':>10} {'fast path':>10}")
+    for field, label, fmt in (
+        ("calls", "calls/case", ".1f"),
+        ("latency", "LLM latency (s)", ".2f"),
+        ("input_tokens", "input tokens", ".0f"),
+        ("output_tokens", "output tokens", ".0f"),
+        ("truncated", "truncated", "d"),
+        ("recommendations", "recommendations", ".2f"),
+        ("medications", "medications", ".2f"),
+        ("summary_rate", "patient summary", ".0%"),
+    ):
+        print(f"{label:<17} {report['multi'][field]:>10{fmt}} {report['fast'][field]:>10{fmt}}")
+    if args.judge:
+        preferred = report["preferred"]
+        print(f"judge preferred  : multi-call {preferred['multi']}, fast path {preferred['fast']}, tie {preferred['tie']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"report": report, "cases": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""Shared helpers for the offline benchmarks.
+
+Benchmarks are run from the Doctor directory, e.g.
+    python benchmarks/routing_benchmark.py
+"""
+import os
+import sys
+import json
+import time
+
+DOCTOR_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if DOCTOR_DIR not in sys.path:
+    sys.path.insert(0, DOCTOR_DIR)
+
+from batch import QuietLogger, run_case  # re-exported for the benchmarks
+from utils.model_registry import estimate_cost
+
+DEFAULT_CASES = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cases.jsonl")
+
+SYNTHETIC_PATIENT_TURN = "It started about three days ago and gets worse when I climb the stairs at work."
+SYNTHETIC_DOCTOR_TURN = "Thank you. On a scale of 1 to 10, how severe is the pain, and does it spread anywhere?"
+SYNTHETIC_ASSESSMENT = "**Assessment**\n" + "- Consider stable angina; recommend exercise ECG and lipid panel.\n" * 40
+
+
+class RecordingRouter:
+    """Wraps a ModelRouter and records latency and token usage of every call"""
+
+    def __init__(self, router):
+        self.router = router
+        self.calls = []
+
+    def for_stage(self, stage: str, agent: str = None):
+        return _RecordingModel(self, self.router.for_stage(stage, agent), stage, agent)
+
+    def invoke(self, messages):
+        return self.for_stage("default").invoke(messages)
+
+    def take_calls(self):
+        calls, self.calls = self.calls, []
+        return calls
+
+
+class _RecordingModel:
+    def __init__(self, recorder, llm, stage, agent):
+        self.recorder = recorder
+        self.llm = llm
+        self.stage = stage
+        self.agent = agent
+
+    def bind_tools(self, tools, tool_choice=None):
+        return _RecordingModel(self.recorder, self.llm.bind_tools(tools, tool_choice), self.stage, self.agent)
+
+    def invoke(self, messages):
+        start = time.perf_counter()
+        response = self.llm.invoke(messages)
+        usage = getattr(response, "usage_metadata", None) or {}
+        metadata = getattr(response, "response_metadata", None) or {}
+        self.recorder.calls.append({
+            "stage": self.stage,
+            "agent": self.agent,
+            "model": self.llm.model_key,
+            "max_tokens": self.llm.params["max_tokens"],
+            "latency": time.perf_counter() - start,
+            "input_tokens": usage.get("input_tokens", 0),
+            "output_tokens": usage.get("output_tokens", 0),
+            "finish_reason": metadata.get("finish_reason"),
+        })
+        return response
+
+
+def populate_bot(bot, session_id: str, turns: int, specialist: bool = True):
+    """Fill a ServerMedicalBot with a realistic consultation without calling the LLM.
+
+    Every message is a distinct string, as it would be for real patients.
+    """
+    bot.conversation_memory = []
+    bot.logger.messages = []
+    bot.session_state = {
+        "session_id": session_id,
+        "stage": "history_taking",
+        "question_count": 0,
+        "specialist_selected": None,
+        "clinical_summary": None,
+    }
+    for index in range(1, turns + 1):
+        bot.conversation_memory.append({"role": "user", "content": f"{SYNTHETIC_PATIENT_TURN} ({index})"})
+        bot.logger.messages.append((time.time(), "Dr. Sarah Chen", f"{SYNTHETIC_DOCTOR_TURN} ({index})", "response"))
+        bot.session_state["question_count"] = index
+    if specialist:
+        bot.session_state.update({
+            "stage": "specialist_consultation",
+            "specialist_selected": "cardiologist",
+            "next_agent": "cardiologist",
+            "clinical_summary": f"{SYNTHETIC_PATIENT_TURN * 4} ({session_id})",
+        })
+        bot.logger.messages.append(
+            (time.time(), "Dr. Michael Rodriguez", f"{SYNTHETIC_ASSESSMENT} ({session_id})", "response")
+        )
+    return bot
+
+
+def load_cases(path: str = DEFAULT_CASES, limit: int = None):
+    """Read case vignettes from a JSONL file"""
+    cases = []
+    with open(path, "r") as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                cases.append(json.loads(line))
+            if limit and len(cases) >= limit:
+                break
+    return cases
+
+
+def build_agents(llm, logger):
+    """Create the main doctor and specialists around a shared model"""
+    from agents.main_doctor import MainDoctor
+    from agents.specialists import build_specialists
+
+    main_doctor = MainDoctor(llm, logger)
+    specialists = build_specialists(llm, logger)
+    return main_doctor, specialists
+
+
+def summarize_calls(calls):
+    """Aggregate recorded calls into latency, token and cost totals per stage"""
+    stages = {}
+    for call in calls:
+        entry = stages.setdefault(call["stage"], {
+            "calls": 0, "latency": 0.0, "input_tokens": 0, "output_tokens": 0,
+            "cost": 0.0, "truncated": 0,
+        })
+        entry["calls"] += 1
+        entry["latency"] += call["latency"]
+        entry["input_tokens"] += call["input_tokens"]
+        entry["output_tokens"] += call["output_tokens"]
+        entry["truncated"] += call["finish_reason"] == "length"
+        if call["model"]:
+            entry["cost"] += estimate_cost(call["model"], call["input_tokens"], call["output_tokens"])
+    return stages
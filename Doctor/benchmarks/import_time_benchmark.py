@@ -0,0 +1,110 @@
+"""Import-time regression check for server and CLI startup.
+
+Runs `python -X importtime -c "import <module>"` in a fresh interpreter for
+each entry point, sums the cumulative time of the top-level imports and fails
+(exit code 1) when the best of N runs exceeds its threshold.
+
+Usage:
+    python benchmarks/import_time_benchmark.py
+    python benchmarks/import_time_benchmark.py --runs 10 --threshold Doctor:app=400
+"""
+import argparse
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Thresholds in milliseconds, keyed by "<directory>:<module>"
+DEFAULT_THRESHOLDS = {
+    "Doctor:app": 400.0,
+    "Doctor:server_bot": 150.0,
+    "AIML:main": 150.0,
+    "AIML:start": 100.0,
+}
+
+IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _importtime(code: str, cwd: str):
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=cwd,
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1])
+
+    entries = []
+    for line in proc.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            # One leading space marks a top-level import
+            top_level = len(match.group(3)) == 1
+            entries.append((int(match.group(2)) / 1000, match.group(4), top_level))
+    return entries
+
+
+def startup_modules():
+    """Top-level modules the interpreter imports before running any code"""
+    return {name for _, name, top_level in _importtime("pass", REPO_DIR) if top_level}
+
+
+def measure(target: str, ignore: set):
+    """Return (total_ms, [(cumulative_ms, module), ...]) for one fresh interpreter"""
+    directory, module = target.split(":", 1)
+    entries = [
+        entry
+        for entry in _importtime(f"import {module}", os.path.join(REPO_DIR, directory))
+        if not (entry[2] and entry[1] in ignore)
+    ]
+    # Summing only top-level entries avoids double counting nested imports
+    total_ms = sum(cumulative_ms for cumulative_ms, _, top_level in entries if top_level)
+    return total_ms, [(cumulative_ms, name) for cumulative_ms, name, _ in entries]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=8, help="Show the N slowest imports per target")
+    parser.add_argument(
+        "--threshold",
+        action="append",
+        default=[],
+        metavar="DIR:MODULE=MS",
+        help="Override a threshold, or add a new target",
+    )
+    args = parser.parse_args()
+
+    thresholds = dict(DEFAULT_THRESHOLDS)
+    for item in args.threshold:
+        target, value = item.split("=", 1)
+        thresholds[target] = float(value)
+
+    ignore = startup_modules()
+    failures = []
+    for target, limit in thresholds.items():
+        try:
+            runs = [measure(target, ignore) for _ in range(args.runs)]
+        except RuntimeError as e:
+            print(f"FAIL {target:<20} import failed: {e}")
+            failures.append(target)
+            continue
+        best_ms, modules = min(runs, key=lambda run: run[0])
+        median_ms = sorted(run[0] for run in runs)[len(runs) // 2]
+        status = "OK  " if best_ms <= limit else "FAIL"
+        print(f"{status} {target:<20} best {best_ms:7.1f} ms  median {median_ms:7.1f} ms  (limit {limit:.0f} ms)")
+        for cumulative_ms, module in sorted(modules, reverse=True)[: args.top]:
+            print(f"       {cumulative_ms:8.1f} ms  {module}")
+        if best_ms > limit:
+            failures.append(target)
+
+    if failures:
+        print(f"\nStartup check failed for: {', '.join(failures)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
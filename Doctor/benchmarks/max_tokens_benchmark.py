@@ -0,0 +1,80 @@
+"""Measure the effect of per-stage max_tokens caps on latency and tokens.
+
+Replays the case corpus twice against the live Groq API (GROQ_API_KEY must be
+set): once with a uniform cap for every stage (the old global max_tokens=1000)
+and once with the per-stage caps from utils/model_registry.py plus any
+STAGE_MAX_TOKENS overrides. Reports per-stage latency and output token deltas
+and how many completions were truncated.
+
+Usage:
+    python benchmarks/max_tokens_benchmark.py --limit 5
+"""
+import argparse
+import json
+
+from harness import (
+    DEFAULT_CASES,
+    QuietLogger,
+    RecordingRouter,
+    build_agents,
+    load_cases,
+    run_case,
+    summarize_calls,
+)
+from utils.groq_client import GroqClient
+
+
+def replay(cases: list, uniform_max_tokens: int = None):
+    client = GroqClient(uniform_max_tokens=uniform_max_tokens)
+    router = RecordingRouter(client.get_llm())
+    main_doctor, specialists = build_agents(router, QuietLogger())
+    for case in cases:
+        run_case(main_doctor, specialists, case)
+    return summarize_calls(router.take_calls())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--uniform", type=int, default=1000, help="Cap used for the baseline run")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    cases = load_cases(args.cases, args.limit)
+    baseline = replay(cases, uniform_max_tokens=args.uniform)
+    staged = replay(cases)
+
+    report = {}
+    print(f"{'stage':<15} {'latency (s)':>22} {'output tokens/call':>26} {'truncated':>12}")
+    for stage in sorted(set(baseline) | set(staged)):
+        before = baseline.get(stage)
+        after = staged.get(stage)
+        row = {}
+        for label, entry in (("uniform", before), ("staged", after)):
+            if entry:
+                row[label] = {
+                    "calls": entry["calls"],
+                    "mean_latency_s": entry["latency"] / entry["calls"],
+                    "mean_output_tokens": entry["output_tokens"] / entry["calls"],
+                    "truncated": entry["truncated"],
+                }
+        report[stage] = row
+
+        if before and after:
+            u, s = row["uniform"], row["staged"]
+            print(
+                f"{stage:<15} {u['mean_latency_s']:>6.2f} -> {s['mean_latency_s']:>6.2f} "
+                f"({s['mean_latency_s'] - u['mean_latency_s']:+.2f})  "
+                f"{u['mean_output_tokens']:>7.0f} -> {s['mean_output_tokens']:>7.0f} "
+                f"({s['mean_output_tokens'] - u['mean_output_tokens']:+.0f})  "
+                f"{u['truncated']:>4} -> {s['truncated']:<4}"
+            )
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,118 @@
+"""Measure bytes on the wire and serialization CPU for API response payloads.
+
+Builds representative /api/send-message bodies for each consultation stage
+(the specialist stage carries the full assessment, clinical summary and
+every specialist's reply) plus the static /api/specialists list, and compares
+per request:
+  - Flask's default encoder (stdlib json, sorted keys, ASCII escaping)
+  - utils.http_encoding.dumps (orjson when installed)
+  - gzip and brotli (when installed) at the server's settings
+
+CPU is thread time averaged over --iterations runs. No API calls are made.
+
+Usage:
+    python benchmarks/payload_benchmark.py --iterations 2000
+"""
+import argparse
+import json
+import time
+
+from harness import SYNTHETIC_ASSESSMENT, SYNTHETIC_DOCTOR_TURN, SYNTHETIC_PATIENT_TURN
+from utils import http_encoding
+from utils.http_encoding import brotli, compress, dumps, orjson
+
+
+def flask_default_dumps(obj) -> bytes:
+    # What jsonify produced before: DefaultJSONProvider's settings outside debug mode
+    return (json.dumps(obj, ensure_ascii=True, sort_keys=True, separators=(",", ":"), default=str) + "\n").encode()
+
+
+def payloads() -> dict:
+    clinical_summary = " ".join([SYNTHETIC_PATIENT_TURN] * 6)
+    assessments = {
+        "Dr. Michael Rodriguez (Cardiologist)": SYNTHETIC_ASSESSMENT,
+        "Dr. David Kim (Neurologist)": SYNTHETIC_ASSESSMENT.replace("angina", "migraine"),
+    }
+    return {
+        "history_taking": {
+            "success": True, "session_id": "4b1d3c9e-8f8e-4d4c-9a43-0c1f5c2a9e11",
+            "doctor_response": SYNTHETIC_DOCTOR_TURN, "is_question": True,
+            "consultation_stage": "history_taking", "doctor_name": "Dr. Sarah Chen",
+            "question_count": 2, "max_questions": 5,
+        },
+        "specialist_consultation": {
+            "success": True, "session_id": "4b1d3c9e-8f8e-4d4c-9a43-0c1f5c2a9e11",
+            "doctor_response": SYNTHETIC_ASSESSMENT, "is_question": False,
+            "consultation_stage": "specialist_consultation",
+            "specialist_name": "Dr. Michael Rodriguez (Cardiologist)",
+            "clinical_summary": clinical_summary,
+            "specialist_assessment": SYNTHETIC_ASSESSMENT,
+            "recommendations": ["Consider stable angina; recommend exercise ECG and lipid panel."] * 5,
+            "medications": ["Aspirin", "Nitroglycerin"],
+            "specialist_assessments": assessments,
+            "is_specialist": True,
+        },
+        "specialists": {
+            "success": True,
+            "specialists": [
+                {"id": "neurologist", "name": "Dr. David Kim", "specialty": "Neurologist",
+                 "experience": "15+ years", "rating": 4.9, "avatar": "🧠"},
+                {"id": "cardiologist", "name": "Dr. Michael Rodriguez", "specialty": "Cardiologist",
+                 "experience": "12+ years", "rating": 4.8, "avatar": "❤️"},
+                {"id": "general", "name": "Dr. Sarah Chen", "specialty": "General Medicine",
+                 "experience": "10+ years", "rating": 4.7, "avatar": "🩺"},
+            ],
+        },
+    }
+
+
+def cpu_per_call(fn, arg, iterations: int) -> float:
+    start = time.thread_time()
+    for _ in range(iterations):
+        fn(arg)
+    return (time.thread_time() - start) / iterations
+
+
+def measure(payload: dict, iterations: int) -> dict:
+    baseline = flask_default_dumps(payload)
+    fast = dumps(payload)
+    row = {
+        "default_bytes": len(baseline),
+        "fast_bytes": len(fast),
+        "default_us": cpu_per_call(flask_default_dumps, payload, iterations) * 1e6,
+        "fast_us": cpu_per_call(dumps, payload, iterations) * 1e6,
+        "compressed": len(fast) >= http_encoding.COMPRESSION_MIN_BYTES,
+    }
+    for encoding in ("gzip", "br") if brotli is not None else ("gzip",):
+        row[f"{encoding}_bytes"] = len(compress(fast, encoding))
+        row[f"{encoding}_us"] = cpu_per_call(lambda body: compress(body, encoding), fast, iterations) * 1e6
+    return row
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--output", help="Write the measurements to this JSON file")
+    args = parser.parse_args()
+
+    print(f"encoder: {'orjson' if orjson is not None else 'stdlib json'}, "
+          f"brotli: {'yes' if brotli is not None else 'not installed'}, "
+          f"compression threshold: {http_encoding.COMPRESSION_MIN_BYTES} bytes")
+    report = {}
+    for name, payload in payloads().items():
+        row = report[name] = measure(payload, args.iterations)
+        sent = min(row.get("br_bytes", row["gzip_bytes"]), row["gzip_bytes"]) if row["compressed"] else row["fast_bytes"]
+        print(f"{name}:")
+        print(f"  bytes  default {row['default_bytes']:>7}  fast {row['fast_bytes']:>7}  "
+              f"gzip {row['gzip_bytes']:>7}" + (f"  br {row['br_bytes']:>7}" if "br_bytes" in row else "")
+              + f"  -> sent {sent} ({sent / row['default_bytes']:.0%} of default)")
+        print(f"  cpu µs default {row['default_us']:>7.1f}  fast {row['fast_us']:>7.1f}  "
+              f"gzip {row['gzip_us']:>7.1f}" + (f"  br {row['br_us']:>7.1f}" if "br_us" in row else ""))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
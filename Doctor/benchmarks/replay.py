@@ -0,0 +1,284 @@
+"""Replay logged consultations through the current agents and diff the outcome.
+
+Reads sessions from the conversation log directory (or a legacy
+conversation_log.json array), feeds each session's logged
+patient turns back through MainDoctor and the specialists, and compares the
+replay with the original run on:
+  - doctor turns before triage and questions asked
+  - the specialist chosen
+  - output tokens (estimated from message length, since the log holds text only)
+  - LLM latency (the original is the gap between each agent message and the
+    entry logged before it)
+
+With --stand-in no API calls are made: the doctor's logged replies are played
+back, and the referral is issued at the original turn or as soon as the
+current question budget is spent. This isolates changes to MAX_QUESTIONS and
+the consultation flow. Without it the live Groq API is used (GROQ_API_KEY
+must be set), optionally with another routing profile, to measure prompt or
+model changes.
+
+Only sessions logged with patient turns can be replayed.
+
+Usage:
+    python benchmarks/replay.py --log conversation_logs --stand-in --max-questions 3
+    python benchmarks/replay.py --profile fast_history --concurrency 8 --output replay.json
+"""
+import os
+import argparse
+import json
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from harness import QuietLogger, RecordingRouter, build_agents, run_case, summarize_calls
+from utils.conversation_logger import PATIENT
+from utils.model_registry import load_max_tokens, resolve_max_tokens
+from utils.transcript_log import TranscriptLog
+from agents.main_doctor import NAME as MAIN_DOCTOR
+from agents.specialists import SPECIALISTS
+
+GENERIC_QUESTION = "Is there anything else about your symptoms that you have noticed?"
+
+
+def estimate_tokens(text: str) -> int:
+    # Roughly four characters per token for English text
+    return (len(text) + 3) // 4 if text else 0
+
+
+def parse_session(session: dict, specialist_keys: dict):
+    """Split a logged session into patient turns and the original outcome.
+
+    Returns None when the session has no patient turns to replay.
+    """
+    turns = []
+    specialist = None
+    specialist_response = None
+    latency = 0.0
+    output_tokens = 0
+    previous = None
+    for entry in session.get("messages", []):
+        timestamp = datetime.fromisoformat(entry["timestamp"]).timestamp()
+        agent = entry["agent"]
+        if agent == PATIENT:
+            turns.append({"patient": entry["message"], "doctor": None})
+        elif agent == MAIN_DOCTOR or agent in specialist_keys:
+            if previous is not None:
+                latency += timestamp - previous
+            output_tokens += estimate_tokens(entry["message"])
+            if agent == MAIN_DOCTOR:
+                if turns and turns[-1]["doctor"] is None:
+                    turns[-1]["doctor"] = entry["message"]
+            else:
+                # Anything after the specialist (e.g. the CLI's final summary) is not replayed
+                specialist = specialist_keys[agent]
+                specialist_response = entry["message"]
+                break
+        previous = timestamp
+
+    if not turns:
+        return None
+
+    # The referral is the last doctor reply before the specialist spoke
+    answered = [index for index, turn in enumerate(turns) if turn["doctor"] is not None]
+    triage_turn = answered[-1] if specialist and answered else None
+    return {
+        "session_id": session.get("session_id"),
+        "turns": turns,
+        "original": {
+            "turns": (triage_turn + 1) if triage_turn is not None else len(answered),
+            "questions": sum(1 for turn in turns if turn["doctor"] and "?" in turn["doctor"]),
+            "specialist": specialist,
+            "output_tokens": output_tokens,
+            "latency": latency,
+        },
+        "triage_turn": triage_turn,
+        "specialist_response": specialist_response,
+    }
+
+
+class StandInRouter:
+    """Plays back a session's logged replies in place of the LLM"""
+
+    def __init__(self, logged: dict, latency: float = 0.0):
+        self.logged = logged
+        self.latency = latency
+        self.max_tokens = load_max_tokens()
+        self.doctor_calls = 0
+
+    def for_stage(self, stage: str, agent: str = None):
+        return _StandInModel(self, stage, agent)
+
+    def invoke(self, messages):
+        return self.for_stage("default").invoke(messages)
+
+
+class _StandInResponse:
+    def __init__(self, content: str, messages: list, tool_calls=None):
+        self.content = content
+        self.tool_calls = tool_calls or []
+        # Estimated the same way as the original run so the two are comparable
+        self.usage_metadata = {
+            "input_tokens": sum(estimate_tokens(m["content"]) for m in messages),
+            "output_tokens": estimate_tokens(content),
+        }
+        self.response_metadata = {"finish_reason": "tool_calls" if tool_calls else "stop"}
+
+
+class _StandInModel:
+    model_key = None
+
+    def __init__(self, router, stage, agent):
+        self.router = router
+        self.stage = stage
+        self.agent = agent
+        self.params = {"max_tokens": resolve_max_tokens(router.max_tokens, stage, agent)}
+
+    def bind_tools(self, tools, tool_choice=None):
+        return self
+
+    def invoke(self, messages):
+        if self.router.latency:
+            time.sleep(self.router.latency)
+        logged = self.router.logged
+        if self.agent != "main_doctor":
+            return _StandInResponse(logged["specialist_response"] or "", messages)
+
+        turn = self.router.doctor_calls
+        self.router.doctor_calls += 1
+        specialist = logged["original"]["specialist"]
+        turns = logged["turns"]
+        original = turns[turn]["doctor"] if turn < len(turns) else None
+        if specialist and (turn >= logged["triage_turn"] or self.stage == "triage"):
+            referral = turns[logged["triage_turn"]]["doctor"]
+            summary = " ".join(t["patient"] for t in turns[:turn + 1])
+            return _StandInResponse(referral, messages, [{
+                "name": f"consult_{specialist}",
+                "args": {"summary": summary},
+                "id": f"replay-{turn}",
+            }])
+        return _StandInResponse(original or GENERIC_QUESTION, messages)
+
+
+def replay_session(logged: dict, router, consult: bool, max_questions: int = None,
+                   confidence_threshold: float = None):
+    recorder = RecordingRouter(router)
+    main_doctor, specialists = build_agents(recorder, QuietLogger())
+    if max_questions is not None:
+        main_doctor.MAX_QUESTIONS = max_questions
+    if confidence_threshold is not None:
+        main_doctor.confidence_threshold = confidence_threshold
+    case = {
+        "case_id": logged["session_id"],
+        "message": logged["turns"][0]["patient"],
+        "answers": [turn["patient"] for turn in logged["turns"][1:]],
+    }
+    result = run_case(main_doctor, specialists, case, consult=consult)
+    calls = recorder.take_calls()
+    return {
+        "turns": result["turns"],
+        "questions": result["questions"],
+        "specialist": result["specialist"],
+        "triage_confidence": result["triage_confidence"],
+        "output_tokens": sum(call["output_tokens"] for call in calls),
+        "latency": sum(call["latency"] for call in calls),
+        "calls": calls,
+    }
+
+
+def diff_session(logged: dict, replayed: dict) -> dict:
+    original = logged["original"]
+    return {
+        "session_id": logged["session_id"],
+        "turns": [original["turns"], replayed["turns"]],
+        "questions": [original["questions"], replayed["questions"]],
+        "specialist": [original["specialist"], replayed["specialist"]],
+        "specialist_changed": original["specialist"] != replayed["specialist"],
+        "output_tokens": [original["output_tokens"], replayed["output_tokens"]],
+        "latency_s": [round(original["latency"], 3), round(replayed["latency"], 3)],
+    }
+
+
+def print_report(diffs: list, stages: dict):
+    n = len(diffs)
+
+    def mean(field, side):
+        return sum(d[field][side] for d in diffs) / n
+
+    changed = sum(d["specialist_changed"] for d in diffs)
+    print(f"sessions replayed  : {n}")
+    print(f"triage changed     : {changed} ({changed / n:.0%})")
+    for field, label, fmt in (
+        ("turns", "turns/session", ".2f"),
+        ("questions", "questions/session", ".2f"),
+        ("output_tokens", "output tokens", ".0f"),
+        ("latency_s", "LLM latency (s)", ".2f"),
+    ):
+        before, after = mean(field, 0), mean(field, 1)
+        print(f"{label:<19}: {before:{fmt}} -> {after:{fmt}} ({after - before:+{fmt}})")
+    for stage, entry in sorted(stages.items()):
+        print(f"  {stage:<15} {entry['calls']:>5} calls  {entry['latency'] / entry['calls']:.2f}s mean  "
+              f"{entry['output_tokens']} output tokens  {entry['truncated']} truncated")
+    for d in diffs:
+        if d["specialist_changed"]:
+            print(f"  {d['session_id']}: {d['specialist'][0]} -> {d['specialist'][1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--log", default="conversation_logs")
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--stand-in", action="store_true", help="Play back logged replies instead of calling the LLM")
+    parser.add_argument("--stand-in-latency", type=float, default=0.0, help="Seconds each stand-in call sleeps")
+    parser.add_argument("--profile", help="Routing profile for the live run")
+    parser.add_argument("--max-questions", type=int, default=None, help="Override MainDoctor.MAX_QUESTIONS")
+    parser.add_argument("--confidence-threshold", type=float, default=None,
+                        help="Override the early-triage confidence threshold (above 1 disables it)")
+    parser.add_argument("--no-consult", action="store_true", help="Stop after triage without asking the specialist")
+    parser.add_argument("--output", help="Write the per-session diff report to this JSON file")
+    args = parser.parse_args()
+
+    if os.path.isdir(args.log):
+        sessions = list(TranscriptLog(args.log).iter_sessions())
+    else:
+        with open(args.log, "r") as f:
+            sessions = json.load(f)
+
+    # Specialist names as they appear in the log
+    specialist_keys = {spec["name"]: key for key, spec in SPECIALISTS.items()}
+
+    logged = [s for s in (parse_session(session, specialist_keys) for session in sessions) if s]
+    skipped = len(sessions) - len(logged)
+    if args.limit:
+        logged = logged[:args.limit]
+    if not logged:
+        print(f"No replayable sessions in {args.log} ({skipped} without patient turns)")
+        return
+
+    live_router = None
+    if not args.stand_in:
+        from utils.groq_client import GroqClient
+        live_router = GroqClient(routing_profile=args.profile).get_llm()
+
+    def run(session):
+        router = live_router or StandInRouter(session, args.stand_in_latency)
+        return session, replay_session(
+            session, router, not args.no_consult, args.max_questions, args.confidence_threshold
+        )
+
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        results = list(pool.map(run, logged))
+
+    diffs = [diff_session(session, replayed) for session, replayed in results]
+    stages = summarize_calls([call for _, replayed in results for call in replayed["calls"]])
+    if skipped:
+        print(f"skipped {skipped} sessions without patient turns")
+    print_report(diffs, stages)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"sessions": diffs, "stages": stages}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
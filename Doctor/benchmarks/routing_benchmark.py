@@ -0,0 +1,112 @@
+"""Compare model routing profiles on latency, cost and triage agreement.
+
+Runs every case vignette through each routing profile against the live Groq
+API (GROQ_API_KEY must be set) and reports, per profile:
+  - mean end-to-end latency per case and per stage
+  - estimated cost per case
+  - triage agreement with the baseline profile and with the expected specialist
+
+Usage:
+    python benchmarks/routing_benchmark.py --profiles single fast_history --limit 5
+"""
+import argparse
+import json
+
+from harness import (
+    DEFAULT_CASES,
+    QuietLogger,
+    RecordingRouter,
+    build_agents,
+    load_cases,
+    run_case,
+    summarize_calls,
+)
+from utils.groq_client import GroqClient
+from utils.model_registry import ROUTING_PROFILES
+
+
+def benchmark_profile(profile: str, cases: list):
+    router = RecordingRouter(GroqClient(routing_profile=profile).get_llm())
+    main_doctor, specialists = build_agents(router, QuietLogger())
+
+    results = []
+    for case in cases:
+        result = run_case(main_doctor, specialists, case)
+        result["calls"] = router.take_calls()
+        results.append(result)
+    return results
+
+
+def report(profile: str, results: list, baseline: dict):
+    calls = [call for result in results for call in result["calls"]]
+    stages = summarize_calls(calls)
+    count = len(results)
+    total_cost = sum(stage["cost"] for stage in stages.values())
+
+    expected = [r for r in results if r["expected_specialist"]]
+    expected_hits = sum(1 for r in expected if r["specialist"] == r["expected_specialist"])
+    baseline_hits = sum(
+        1 for r in results if baseline.get(r["case_id"]) == r["specialist"]
+    )
+
+    summary = {
+        "profile": profile,
+        "cases": count,
+        "mean_latency_s": sum(r["elapsed"] for r in results) / count,
+        "mean_turns": sum(r["turns"] for r in results) / count,
+        "cost_per_case_usd": total_cost / count,
+        "agreement_with_baseline": baseline_hits / count,
+        "agreement_with_expected": expected_hits / len(expected) if expected else None,
+        "stages": {
+            name: {
+                "calls": stage["calls"],
+                "mean_latency_s": stage["latency"] / stage["calls"],
+                "input_tokens": stage["input_tokens"],
+                "output_tokens": stage["output_tokens"],
+                "cost_usd": stage["cost"],
+            }
+            for name, stage in stages.items()
+        },
+    }
+
+    print(f"\n=== {profile} ===")
+    print(f"mean latency/case : {summary['mean_latency_s']:.2f}s over {summary['mean_turns']:.1f} turns")
+    print(f"cost/case         : ${summary['cost_per_case_usd']:.5f}")
+    print(f"agree w/ baseline : {summary['agreement_with_baseline']:.0%}")
+    if summary["agreement_with_expected"] is not None:
+        print(f"agree w/ expected : {summary['agreement_with_expected']:.0%}")
+    for name, stage in summary["stages"].items():
+        print(
+            f"  {name:<15} {stage['calls']:>4} calls  {stage['mean_latency_s']:.2f}s avg  "
+            f"{stage['input_tokens']:>7} in / {stage['output_tokens']:>6} out  ${stage['cost_usd']:.5f}"
+        )
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--cases", default=DEFAULT_CASES)
+    parser.add_argument("--limit", type=int, default=None)
+    parser.add_argument("--profiles", nargs="+", default=list(ROUTING_PROFILES))
+    parser.add_argument("--baseline", default="single")
+    parser.add_argument("--output", help="Write the JSON report to this file")
+    args = parser.parse_args()
+
+    cases = load_cases(args.cases, args.limit)
+    profiles = [args.baseline] + [p for p in args.profiles if p != args.baseline]
+
+    baseline = {}
+    summaries = []
+    for profile in profiles:
+        results = benchmark_profile(profile, cases)
+        if profile == args.baseline:
+            baseline = {r["case_id"]: r["specialist"] for r in results}
+        summaries.append(report(profile, results, baseline))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(summaries, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
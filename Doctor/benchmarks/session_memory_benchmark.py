@@ -0,0 +1,56 @@
+"""Report the memory footprint of live sessions with tracemalloc.
+
+Creates N mid-consultation sessions in a SessionManager (no snapshot store)
+and reports the traced bytes per session at 1k, 10k and 100k sessions.
+Agents, prompts and the LLM client are shared per process and are not
+created here, so the figure is the true per-session cost.
+
+Usage:
+    python benchmarks/session_memory_benchmark.py --sizes 1000 10000 100000
+"""
+import argparse
+import gc
+import time
+import tracemalloc
+import uuid
+
+from harness import populate_bot
+from server_bot import ServerMedicalBot
+from session_manager import SessionManager, SessionRecord
+
+
+def bytes_per_session(count: int, turns: int, specialist: bool) -> float:
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    manager = SessionManager()
+    for _ in range(count):
+        session_id = str(uuid.uuid4())
+        bot = populate_bot(ServerMedicalBot(), session_id, turns, specialist=specialist)
+        # Insert directly so the timing of expiry sweeps does not matter here
+        now = time.time()
+        manager.sessions[session_id] = SessionRecord(bot, bot.session_state["stage"], now, now)
+
+    gc.collect()
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del manager
+    return (after - before) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000])
+    parser.add_argument("--turns", type=int, default=4)
+    parser.add_argument("--history-only", action="store_true",
+                        help="Sessions still in history taking (no specialist assessment)")
+    args = parser.parse_args()
+
+    for count in args.sizes:
+        per_session = bytes_per_session(count, args.turns, not args.history_only)
+        print(f"{count:>8} sessions: {per_session:,.0f} bytes/session ({per_session * count / 2**20:,.1f} MiB total)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""Measure session snapshot cost per turn and restore throughput.
+
+Builds ServerMedicalBot sessions shaped like real consultations (patient
+turns, doctor questions, a multi-kilobyte specialist assessment) without
+calling the LLM, snapshots them at every turn boundary into a temporary
+FileSessionStore, then restores N sessions through SessionManager with
+ServerMedicalBot.from_snapshot, the way a freshly restarted worker would.
+
+Usage:
+    python benchmarks/session_snapshot_benchmark.py --sessions 100000
+"""
+import argparse
+import shutil
+import tempfile
+import time
+import uuid
+
+from harness import populate_bot
+from server_bot import ServerMedicalBot
+from session_manager import SessionManager
+from session_store import FileSessionStore, encode_snapshot
+
+
+def percentile(samples, fraction):
+    samples = sorted(samples)
+    return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=100_000)
+    parser.add_argument("--turns", type=int, default=6)
+    parser.add_argument("--turn-sample", type=int, default=2_000,
+                        help="Sessions whose every turn is snapshotted and timed")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="session-snapshots-")
+    try:
+        store = FileSessionStore(directory)
+        writer = SessionManager(store=store)
+
+        # Per-turn snapshot cost on a sample of full consultations
+        turn_costs = []
+        sizes = []
+        session_ids = []
+        for _ in range(min(args.turn_sample, args.sessions)):
+            session_id = str(uuid.uuid4())
+            bot = populate_bot(ServerMedicalBot(), session_id, 0, specialist=False)
+            writer.create_session(session_id, bot, {"stage": "history_taking"})
+            for index in range(1, args.turns + 1):
+                populate_bot(bot, session_id, index, specialist=index == args.turns)
+                start = time.perf_counter()
+                writer.update_session(session_id, {"stage": bot.session_state["stage"]})
+                turn_costs.append(time.perf_counter() - start)
+            sizes.append(len(encode_snapshot(bot.to_snapshot())))
+            session_ids.append(session_id)
+
+        # Fill the rest of the store with final-state snapshots
+        template = populate_bot(ServerMedicalBot(), "template", args.turns).to_snapshot()
+        now = time.time()
+        for _ in range(args.sessions - len(session_ids)):
+            session_id = str(uuid.uuid4())
+            store.save(session_id, {
+                "stage": "specialist_consultation",
+                "created_at": now,
+                "last_activity": now,
+                "bot": template,
+            })
+            session_ids.append(session_id)
+
+        # Restore everything as a restarted worker would
+        reader = SessionManager(store=store, restore_bot=ServerMedicalBot.from_snapshot)
+        start = time.perf_counter()
+        restored = sum(1 for session_id in session_ids if reader.get_session(session_id) is not None)
+        restore_seconds = time.perf_counter() - start
+
+        print(f"snapshot size      : {sum(sizes) / len(sizes) / 1024:.1f} KiB (final state)")
+        print(f"snapshot per turn  : p50 {percentile(turn_costs, 0.5) * 1e6:.0f} us  "
+              f"p95 {percentile(turn_costs, 0.95) * 1e6:.0f} us  ({len(turn_costs)} turns)")
+        print(f"restore            : {restored} sessions in {restore_seconds:.2f}s "
+              f"({restored / restore_seconds:,.0f} sessions/s)")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
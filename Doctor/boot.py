@@ -0,0 +1,69 @@
+"""Worker boot hooks for running the server under gunicorn with --preload.
+
+preload_shared_state() runs once in the master before fork: it imports the
+agent modules and builds everything that never changes between sessions
+(prompts, tool schemas, lexicons, the model router and the agents, none of
+which hold a connection), then freezes the GC so those objects are not
+touched by collections and their pages stay shared copy-on-write.
+
+warm_worker() runs in each worker after fork and, on a background thread so
+it never holds up the worker's boot, opens that worker's own LLM connections
+before the first patient request arrives.
+"""
+import gc
+import os
+import time
+import logging
+import threading
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Bound on the warm-up's provider call; a slow provider is met by the first request instead
+WARM_UP_TIMEOUT_SECONDS = float(os.environ.get("WARM_LLM_TIMEOUT_SECONDS", 5))
+
+
+def preload_shared_state():
+    """Import and build the immutable parts of the bot in the master process"""
+    start = time.perf_counter()
+
+    # Importing the modules builds their prompts, tool schemas and lexicons
+    import server_bot
+    from agents import main_doctor, specialists  # noqa: F401
+    import langchain_groq  # noqa: F401
+    import langgraph.graph  # noqa: F401
+
+    # The client and agents carry no connections; chat models are built per worker
+    try:
+        server_bot.get_shared_agents()
+    except Exception as e:
+        logger.warning(f"Agents not preloaded, each worker builds its own: {str(e)}")
+
+    # Move everything allocated so far out of the collector's reach
+    gc.collect()
+    gc.freeze()
+
+    logger.info(
+        f"Preloaded shared state in {time.perf_counter() - start:.2f}s "
+        f"({gc.get_freeze_count()} objects frozen)"
+    )
+
+
+def warm_worker():
+    """Build this worker's chat models and open its provider connections, off the boot path"""
+    if os.environ.get("WARM_LLM_ON_BOOT", "true").lower() != "true":
+        return
+    threading.Thread(target=_warm, name="llm-warmup", daemon=True).start()
+
+
+def _warm():
+    from utils.groq_client import get_shared_client
+
+    start = time.perf_counter()
+    try:
+        get_shared_client().warm_up(WARM_UP_TIMEOUT_SECONDS)
+    except Exception as e:
+        logger.warning(f"Worker {os.getpid()} warm-up failed: {str(e)}")
+    metrics.observe("worker_warmup_seconds", time.perf_counter() - start)
+    logger.info(f"Worker {os.getpid()} warmed in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,363 @@
+"""The consultation flow as one compiled LangGraph graph.
+
+    history_taking --(triaged)--> specialist x N --+--> extract
+                 |                                 +--> summary (optional)
+                 +--(triaged, fast path)--> fast_consult --> extract
+
+Each invoke runs one patient turn from the stage stored in the state: a
+history-taking turn either asks a question or triages (stage becomes
+specialist_handoff); the next turn fans out to every referred specialist in
+parallel, then extraction and the final summary run side by side. The server
+drives a turn per request and the CLI drives the same two phases back to
+back, so both run the same flow. With fast_path set, the referral is followed
+in the same turn by one structured call to the primary specialist that
+returns the clinical summary, assessment and patient summary together.
+
+State is plain data. With a checkpointer the graph keeps each session's state
+under thread_id = session_id, so a turn can resume on any worker that shares
+the saver; without one the caller passes the state it holds (the server's
+session snapshot) and stores what comes back.
+"""
+import os
+import re
+import threading
+from contextlib import contextmanager
+from functools import partial
+from typing import Annotated, Dict, List, Optional, TypedDict
+
+# Lexicons for pulling medications and recommendations out of specialist replies
+MEDICATION_PATTERNS = [
+    re.compile(r'(?:take|consider|try|use)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:\d+\s*mg)?', re.IGNORECASE),
+    re.compile(r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*\d+\s*mg', re.IGNORECASE),
+    re.compile(r'over-the-counter\s+([a-z]+(?:\s+[a-z]+)*)', re.IGNORECASE),
+]
+OTC_MEDICATIONS = ('ibuprofen', 'acetaminophen', 'aspirin', 'naproxen', 'antihistamine')
+RECOMMENDATION_KEYWORDS = ('recommend', 'suggest', 'advise', 'should')
+
+COMPLETED_MESSAGE = "Consultation completed. Please start a new session for additional concerns."
+
+
+def extract_medications(response: str) -> List[str]:
+    """Extract medication suggestions from a specialist response"""
+    medications = []
+
+    # Look for common medication patterns
+    for pattern in MEDICATION_PATTERNS:
+        medications.extend(pattern.findall(response))
+
+    # Common OTC medications
+    response_lower = response.lower()
+    for med in OTC_MEDICATIONS:
+        if med in response_lower:
+            medications.append(med.title())
+
+    return list(set(medications))  # Remove duplicates
+
+
+def extract_recommendations(response: str) -> List[str]:
+    """Extract recommendations from a specialist response"""
+    recommendations = []
+
+    for line in response.split('\n'):
+        if any(keyword in line.lower() for keyword in RECOMMENDATION_KEYWORDS):
+            clean_line = line.strip('- •').strip()
+            if clean_line and len(clean_line) > 10:
+                recommendations.append(clean_line)
+
+    return recommendations[:5]  # Limit to top 5
+
+
+def _merge(left: Optional[dict], right: Optional[dict]) -> dict:
+    return {**(left or {}), **(right or {})}
+
+
+class ConsultationState(TypedDict, total=False):
+    session_id: str
+    stage: str
+    patient_message: Optional[str]
+    memory: List[dict]
+    question_count: int
+    doctor_response: str
+    follow_up: Optional[str]
+    triaged: bool
+    # The doctor's latest self-assessment: confidence in a referral and the key facts still missing
+    triage_confidence: Optional[float]
+    missing_facts: List[str]
+    clinical_summary: Optional[str]
+    # Specialist keys in the order the doctor referred; the first is the primary
+    referrals: List[str]
+    specialist_selected: Optional[str]
+    # Written concurrently by the specialist fan-out, hence the reducer
+    specialist_responses: Annotated[Dict[str, str], _merge]
+    specialist_response: Optional[str]
+    medications: List[str]
+    recommendations: List[str]
+    with_summary: bool
+    fast_path: bool
+    final_summary: Optional[str]
+    # Emergency categories the patient has already been told to seek care for
+    emergency_alerts: List[str]
+
+
+class ConsultationGraph:
+    """Compiled consultation graph over a main doctor and its specialists"""
+
+    def __init__(self, main_doctor, specialists: dict, checkpointer=None):
+        self.main_doctor = main_doctor
+        self.specialists = specialists
+        self.checkpointer = checkpointer
+        self.graph = self._compile()
+
+    def _compile(self):
+        # Imported here so the server and CLI start without loading langgraph
+        from langchain_core.runnables import RunnableLambda
+        from langgraph.graph import END, START, StateGraph
+        try:
+            from langgraph.types import Send
+        except ImportError:  # older langgraph releases
+            from langgraph.constants import Send
+        self._send = Send
+        self._end = END
+
+        builder = StateGraph(ConsultationState)
+        # LLM nodes carry an async twin that streams, used when the graph runs on an event loop
+        builder.add_node("history_taking", RunnableLambda(self._history_taking, afunc=self._ahistory_taking))
+        builder.add_node("specialist", RunnableLambda(self._specialist, afunc=self._aspecialist))
+        builder.add_node("fast_consult", RunnableLambda(self._fast_consult, afunc=self._afast_consult))
+        builder.add_node("extract", self._extract)
+        builder.add_node("summary", RunnableLambda(self._summary, afunc=self._asummary))
+        builder.add_node("complete", self._complete)
+
+        builder.add_conditional_edges(
+            START, self._route_turn, ["history_taking", "specialist", "fast_consult", "complete"]
+        )
+        builder.add_conditional_edges("history_taking", self._route_after_history, ["fast_consult", END])
+        builder.add_edge("fast_consult", "extract")
+        builder.add_conditional_edges("specialist", self._route_after_specialists, ["extract", "summary"])
+        builder.add_edge("extract", END)
+        builder.add_edge("summary", END)
+        builder.add_edge("complete", END)
+        return builder.compile(checkpointer=self.checkpointer)
+
+    def run_turn(self, session_id: str, message: Optional[str], state: Optional[dict] = None,
+                 logger=None, with_summary: bool = False, fast_path: bool = False) -> dict:
+        """Run one turn and return the session's full state afterwards.
+
+        `state` may be omitted when a checkpointer holds the session.
+        """
+        inputs = dict(state or {})
+        inputs.update(session_id=session_id, patient_message=message, with_summary=with_summary, fast_path=fast_path)
+        # The logger is a live object, so it travels in the config rather than the checkpointed state
+        config = {"configurable": {"thread_id": session_id, "logger": logger}}
+        return self.graph.invoke(inputs, config)
+
+    async def arun_turn(self, session_id: str, message: Optional[str], state: Optional[dict] = None,
+                        logger=None, with_summary: bool = False, on_token=None, fast_path: bool = False) -> dict:
+        """run_turn on the event loop, streaming replies as they are generated.
+
+        on_token(agent_name, text) receives each chunk, then (agent_name, None)
+        once that agent is done; parallel specialists stream concurrently.
+        Cancelling the awaiting task aborts the requests in flight.
+        """
+        inputs = dict(state or {})
+        inputs.update(session_id=session_id, patient_message=message, with_summary=with_summary, fast_path=fast_path)
+        config = {"configurable": {"thread_id": session_id, "logger": logger, "on_token": on_token}}
+        return await self.graph.ainvoke(inputs, config)
+
+    # Routing
+
+    def _route_turn(self, state: ConsultationState):
+        stage = state.get("stage", "history_taking")
+        if stage == "history_taking":
+            return "history_taking"
+        if stage == "specialist_handoff":
+            if self._fast_path_ready(state):
+                return "fast_consult"
+            return [
+                self._send("specialist", {"specialist": key, "clinical_summary": state.get("clinical_summary") or ""})
+                for key in state.get("referrals", [])
+                if key in self.specialists
+            ] or "complete"
+        return "complete"
+
+    def _route_after_history(self, state: ConsultationState):
+        return "fast_consult" if state.get("triaged") and self._fast_path_ready(state) else self._end
+
+    def _fast_path_ready(self, state: ConsultationState) -> bool:
+        return bool(state.get("fast_path")) and state.get("specialist_selected") in self.specialists
+
+    def _route_after_specialists(self, state: ConsultationState):
+        return ["extract", "summary"] if state.get("with_summary") else ["extract"]
+
+    # Nodes
+
+    def _history_taking(self, state: ConsultationState, config):
+        memory, scratch = _history_inputs(state)
+        result = self.main_doctor.ask_or_triage(state["patient_message"], memory, scratch, _logger(config))
+        return _history_update(memory, scratch, result)
+
+    async def _ahistory_taking(self, state: ConsultationState, config):
+        memory, scratch = _history_inputs(state)
+        with _streaming(config, self.main_doctor.name) as on_token:
+            result = await self.main_doctor.aask_or_triage(
+                state["patient_message"], memory, scratch, _logger(config), on_token
+            )
+        return _history_update(memory, scratch, result)
+
+    def _specialist(self, request: dict, config):
+        key = request["specialist"]
+        specialist_state = {}
+        self.specialists[key].consult(request["clinical_summary"], specialist_state, _logger(config))
+        return {"specialist_responses": {key: specialist_state["specialist_response"]}}
+
+    async def _aspecialist(self, request: dict, config):
+        key = request["specialist"]
+        specialist = self.specialists[key]
+        specialist_state = {}
+        with _streaming(config, specialist.name) as on_token:
+            await specialist.aconsult(request["clinical_summary"], specialist_state, _logger(config), on_token)
+        return {"specialist_responses": {key: specialist_state["specialist_response"]}}
+
+    def _fast_consult(self, state: ConsultationState, config):
+        specialist = self.specialists[state["specialist_selected"]]
+        result = specialist.fast_consult(
+            state.get("clinical_summary") or "", _patient_statements(state), _logger(config)
+        )
+        return _fast_update(specialist.key, result)
+
+    async def _afast_consult(self, state: ConsultationState, config):
+        specialist = self.specialists[state["specialist_selected"]]
+        # A structured reply has no text to stream; the logger prints it when it is complete
+        result = await specialist.afast_consult(
+            state.get("clinical_summary") or "", _patient_statements(state), _logger(config)
+        )
+        return _fast_update(specialist.key, result)
+
+    def _extract(self, state: ConsultationState):
+        key, response = _primary_response(state)
+        return {
+            "stage": "specialist_consultation",
+            "specialist_selected": key,
+            "specialist_response": response,
+            "medications": extract_medications(response),
+            "recommendations": extract_recommendations(response),
+        }
+
+    def _summary(self, state: ConsultationState, config):
+        summary = self.main_doctor.provide_final_summary(_summary_state(state), _logger(config))
+        return {"final_summary": summary}
+
+    async def _asummary(self, state: ConsultationState, config):
+        with _streaming(config, self.main_doctor.name) as on_token:
+            summary = await self.main_doctor.aprovide_final_summary(_summary_state(state), _logger(config), on_token)
+        return {"final_summary": summary}
+
+    def _complete(self, state: ConsultationState):
+        return {"doctor_response": COMPLETED_MESSAGE}
+
+
+def _logger(config):
+    return config["configurable"].get("logger")
+
+
+@contextmanager
+def _streaming(config, agent_name: str):
+    """Per-agent token callback from the config (None when not streaming), closed when the agent is done"""
+    on_token = config["configurable"].get("on_token")
+    if on_token is None:
+        yield None
+        return
+    try:
+        yield partial(on_token, agent_name)
+    finally:
+        on_token(agent_name, None)
+
+
+def _history_inputs(state: ConsultationState):
+    # Work on copies: the checkpointer may still hold the previous values
+    return list(state.get("memory", [])), {"question_count": state.get("question_count", 0)}
+
+
+def _history_update(memory: list, scratch: dict, result: dict) -> dict:
+    update = {
+        "stage": "history_taking",
+        "memory": memory,
+        "question_count": scratch["question_count"],
+        "doctor_response": result["agent_msg"],
+        "follow_up": result["follow_up"],
+        "triaged": result["triaged"],
+        "triage_confidence": scratch.get("triage_confidence"),
+        "missing_facts": scratch.get("missing_facts", []),
+    }
+    if result["triaged"]:
+        update.update(
+            stage="specialist_handoff",
+            clinical_summary=scratch.get("clinical_summary"),
+            referrals=scratch.get("referrals", []),
+            specialist_selected=scratch.get("next_agent"),
+        )
+    return update
+
+
+def _patient_statements(state: ConsultationState) -> List[str]:
+    return [message["content"] for message in state.get("memory", []) if message["role"] == "user"]
+
+
+def _fast_update(key: str, result: dict) -> dict:
+    return {
+        "clinical_summary": result["clinical_summary"],
+        # The fast path consults only the primary specialist
+        "referrals": [key],
+        "specialist_responses": {key: result["assessment"]},
+        "final_summary": result["final_summary"],
+    }
+
+
+def _summary_state(state: ConsultationState) -> dict:
+    _, response = _primary_response(state)
+    return {"clinical_summary": state.get("clinical_summary", ""), "specialist_response": response}
+
+
+def _primary_response(state: ConsultationState):
+    """The first referred specialist that answered, and its response"""
+    responses = state.get("specialist_responses", {})
+    for key in state.get("referrals", []):
+        if key in responses:
+            return key, responses[key]
+    return None, ""
+
+
+def create_checkpointer(spec: Optional[str] = None):
+    """Checkpointer named by CONSULTATION_CHECKPOINTER: none (default), memory or sqlite:<path>.
+
+    Any other langgraph saver (e.g. Postgres or Redis) can be passed to
+    ConsultationGraph directly; the graph only needs the saver to be shared
+    by every worker that may serve a session.
+    """
+    spec = spec if spec is not None else os.getenv("CONSULTATION_CHECKPOINTER", "none")
+    if spec in ("", "none"):
+        return None
+    if spec == "memory":
+        from langgraph.checkpoint.memory import MemorySaver
+        return MemorySaver()
+    if spec.startswith("sqlite:"):
+        import sqlite3
+        from langgraph.checkpoint.sqlite import SqliteSaver  # langgraph-checkpoint-sqlite
+        return SqliteSaver(sqlite3.connect(spec[len("sqlite:"):], check_same_thread=False))
+    raise ValueError(f"Unknown CONSULTATION_CHECKPOINTER: {spec!r}")
+
+
+_graph = None
+_graph_pid = None
+_graph_lock = threading.Lock()
+
+
+def get_consultation_graph(main_doctor, specialists: dict) -> ConsultationGraph:
+    """The process-wide graph over the shared agents, compiled on first use"""
+    global _graph, _graph_pid
+    with _graph_lock:
+        if _graph is None or _graph_pid != os.getpid():
+            # Savers hold connections, which must not cross a fork
+            _graph = ConsultationGraph(main_doctor, specialists, create_checkpointer())
+            _graph_pid = os.getpid()
+        return _graph
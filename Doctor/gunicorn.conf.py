@@ -0,0 +1,29 @@
+"""Gunicorn settings for the Medical AI Bot server.
+
+    gunicorn -c gunicorn.conf.py app:app
+
+Set PRELOAD_APP=false to fall back to each worker importing the app itself.
+"""
+import os
+
+bind = f"0.0.0.0:{os.environ.get('PORT', 5000)}"
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+# Enough threads for ADMISSION_MAX_CONCURRENT requests plus a full ADMISSION_MAX_QUEUE,
+# so overflow is answered with a 503 instead of waiting unseen in the accept backlog
+threads = int(os.environ.get("GUNICORN_THREADS", 16))
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 120))
+preload_app = os.environ.get("PRELOAD_APP", "true").lower() == "true"
+
+
+def when_ready(server):
+    # Runs in the master after the app is loaded and before any worker forks
+    if preload_app:
+        import boot
+
+        boot.preload_shared_state()
+
+
+def post_fork(server, worker):
+    import boot
+
+    boot.warm_worker()
@@ -1,40 +1,101 @@
-from utils.groq_client import GroqClient
+from utils.groq_client import get_shared_client
 from utils.conversation_logger import ConversationLogger
 from agents.main_doctor import MainDoctor
-from agents.cardiologist import Cardiologist
-from agents.neurologist import Neurologist
-from agents.dermatologist import Dermatologist
-from agents.orthopedist import Orthopedist
-from agents.endocrinologist import Endocrinologist
+from agents.specialists import SPECIALISTS, build_specialists
+from consultation_graph import COMPLETED_MESSAGE, get_consultation_graph
+from utils.deadline import deadline_scope
+from utils.admission import background_slot
+from utils.metrics import metrics
+from utils.red_flags import PRIORITIES
+from utils.idempotency import IdempotencyCache
+import os
 import json
-import re
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# Per-turn values the graph returns that are not kept in the session state
+TURN_KEYS = ("patient_message", "doctor_response", "follow_up", "with_summary", "fast_path")
+
+# Idempotency-Key results kept per session; a client only retries its latest few requests
+IDEMPOTENCY_SESSION_ENTRIES = int(os.environ.get("IDEMPOTENCY_SESSION_ENTRIES", 4))
+
+# Stages whose turns still run the consultation graph
+OPEN_STAGES = ("history_taking", "specialist_handoff")
+
+# Opt-in: answer the referral turn with one combined specialist call instead of a separate consult turn
+FAST_PATH = os.environ.get("CONSULTATION_FAST_PATH", "false").lower() == "true"
+
+_agents = None
+_agents_lock = threading.Lock()
+
+_background = None
+_background_pid = None
+_idempotency_lock = threading.Lock()
+
+def get_background_executor() -> ThreadPoolExecutor:
+    """Threads that finish consultation turns after an emergency reply has already been sent"""
+    global _background, _background_pid
+    with _agents_lock:
+        if _background is None or _background_pid != os.getpid():
+            _background = ThreadPoolExecutor(
+                max_workers=int(os.environ.get("EMERGENCY_BACKGROUND_WORKERS", 4)),
+                thread_name_prefix="consultation-background"
+            )
+            _background_pid = os.getpid()
+        return _background
+
+def get_shared_agents():
+    """Build the main doctor and specialists once per process tree.
+    
+    Agents hold no per-session state (the session's logger is passed on each
+    call), so every session shares the same instances and prompts. They hold
+    no connections either, only the model router, so agents built in a
+    preloading master are shared by its workers.
+    """
+    global _agents
+    with _agents_lock:
+        if _agents is None:
+            llm = get_shared_client().get_llm()
+            _agents = (MainDoctor(llm), build_specialists(llm))
+        return _agents
 
 class ServerMedicalBot:
     """Medical AI Bot adapted for server/API usage"""
     
+    # Only per-session state lives on the bot; agents and the LLM client are shared
+    __slots__ = ("logger", "conversation_memory", "session_state", "pending_turn", "_idempotency")
+    
     def __init__(self):
-        # Initialize components
-        self.groq_client = GroqClient()
-        self.llm = self.groq_client.get_llm()
         self.logger = ConversationLogger()
         
-        # Initialize doctor agents
-        self.main_doctor = MainDoctor(self.llm, self.logger)
-        self.specialists = {
-            "cardiologist": Cardiologist(self.llm, self.logger),
-            "neurologist": Neurologist(self.llm, self.logger),
-            "dermatologist": Dermatologist(self.llm, self.logger),
-            "orthopedist": Orthopedist(self.llm, self.logger),
-            "endocrinologist": Endocrinologist(self.llm, self.logger)
-        }
-        
         # Session state
         self.conversation_memory = []
         self.session_state = {}
+        # Future of a turn still running after an emergency reply (not part of the snapshot)
+        self.pending_turn = None
+        # Created on the first request that carries an Idempotency-Key; its results are kept in the snapshot
+        self._idempotency = None
     
-    def start_consultation(self, initial_message: str, session_id: str):
-        """Start a new consultation session"""
+    @property
+    def main_doctor(self):
+        return get_shared_agents()[0]
+    
+    @property
+    def specialists(self):
+        return get_shared_agents()[1]
+    
+    def start_consultation(self, initial_message: str, session_id: str, deadline=None, emergency=None):
+        """Start a new consultation session.
+        
+        With a deadline, LLM calls are bounded by the request's remaining time
+        and RequestAbandoned is raised once it runs out or the client leaves.
+        With an emergency (from utils.emergency, checked by the caller before
+        admission) the reply is the emergency template and the turn runs in
+        the background.
+        """
         # Reset state for new session
+        self.logger.session_id = session_id
         self.conversation_memory = []
         self.session_state = {
             "session_id": session_id,
@@ -45,149 +106,256 @@ class ServerMedicalBot:
         }
         
         # Process initial message
-        result = self.main_doctor.ask_or_triage(initial_message, self.conversation_memory, self.session_state)
+        self.logger.log_patient_message(initial_message)
+        if emergency:
+            return self._emergency_reply(emergency, lambda: self._first_turn(initial_message))
+        return self._first_turn(initial_message, deadline)
+    
+    def _first_turn(self, initial_message: str, deadline=None):
+        turn = self._run_turn(initial_message, deadline=deadline)
+        stage = self.session_state["stage"]
+        self._log_stage(None, stage)
         
+        if stage == "specialist_handoff":
+            # Triaged on the first message: the same reply as a later referral turn
+            return {
+                **self._handoff_reply(turn),
+                "question_count": self.session_state.get("question_count", 0),
+                "session_id": self.session_state["session_id"]
+            }
         return {
-            "doctor_response": result["agent_msg"],
-            "is_question": not result["triaged"],
-            "stage": "specialist_handoff" if result["triaged"] else "history_taking",
+            "doctor_response": turn["doctor_response"],
+            "is_question": stage == "history_taking",
+            "stage": stage,
             "question_count": self.session_state.get("question_count", 0),
-            "session_id": session_id
+            "session_id": self.session_state["session_id"]
         }
     
-    def continue_consultation(self, message: str, session_id: str):
+    def continue_consultation(self, message: str, session_id: str, deadline=None, emergency=None):
         """Continue existing consultation"""
-        current_stage = self.session_state.get("stage", "history_taking")
+        self.logger.log_patient_message(message)
+        if emergency:
+            # Answered at once, even while an earlier background turn runs; this turn queues behind it
+            previous = self.pending_turn
+            if previous is None and self.session_state.get("stage") not in OPEN_STAGES:
+                return self._emergency_reply(emergency)
+            return self._emergency_reply(emergency, lambda: self._continue_after(previous, message))
         
+        self.wait_for_pending_turn()
+        return self._continue(message, deadline)
+    
+    def _continue_after(self, previous, message: str):
+        if previous is not None:
+            try:
+                previous.result()
+            except Exception:
+                pass
+        return self._continue(message)
+    
+    def _continue(self, message: str, deadline=None):
+        current_stage = self.session_state.get("stage", "history_taking")
         if current_stage == "history_taking":
-            return self._handle_history_taking(message)
+            return self._handle_history_taking(message, deadline)
         elif current_stage == "specialist_handoff":
-            return self._handle_specialist_consultation(message)
+            return self._handle_specialist_consultation(message, deadline)
         else:
             return {
-                "doctor_response": "Consultation completed. Please start a new session for additional concerns.",
+                "doctor_response": COMPLETED_MESSAGE,
                 "is_question": False,
                 "stage": "consultation_complete"
             }
     
-    def _handle_history_taking(self, message: str):
+    def _emergency_reply(self, emergency, continue_turn=None):
+        """Answer with the emergency template at once; the turn itself, if any, runs in pending_turn.
+        
+        The background turn has no deadline, since nobody is waiting on this
+        request for its result, but it waits for an urgent admission slot like
+        any request. Its progress and reply are kept in the session state
+        (see pending_result), so they survive a snapshot and restore.
+        """
+        start = time.perf_counter()
+        self.session_state["emergency_alerts"] = self.session_state.get("emergency_alerts", []) + [emergency.category]
+        self.logger.log_message("System", emergency.message, "emergency")
+        metrics.increment(f"emergency_fast_path.{emergency.category}")
+        
+        stage = self.session_state.get("stage", "history_taking")
+        if continue_turn is not None:
+            self.session_state["background_turn"] = {"status": "running"}
+            self.pending_turn = get_background_executor().submit(self._background_turn, continue_turn)
+        metrics.observe("emergency_response_seconds", time.perf_counter() - start)
+        return {
+            "doctor_response": emergency.message,
+            "is_question": False,
+            "stage": stage,
+            "question_count": self.session_state.get("question_count", 0),
+            "session_id": self.session_state.get("session_id"),
+            "emergency": {
+                "category": emergency.category,
+                "rules_version": emergency.rules_version
+            },
+            "consultation_pending": continue_turn is not None
+        }
+    
+    def _background_turn(self, continue_turn):
+        try:
+            with background_slot(PRIORITIES[0]):
+                result = continue_turn()
+        except Exception:
+            self.session_state["background_turn"] = {"status": "failed"}
+            raise
+        # Set after the turn, whose graph run replaces the session state; the next turn drops it again
+        self.session_state["background_turn"] = {"status": "done", "reply": result}
+        return result
+    
+    def wait_for_pending_turn(self):
+        """Block until a background turn has finished; its failure leaves the session as it was"""
+        pending = self.pending_turn
+        if pending is not None:
+            try:
+                pending.result()
+            except Exception:
+                pass
+            self.pending_turn = None
+    
+    def _run_turn(self, message: str, fast_path: bool = False, deadline=None):
+        """Run one turn of the consultation graph and keep the state it returns.
+        
+        An abandoned turn raises before any state is kept, so the session is
+        left as it was before the message.
+        """
+        graph = get_consultation_graph(*get_shared_agents())
+        with deadline_scope(deadline):
+            state = dict(graph.run_turn(
+                self.session_state["session_id"],
+                message,
+                {**self.session_state, "memory": self.conversation_memory},
+                self.logger,
+                fast_path=fast_path
+            ))
+        self.conversation_memory = state.pop("memory", [])
+        turn = {key: state.pop(key, None) for key in TURN_KEYS}
+        self.session_state = state
+        return turn
+    
+    def _handle_history_taking(self, message: str, deadline=None):
         """Handle history taking phase"""
-        result = self.main_doctor.ask_or_triage(message, self.conversation_memory, self.session_state)
+        turn = self._run_turn(message, fast_path=FAST_PATH, deadline=deadline)
         
-        if result["triaged"]:
+        if self.session_state["stage"] == "specialist_consultation":
+            # Fast path: the referral and the specialist's answer came back in this turn
+            self._log_stage("history_taking", "specialist_handoff")
+            result = self._finish_consultation()
+            result["handoff_message"] = turn["doctor_response"]
+            return result
+        elif self.session_state["stage"] == "specialist_handoff":
             # Specialist selected
-            specialist_name = self.session_state.get("next_agent", "")
-            specialist_display_names = {
-                "cardiologist": "Dr. Michael Rodriguez (Cardiologist)",
-                "neurologist": "Dr. David Kim (Neurologist)",
-                "dermatologist": "Dr. Maria Garcia (Dermatologist)",
-                "orthopedist": "Dr. James Thompson (Orthopedist)",
-                "endocrinologist": "Dr. Lisa Patel (Endocrinologist)"
-            }
-            
-            self.session_state["stage"] = "specialist_handoff"
-            self.session_state["specialist_selected"] = specialist_name
-            
-            return {
-                "doctor_response": result["agent_msg"],
-                "is_question": False,
-                "stage": "specialist_handoff",
-                "specialist_name": specialist_display_names.get(specialist_name, specialist_name),
-                "handoff_message": f"Connecting you with {specialist_display_names.get(specialist_name, specialist_name)}..."
-            }
+            self._log_stage("history_taking", "specialist_handoff")
+            return self._handoff_reply(turn)
         else:
             return {
-                "doctor_response": result["agent_msg"],
+                "doctor_response": turn["doctor_response"],
                 "is_question": True,
                 "stage": "history_taking",
                 "question_count": self.session_state.get("question_count", 0)
             }
     
-    def _handle_specialist_consultation(self, message: str):
+    def _handoff_reply(self, turn: dict) -> dict:
+        """Reply for the turn that referred the patient to a specialist"""
+        specialist_name = self.session_state.get("specialist_selected") or ""
+        display_name = SPECIALISTS.get(specialist_name, {}).get("display_name", specialist_name)
+        return {
+            "doctor_response": turn["doctor_response"],
+            "is_question": False,
+            "stage": "specialist_handoff",
+            "specialist_name": display_name,
+            "handoff_message": f"Connecting you with {display_name}..."
+        }
+    
+    def _handle_specialist_consultation(self, message: str, deadline=None):
         """Handle specialist consultation phase"""
-        specialist_name = self.session_state.get("specialist_selected")
-        clinical_summary = self.session_state.get("clinical_summary", "")
+        # Sessions snapshotted before referrals were recorded name only one specialist
+        referrals = self.session_state.setdefault("referrals", [self.session_state.get("specialist_selected")])
         
-        if not specialist_name or specialist_name not in self.specialists:
+        if not any(key in self.specialists for key in referrals):
             return {
                 "doctor_response": "Error: Specialist not found. Please start a new consultation.",
                 "is_question": False,
                 "stage": "error"
             }
         
-        # Get specialist consultation
-        specialist = self.specialists[specialist_name]
-        specialist_state = {
-            "consultation_request": clinical_summary,
-            "specialist_response": ""
-        }
-        
-        result_state = specialist.consult(clinical_summary, specialist_state)
-        specialist_response = result_state["specialist_response"]
-        
-        # Extract medications and recommendations from response
-        medications = self._extract_medications(specialist_response)
-        recommendations = self._extract_recommendations(specialist_response)
-        
-        self.session_state["stage"] = "specialist_consultation"
+        # Every referred specialist is consulted in parallel; the first one leads the reply
+        self._run_turn(message, fast_path=FAST_PATH, deadline=deadline)
+        return self._finish_consultation()
+    
+    def _finish_consultation(self):
+        """Log the completed consultation and build its reply from the session state"""
+        specialist_name = self.session_state["specialist_selected"]
+        self._log_stage("specialist_handoff", "specialist_consultation")
         
-        specialist_display_names = {
-            "cardiologist": "Dr. Michael Rodriguez",
-            "neurologist": "Dr. David Kim",
-            "dermatologist": "Dr. Maria Garcia",
-            "orthopedist": "Dr. James Thompson",
-            "endocrinologist": "Dr. Lisa Patel"
-        }
+        # The consultation is complete; write its transcript to the log
+        self.logger.save_session()
         
         return {
-            "doctor_response": specialist_response,
+            "doctor_response": self.session_state["specialist_response"],
             "is_question": False,
             "stage": "specialist_consultation",
-            "specialist_name": specialist_display_names.get(specialist_name, specialist_name),
-            "clinical_summary": clinical_summary,
-            "medications": medications,
-            "recommendations": recommendations
+            "specialist_name": SPECIALISTS[specialist_name]["name"],
+            "clinical_summary": self.session_state.get("clinical_summary", ""),
+            "medications": self.session_state.get("medications", []),
+            "recommendations": self.session_state.get("recommendations", []),
+            "specialist_assessments": {
+                SPECIALISTS[key]["name"]: response
+                for key, response in self.session_state.get("specialist_responses", {}).items()
+            },
+            "final_summary": self.session_state.get("final_summary")
         }
     
-    def _extract_medications(self, response: str):
-        """Extract medication suggestions from specialist response"""
-        medications = []
-        
-        # Look for common medication patterns
-        med_patterns = [
-            r'(?:take|consider|try|use)\s+([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*(?:\d+\s*mg)?',
-            r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*\d+\s*mg',
-            r'over-the-counter\s+([a-z]+(?:\s+[a-z]+)*)',
-        ]
-        
-        for pattern in med_patterns:
-            matches = re.findall(pattern, response, re.IGNORECASE)
-            medications.extend(matches)
-        
-        # Common OTC medications
-        otc_meds = ['ibuprofen', 'acetaminophen', 'aspirin', 'naproxen', 'antihistamine']
-        for med in otc_meds:
-            if med.lower() in response.lower():
-                medications.append(med.title())
-        
-        return list(set(medications))  # Remove duplicates
+    def _log_stage(self, from_stage, to_stage: str):
+        self.logger.log_stage(
+            from_stage,
+            to_stage,
+            self.session_state.get("question_count", 0),
+            self.session_state.get("specialist_selected")
+        )
     
-    def _extract_recommendations(self, response: str):
-        """Extract recommendations from specialist response"""
-        recommendations = []
-        
-        # Look for recommendation patterns
-        lines = response.split('\n')
-        for line in lines:
-            if any(keyword in line.lower() for keyword in ['recommend', 'suggest', 'advise', 'should']):
-                clean_line = line.strip('- •').strip()
-                if clean_line and len(clean_line) > 10:
-                    recommendations.append(clean_line)
-        
-        return recommendations[:5]  # Limit to top 5
+    def idempotency_cache(self) -> IdempotencyCache:
+        """This session's Idempotency-Key results"""
+        if self._idempotency is None:
+            with _idempotency_lock:
+                if self._idempotency is None:
+                    self._idempotency = IdempotencyCache(IDEMPOTENCY_SESSION_ENTRIES, name="idempotency_session")
+        return self._idempotency
+    
+    def pending_result(self):
+        """(still running, reply of the finished background turn or None) since the last emergency reply"""
+        if self.pending_turn is not None and not self.pending_turn.done():
+            return True, None
+        background = self.session_state.get("background_turn") or {}
+        return background.get("status") == "running", background.get("reply")
+    
+    def to_snapshot(self) -> dict:
+        """Plain-data copy of this consultation's state for the session store"""
+        return {
+            "conversation_memory": self.conversation_memory,
+            "session_state": self.session_state,
+            "log_session": self.logger.to_snapshot(),
+            "idempotency": self._idempotency.completed() if self._idempotency is not None else {}
+        }
+    
+    @classmethod
+    def from_snapshot(cls, snapshot: dict):
+        """Rebuild a bot from a snapshot taken by to_snapshot"""
+        bot = cls()
+        bot.conversation_memory = snapshot["conversation_memory"]
+        bot.session_state = snapshot["session_state"]
+        bot.logger.restore_snapshot(snapshot["log_session"])
+        for key, (fingerprint, result) in snapshot.get("idempotency", {}).items():
+            bot.idempotency_cache().seed(key, fingerprint, result)
+        return bot
     
     def get_consultation_summary(self):
         """Get consultation summary"""
+        self.wait_for_pending_turn()
         if not self.conversation_memory:
             return "No consultation data available."
         
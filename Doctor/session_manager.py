@@ -1,66 +1,339 @@
+import os
+import sys
 import time
-from typing import Dict, Any, Optional
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Callable
 from datetime import datetime, timedelta
+from utils.metrics import metrics
+
+# Stages after which the bot only answers "consultation completed"
+FINISHED_STAGES = frozenset({"specialist_consultation", "consultation_complete"})
+
+class SessionRecord:
+    """Bookkeeping for one live session"""
+    
+    __slots__ = ("bot", "stage", "created_at", "last_activity", "snapshot_mtime", "pins", "ended")
+    
+    def __init__(self, bot, stage: str, created_at: float, last_activity: float, snapshot_mtime: Optional[int] = None):
+        self.bot = bot
+        # Stage of the last response; interned since there are only a handful
+        self.stage = sys.intern(stage)
+        # Epoch seconds
+        self.created_at = created_at
+        self.last_activity = last_activity
+        self.snapshot_mtime = snapshot_mtime
+        # Requests and turns using the session; a pinned session is never evicted
+        self.pins = 0
+        # Set by end_session so a turn finishing late does not bring the session back
+        self.ended = False
+    
+    @property
+    def question_count(self) -> int:
+        return self.bot.session_state.get("question_count", 0)
+    
+    def created_at_iso(self) -> str:
+        return datetime.fromtimestamp(self.created_at).isoformat()
+    
+    def last_activity_iso(self) -> str:
+        return datetime.fromtimestamp(self.last_activity).isoformat()
 
 class SessionManager:
     """Manage consultation sessions for the server"""
     
-    def __init__(self, session_timeout_minutes: int = 30):
-        self.sessions: Dict[str, Dict[str, Any]] = {}
+    def __init__(self, session_timeout_minutes: int = 30, store=None,
+                 restore_bot: Optional[Callable[[dict], Any]] = None,
+                 max_sessions: Optional[int] = None,
+                 memory_high_watermark_mb: Optional[float] = None,
+                 idle_offload_seconds: Optional[float] = None):
+        # Ordered from least to most recently active
+        self.sessions: "OrderedDict[str, SessionRecord]" = OrderedDict()
+        # Finished sessions, in the same order; evicted before active ones
+        self._finished: "OrderedDict[str, None]" = OrderedDict()
+        # Cold tier: sessions held only in the snapshot store, with their last activity
+        self._cold: "OrderedDict[str, float]" = OrderedDict()
+        self._lock = threading.RLock()
         self.session_timeout = timedelta(minutes=session_timeout_minutes)
+        self._timeout_seconds = self.session_timeout.total_seconds()
+        # Optional snapshot store; restore_bot rebuilds a bot from a snapshot
+        self.store = store
+        self.restore_bot = restore_bot
+        # Capacity limits; None disables the limit
+        self.max_sessions = max_sessions
+        self.memory_high_watermark = memory_high_watermark_mb * 2**20 if memory_high_watermark_mb else None
+        # Sessions idle this long are moved to the cold tier (needs a store)
+        self.idle_offload_seconds = idle_offload_seconds if store is not None else None
     
-    def create_session(self, session_id: str, bot, initial_result: dict):
+    def create_session(self, session_id: str, bot, initial_result: dict) -> SessionRecord:
         """Create a new session"""
-        self.sessions[session_id] = {
-            "bot": bot,
-            "current_state": initial_result,
-            "created_at": datetime.now().isoformat(),
-            "last_activity": datetime.now().isoformat()
-        }
+        now = time.time()
+        session = SessionRecord(bot, initial_result["stage"], now, now)
+        with self._lock:
+            self._add(session_id, session)
+        self._snapshot(session_id)
         
         # Clean up old sessions
         self._cleanup_expired_sessions()
+        self._offload_idle_sessions()
+        self._enforce_capacity(keep=session)
+        return session
     
-    def get_session(self, session_id: str) -> Optional[Dict[str, Any]]:
-        """Get session data"""
-        if session_id not in self.sessions:
-            return None
+    def get_session(self, session_id: str, pin: bool = False) -> Optional[SessionRecord]:
+        """Get session data, marking it as the most recently active.
         
-        session = self.sessions[session_id]
+        With pin=True the session stays in memory until release() is called
+        for it, so a turn in progress cannot be evicted under it.
+        """
+        session = self.sessions.get(session_id)
+        
+        # Rehydrate after a restart, or when another worker has advanced the session
+        if self.store is not None:
+            snapshot_mtime = self.store.mtime(session_id)
+            if snapshot_mtime is not None and (session is None or session.snapshot_mtime != snapshot_mtime):
+                session = self._restore(session_id)
+        
+        if session is None:
+            return None
         
         # Check if session expired
-        last_activity = datetime.fromisoformat(session["last_activity"])
-        if datetime.now() - last_activity > self.session_timeout:
-            del self.sessions[session_id]
+        if time.time() - session.last_activity > self._timeout_seconds:
+            self._expire_session(session_id)
             return None
         
+        with self._lock:
+            session.last_activity = time.time()
+            if self.sessions.get(session_id) is session:
+                self._touch(session_id, session)
+            if pin:
+                session.pins += 1
         return session
     
-    def update_session(self, session_id: str, new_state: dict):
-        """Update session state"""
-        if session_id in self.sessions:
-            self.sessions[session_id]["current_state"] = new_state
-            self.sessions[session_id]["last_activity"] = datetime.now().isoformat()
+    def pin(self, session: SessionRecord):
+        """Keep a session in memory until the matching release(), e.g. while a background turn runs"""
+        with self._lock:
+            session.pins += 1
+    
+    def release(self, session: SessionRecord):
+        """Unpin a session returned by get_session(pin=True) or pinned with pin()"""
+        with self._lock:
+            session.pins -= 1
+    
+    def update_session(self, session_id: str, new_state: dict, session: Optional[SessionRecord] = None):
+        """Update session state after a turn.
+        
+        `session` is the record the turn ran on. If it is no longer resident
+        (offloaded, evicted or expired meanwhile) it is added back and
+        snapshotted, so the turn's result is never dropped.
+        """
+        with self._lock:
+            current = self.sessions.get(session_id)
+            if session is None:
+                session = current
+            if session is None or session.ended:
+                metrics.increment("session_updates_dropped")
+                return
+            readded = current is not session
+            if readded:
+                self._cold.pop(session_id, None)
+                self._add(session_id, session)
+                metrics.increment("sessions_readded")
+            session.stage = sys.intern(new_state["stage"])
+            session.last_activity = time.time()
+            self._touch(session_id, session)
+        self._snapshot(session_id)
+        if readded:
+            self._enforce_capacity(keep=session)
+    
+    def save_session(self, session_id: str):
+        """Snapshot a session outside a turn, after data kept beside its state has changed"""
+        self._snapshot(session_id)
     
     def end_session(self, session_id: str):
         """End and remove session"""
-        if session_id in self.sessions:
-            del self.sessions[session_id]
+        session = self.sessions.get(session_id)
+        if session is not None:
+            session.ended = True
+        self._discard(session_id)
+        if self.store is not None:
+            self.store.delete(session_id)
+    
+    def _expire_session(self, session_id: str):
+        """Drop an idle session, keeping its snapshot if another worker touched it recently"""
+        self._discard(session_id)
+        if self.store is not None:
+            snapshot_mtime = self.store.mtime(session_id)
+            if snapshot_mtime is not None and time.time() - snapshot_mtime / 1e9 > self._timeout_seconds:
+                self.store.delete(session_id)
+    
+    def _add(self, session_id: str, session: SessionRecord):
+        self.sessions[session_id] = session
+        self._touch(session_id, session)
+    
+    def _touch(self, session_id: str, session: SessionRecord):
+        """Mark a session as the most recently active"""
+        self.sessions.move_to_end(session_id)
+        if session.stage in FINISHED_STAGES:
+            self._finished[session_id] = None
+            self._finished.move_to_end(session_id)
+    
+    def _discard(self, session_id: str):
+        with self._lock:
+            self.sessions.pop(session_id, None)
+            self._finished.pop(session_id, None)
+            self._cold.pop(session_id, None)
+    
+    def _offload(self, session_id: str) -> bool:
+        """Move a session to the cold tier; its snapshot is already current"""
+        session = self.sessions.pop(session_id, None)
+        self._finished.pop(session_id, None)
+        if session is None or session.snapshot_mtime is None:
+            return False
+        self._cold[session_id] = session.last_activity
+        return True
+    
+    def _offload_idle_sessions(self):
+        """Move sessions idle for longer than idle_offload_seconds to disk"""
+        if self.idle_offload_seconds is None:
+            return
+        cutoff = time.time() - self.idle_offload_seconds
+        with self._lock:
+            idle_sessions = []
+            for session_id, session in self.sessions.items():
+                if session.last_activity > cutoff:
+                    break
+                # Sessions in a turn stay resident until it has been stored
+                if not session.pins:
+                    idle_sessions.append(session_id)
+            for session_id in idle_sessions:
+                if self._offload(session_id):
+                    metrics.increment("sessions_offloaded.idle")
+    
+    def _enforce_capacity(self, keep: Optional[SessionRecord] = None):
+        """Evict least-recently-active sessions, finished ones first, while over a limit.
+        
+        Pinned sessions and `keep` (the one just added) are never evicted, so
+        the limits can be exceeded while every other session is in use.
+        """
+        with self._lock:
+            if keep is not None:
+                keep.pins += 1
+            try:
+                self._evict_over_limits()
+            finally:
+                if keep is not None:
+                    keep.pins -= 1
+    
+    def _evict_over_limits(self):
+        if self.max_sessions is not None:
+            while len(self.sessions) > self.max_sessions:
+                if not self._evict_one("capacity"):
+                    break
+        
+        if self.memory_high_watermark is not None and _resident_memory() > self.memory_high_watermark:
+            # Freed memory is not returned to the OS immediately, so evict a
+            # batch per check rather than looping until RSS drops
+            for _ in range(max(1, len(self.sessions) // 20)):
+                if not self._evict_one("memory"):
+                    break
+    
+    def _evict_one(self, reason: str) -> bool:
+        """Evict the least recently active unpinned session; False if every session is in use"""
+        kind = "finished"
+        session_id = next((s for s in self._finished if not self.sessions[s].pins), None)
+        if session_id is None:
+            kind = "active"
+            session_id = next((s for s, session in self.sessions.items() if not session.pins), None)
+        if session_id is None:
+            metrics.increment(f"sessions_eviction_blocked.{reason}")
+            return False
+        # With a store the session goes to the cold tier and can still be rehydrated
+        if self._offload(session_id):
+            metrics.increment(f"sessions_offloaded.{reason}")
+        metrics.increment(f"sessions_evicted.{reason}")
+        metrics.increment(f"sessions_evicted.{kind}")
+        return True
+    
+    def _snapshot(self, session_id: str):
+        """Persist the session at a turn boundary"""
+        if self.store is None:
+            return
+        session = self.sessions.get(session_id)
+        if session is None:
+            return
+        start = time.perf_counter()
+        data = {
+            "stage": session.stage,
+            "created_at": session.created_at,
+            "last_activity": session.last_activity,
+            "bot": session.bot.to_snapshot()
+        }
+        session.snapshot_mtime = self.store.save(session_id, data)
+        metrics.observe("session_snapshot_seconds", time.perf_counter() - start)
+    
+    def _restore(self, session_id: str) -> Optional[SessionRecord]:
+        """Rebuild a session from its snapshot"""
+        if self.restore_bot is None:
+            return None
+        start = time.perf_counter()
+        snapshot_mtime = self.store.mtime(session_id)
+        data = self.store.load(session_id)
+        if data is None:
+            return None
+        session = SessionRecord(
+            self.restore_bot(data["bot"]),
+            data["stage"],
+            data["created_at"],
+            data["last_activity"],
+            snapshot_mtime
+        )
+        with self._lock:
+            was_cold = self._cold.pop(session_id, None) is not None
+            self._add(session_id, session)
+        self._enforce_capacity(keep=session)
+        
+        # Rehydration from the cold tier is reported apart from restores after a restart
+        if was_cold:
+            metrics.increment("sessions_rehydrated")
+            metrics.observe("session_rehydrate_seconds", time.perf_counter() - start)
+        else:
+            metrics.increment("sessions_restored")
+            metrics.observe("session_restore_seconds", time.perf_counter() - start)
+        return session
     
     def _cleanup_expired_sessions(self):
         """Remove expired sessions"""
-        current_time = datetime.now()
+        current_time = time.time()
         expired_sessions = []
         
-        for session_id, session_data in self.sessions.items():
-            last_activity = datetime.fromisoformat(session_data["last_activity"])
-            if current_time - last_activity > self.session_timeout:
+        # Sessions are ordered by activity, so stop at the first one still live
+        with self._lock:
+            for session_id, session_data in self.sessions.items():
+                if current_time - session_data.last_activity <= self._timeout_seconds:
+                    break
+                expired_sessions.append(session_id)
+            for session_id, last_activity in self._cold.items():
+                if current_time - last_activity <= self._timeout_seconds:
+                    break
                 expired_sessions.append(session_id)
         
         for session_id in expired_sessions:
-            del self.sessions[session_id]
+            self._expire_session(session_id)
     
     def get_active_sessions_count(self) -> int:
         """Get count of active sessions"""
         self._cleanup_expired_sessions()
-        return len(self.sessions)
+        self._offload_idle_sessions()
+        return len(self.sessions) + len(self._cold)
+    
+    def get_tier_counts(self) -> Dict[str, int]:
+        """Sessions held in memory and in the cold tier"""
+        return {"in_memory": len(self.sessions), "offloaded": len(self._cold)}
+
+
+def _resident_memory() -> int:
+    """Current resident set size of this process in bytes (0 if unknown)"""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return 0
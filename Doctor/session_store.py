@@ -0,0 +1,94 @@
+import io
+import os
+import pickle
+import tempfile
+from typing import Optional
+
+SNAPSHOT_VERSION = 2
+
+# Snapshots only ever contain plain containers and scalars
+_SAFE_BUILTINS = {"dict", "list", "tuple", "set", "frozenset", "str", "bytes", "int", "float", "bool"}
+
+
+class _SafeUnpickler(pickle.Unpickler):
+    def find_class(self, module, name):
+        if module == "builtins" and name in _SAFE_BUILTINS:
+            return super().find_class(module, name)
+        raise pickle.UnpicklingError(f"Refusing to load {module}.{name} from a session snapshot")
+
+
+def encode_snapshot(data: dict) -> bytes:
+    """Serialize a session snapshot to bytes"""
+    return pickle.dumps({"v": SNAPSHOT_VERSION, "data": data}, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def decode_snapshot(blob: bytes) -> Optional[dict]:
+    """Deserialize a session snapshot, or return None if it is from another format version"""
+    wrapper = _SafeUnpickler(io.BytesIO(blob)).load()
+    if wrapper.get("v") != SNAPSHOT_VERSION:
+        return None
+    return wrapper["data"]
+
+
+class FileSessionStore:
+    """Stores one snapshot file per session in a local directory.
+
+    Writes go to a temporary file that is renamed into place, so a crash never
+    leaves a half-written snapshot. Any worker on the host can read a session
+    written by another.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, session_id: str) -> str:
+        # Session ids are server-generated UUIDs; reject anything that could escape the directory
+        if not isinstance(session_id, str) or not session_id or "/" in session_id or "\\" in session_id or session_id.startswith("."):
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        return os.path.join(self.directory, f"{session_id}.snap")
+
+    def save(self, session_id: str, data: dict) -> int:
+        """Write a snapshot and return its modification time in nanoseconds"""
+        path = self._path(session_id)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(encode_snapshot(data))
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+            raise
+        return os.stat(path).st_mtime_ns
+
+    def load(self, session_id: str) -> Optional[dict]:
+        try:
+            with open(self._path(session_id), "rb") as f:
+                return decode_snapshot(f.read())
+        except (FileNotFoundError, ValueError, pickle.UnpicklingError, EOFError):
+            return None
+
+    def mtime(self, session_id: str) -> Optional[int]:
+        try:
+            return os.stat(self._path(session_id)).st_mtime_ns
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def delete(self, session_id: str):
+        try:
+            os.unlink(self._path(session_id))
+        except (FileNotFoundError, ValueError):
+            pass
+
+    def session_ids(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".snap"):
+                yield name[:-len(".snap")]
+
+
+def create_session_store() -> Optional[FileSessionStore]:
+    """Build the snapshot store from the environment, or None when disabled"""
+    if os.environ.get("SESSION_SNAPSHOTS", "true").lower() != "true":
+        return None
+    return FileSessionStore(os.environ.get("SESSION_SNAPSHOT_DIR", "session_snapshots"))
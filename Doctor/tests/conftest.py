@@ -0,0 +1,11 @@
+import os
+import sys
+import tempfile
+
+# Modules import each other flat (from utils.x import ...), as when run from Doctor/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Keep snapshots and transcripts written by the app out of the working tree
+_scratch = tempfile.mkdtemp(prefix="doctor-tests-")
+os.environ.setdefault("SESSION_SNAPSHOT_DIR", os.path.join(_scratch, "session_snapshots"))
+os.environ.setdefault("CONVERSATION_LOG_DIR", os.path.join(_scratch, "conversation_logs"))
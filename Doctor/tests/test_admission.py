@@ -0,0 +1,17 @@
+import pytest
+
+from utils.admission import AdmissionController, Overloaded
+
+
+def test_no_queue_rejects_as_queue_full():
+    admission = AdmissionController(1, 0, 1)
+    with admission.admit(priority="urgent"):
+        with pytest.raises(Overloaded) as rejected:
+            with admission.admit(priority="urgent"):
+                pass
+    assert rejected.value.reason == "queue_full"
+    assert rejected.value.retry_after >= 1
+    # The slot is free again once the first request has finished
+    with admission.admit():
+        pass
+    assert admission.stats()["active"] == 0
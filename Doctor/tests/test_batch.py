@@ -0,0 +1,32 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import app as server
+
+TOKEN = "batch-test-token"
+CASE = {"case_id": "c1", "message": "I have had a cough for three weeks"}
+
+
+@pytest.fixture
+def post_batch(monkeypatch):
+    monkeypatch.setenv("BATCH_API_TOKEN", TOKEN)
+    client = server.app.test_client()
+    return lambda body, token=TOKEN: client.post(
+        "/api/batch-consultation", json=body, headers={"Authorization": f"Bearer {token}"}
+    )
+
+
+def test_batch_needs_the_token(post_batch):
+    assert post_batch({"cases": [CASE]}, token="wrong").status_code == 403
+
+
+@pytest.mark.parametrize("concurrency", ["many", [2], {"n": 2}])
+def test_non_integer_concurrency_is_rejected(post_batch, concurrency):
+    response = post_batch({"cases": [CASE], "concurrency": concurrency})
+    assert response.status_code == 400
+    assert "concurrency" in response.get_json()["error"]
+
+
+def test_unhashable_completed_ids_are_rejected(post_batch):
+    assert post_batch({"cases": [CASE], "completed": [{"case_id": "c1"}]}).status_code == 400
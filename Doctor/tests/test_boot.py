@@ -0,0 +1,33 @@
+import threading
+import time
+
+import boot
+from utils import groq_client
+from utils.groq_client import ModelRouter
+from utils.model_registry import load_max_tokens, load_routing
+
+
+def test_router_builds_its_own_models_after_fork():
+    router = ModelRouter("test-key", load_routing(), load_max_tokens())
+    model_key = router.routed_models()[0]
+    parent_model = router.get_model(model_key)
+    assert router.get_model(model_key) is parent_model
+
+    # As seen from a worker forked after the master built the model
+    router._models_pid = -1
+    assert router.get_model(model_key) is not parent_model
+
+
+def test_warm_worker_does_not_hold_up_boot(monkeypatch):
+    warmed = threading.Event()
+
+    class SlowClient:
+        def warm_up(self, timeout=None):
+            time.sleep(0.5)
+            warmed.set()
+
+    monkeypatch.setattr(groq_client, "get_shared_client", lambda: SlowClient())
+    start = time.perf_counter()
+    boot.warm_worker()
+    assert time.perf_counter() - start < 0.1
+    assert warmed.wait(2)
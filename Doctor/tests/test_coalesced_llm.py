@@ -0,0 +1,59 @@
+import threading
+import time
+
+import pytest
+
+from utils.deadline import Deadline, RequestAbandoned, deadline_scope
+from utils.groq_client import CoalescedLLM
+
+PARAMS = {"model_name": "test-model", "temperature": 0.3, "max_tokens": 64}
+MESSAGES = [{"role": "user", "content": "My head hurts"}]
+
+
+class SlowThenFastChat:
+    """Chat model whose first call runs until its HTTP timeout; later calls answer at once"""
+
+    def __init__(self):
+        self.timeouts = []
+        self.started = threading.Event()
+
+    def bind(self, **kwargs):
+        return self
+
+    def invoke(self, messages, timeout=None):
+        self.timeouts.append(timeout)
+        if len(self.timeouts) == 1:
+            self.started.set()
+            time.sleep(timeout)
+            raise TimeoutError("read timed out")
+        return "reply"
+
+
+def test_follower_outlives_a_leader_that_runs_out_of_budget():
+    chat = SlowThenFastChat()
+    llm = CoalescedLLM(chat, PARAMS, model_key="test", stage="history_taking")
+    leader_error = []
+
+    def lead():
+        with deadline_scope(Deadline(0.2)):
+            try:
+                llm.invoke(MESSAGES)
+            except RequestAbandoned as e:
+                leader_error.append(e)
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert chat.started.wait(1)
+    with deadline_scope(Deadline(5)):
+        assert llm.invoke(MESSAGES) == "reply"
+    leader.join()
+
+    assert leader_error and leader_error[0].reason == "deadline"
+    # The follower's own call had its own, longer budget as its timeout
+    assert len(chat.timeouts) == 2 and chat.timeouts[1] > 1
+
+
+def test_follower_without_budget_left_is_abandoned():
+    with deadline_scope(Deadline(0)):
+        with pytest.raises(RequestAbandoned):
+            CoalescedLLM(SlowThenFastChat(), PARAMS, stage="history_taking").invoke(MESSAGES)
@@ -0,0 +1,31 @@
+import pytest
+
+from utils.deadline import TIMEOUT_HEADER, Deadline, RequestAbandoned, current_deadline, deadline_scope, request_deadline
+
+
+def test_spent_budget_abandons_the_request():
+    deadline = Deadline(0)
+    with pytest.raises(RequestAbandoned) as abandoned:
+        deadline.check("history_taking")
+    assert abandoned.value.reason == "deadline"
+
+
+def test_client_hang_up_abandons_the_request():
+    deadline = Deadline(30, is_disconnected=lambda: True)
+    with pytest.raises(RequestAbandoned) as abandoned:
+        deadline.check("specialist")
+    assert abandoned.value.reason == "disconnect"
+
+
+def test_budget_comes_from_the_header_less_the_margin():
+    deadline = request_deadline({TIMEOUT_HEADER: "10000"}, {})
+    assert 9 < deadline.remaining() < 10
+    # An unreadable header falls back to the default budget
+    assert request_deadline({TIMEOUT_HEADER: "soon"}, {}).remaining() > 0
+
+
+def test_scope_sets_and_restores_the_current_deadline():
+    deadline = Deadline(5)
+    with deadline_scope(deadline):
+        assert current_deadline() is deadline
+    assert current_deadline() is None
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import app as server
+from server_bot import ServerMedicalBot
+
+EMERGENCY_MESSAGE = "I think I'm having a heart attack"
+
+
+def triage_at_once(self, message, fast_path=False, deadline=None):
+    # The graph's first turn referring straight to a specialist, without any LLM call
+    self.session_state.update(stage="specialist_handoff", specialist_selected="cardiologist", referrals=["cardiologist"])
+    return {"doctor_response": "Let me refer you to a cardiologist."}
+
+
+def test_emergency_start_that_triages_reports_the_handoff(monkeypatch):
+    monkeypatch.setattr(ServerMedicalBot, "_run_turn", triage_at_once)
+    client = server.app.test_client()
+
+    started = client.post("/api/start-consultation", json={"message": EMERGENCY_MESSAGE})
+    assert started.status_code == 200
+    body = started.get_json()
+    assert body["emergency"]["category"] == "cardiac"
+    assert body["consultation_pending"] is True
+
+    session_id = body["session_id"]
+    server.session_manager.get_session(session_id).bot.wait_for_pending_turn()
+
+    status = client.get(f"/api/session-status/{session_id}")
+    assert status.status_code == 200
+    pending = status.get_json()["pending_response"]
+    assert pending["consultation_stage"] == "specialist_handoff"
+    assert pending["specialist_name"]
+    assert pending["handoff_message"].startswith("Connecting you with")
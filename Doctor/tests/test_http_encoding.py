@@ -0,0 +1,47 @@
+import gzip
+
+import pytest
+
+flask = pytest.importorskip("flask")
+
+from utils import http_encoding
+from utils.http_encoding import StaticJSON, install
+
+
+@pytest.fixture
+def client():
+    app = install(flask.Flask(__name__))
+    static = StaticJSON({"specialists": ["neurologist", "cardiologist"]})
+
+    @app.route("/large")
+    def large():
+        return flask.jsonify({"text": "x" * (2 * http_encoding.COMPRESSION_MIN_BYTES)})
+
+    @app.route("/small")
+    def small():
+        return flask.jsonify({"ok": True})
+
+    @app.route("/static")
+    def static_body():
+        return static.response(flask.request, app.response_class)
+
+    return app.test_client()
+
+
+def test_large_response_is_gzipped_when_accepted(client):
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert http_encoding.loads(gzip.decompress(response.get_data()))["text"].startswith("xxx")
+
+
+def test_response_is_left_alone_without_accept_encoding_or_below_the_threshold(client):
+    assert "Content-Encoding" not in client.get("/large", headers={"Accept-Encoding": "identity"}).headers
+    assert "Content-Encoding" not in client.get("/small", headers={"Accept-Encoding": "gzip"}).headers
+
+
+def test_static_body_is_precompressed_and_revalidated(client):
+    first = client.get("/static", headers={"Accept-Encoding": "gzip"})
+    assert first.headers["Content-Encoding"] == "gzip"
+    again = client.get("/static", headers={"If-None-Match": first.headers["ETag"]})
+    assert again.status_code == 304
@@ -0,0 +1,77 @@
+import threading
+
+import pytest
+
+from utils.idempotency import IdempotencyCache, IdempotencyConflict, request_fingerprint
+
+FINGERPRINT = request_fingerprint("/api/send-message", b'{"message": "hi"}')
+
+
+def test_repeated_key_is_replayed_without_running_again():
+    cache = IdempotencyCache(8)
+    calls = []
+    assert cache.run("k", FINGERPRINT, lambda: calls.append(1) or "reply") == ("reply", False)
+    assert cache.run("k", FINGERPRINT, lambda: calls.append(1) or "other") == ("reply", True)
+    assert len(calls) == 1
+
+
+def test_key_reused_for_another_request_conflicts():
+    cache = IdempotencyCache(8)
+    cache.run("k", FINGERPRINT, lambda: "reply")
+    with pytest.raises(IdempotencyConflict):
+        cache.run("k", request_fingerprint("/api/send-message", b"{}"), lambda: "reply")
+
+
+def test_duplicate_waits_for_the_request_in_flight():
+    cache = IdempotencyCache(8)
+    started, release = threading.Event(), threading.Event()
+    calls = []
+
+    def original():
+        calls.append(1)
+        started.set()
+        release.wait(2)
+        return "reply"
+
+    first = threading.Thread(target=lambda: cache.run("k", FINGERPRINT, original))
+    first.start()
+    assert started.wait(2)
+    threading.Timer(0.05, release.set).start()
+    assert cache.run("k", FINGERPRINT, original, timeout=2) == ("reply", True)
+    first.join()
+    assert len(calls) == 1
+
+
+def test_duplicate_gives_up_waiting_after_its_timeout():
+    cache = IdempotencyCache(8)
+    started, release = threading.Event(), threading.Event()
+
+    def original():
+        started.set()
+        release.wait(2)
+        return "reply"
+
+    first = threading.Thread(target=lambda: cache.run("k", FINGERPRINT, original))
+    first.start()
+    assert started.wait(2)
+    with pytest.raises(TimeoutError):
+        cache.run("k", FINGERPRINT, original, timeout=0.01)
+    release.set()
+    first.join()
+
+
+def test_retryable_results_are_not_kept():
+    cache = IdempotencyCache(8)
+    is_server_error = lambda result: result[1] >= 500
+    assert cache.run("k", FINGERPRINT, lambda: ("busy", 503), retryable=is_server_error) == (("busy", 503), False)
+    assert cache.run("k", FINGERPRINT, lambda: ("reply", 200), retryable=is_server_error) == (("reply", 200), False)
+    assert cache.completed() == {"k": (FINGERPRINT, ("reply", 200))}
+
+
+def test_seeded_results_replay_and_oldest_keys_are_forgotten():
+    cache = IdempotencyCache(2)
+    cache.seed("a", FINGERPRINT, "from snapshot")
+    assert cache.run("a", FINGERPRINT, lambda: "again") == ("from snapshot", True)
+    cache.run("b", FINGERPRINT, lambda: "b")
+    cache.run("c", FINGERPRINT, lambda: "c")
+    assert list(cache.completed()) == ["b", "c"]
@@ -0,0 +1,91 @@
+from types import SimpleNamespace
+
+import pytest
+
+from session_manager import SessionManager
+from session_store import FileSessionStore
+
+
+def bot():
+    return SimpleNamespace(session_state={}, to_snapshot=lambda: {})
+
+
+def create(manager, session_id, stage="history_taking"):
+    return manager.create_session(session_id, bot(), {"stage": stage})
+
+
+def test_finished_sessions_are_evicted_first():
+    manager = SessionManager(max_sessions=2)
+    create(manager, "active")
+    create(manager, "finished", stage="consultation_complete")
+    create(manager, "new")
+    assert set(manager.sessions) == {"active", "new"}
+
+
+def test_pinned_sessions_are_never_evicted():
+    manager = SessionManager(max_sessions=2)
+    create(manager, "a")
+    create(manager, "b")
+    pinned = manager.get_session("a", pin=True)
+    manager.get_session("b")
+    # "a" is now the least recently active, but a request is using it
+    create(manager, "c")
+    assert set(manager.sessions) == {"a", "c"}
+
+    manager.release(pinned)
+    create(manager, "d")
+    assert set(manager.sessions) == {"c", "d"}
+
+
+def test_limit_is_exceeded_rather_than_evicting_a_session_in_use():
+    manager = SessionManager(max_sessions=1)
+    first = create(manager, "a")
+    manager.pin(first)
+    create(manager, "b")
+    assert set(manager.sessions) == {"a", "b"}
+
+
+def test_get_session_refreshes_recency():
+    manager = SessionManager(max_sessions=2)
+    create(manager, "a")
+    create(manager, "b")
+    manager.get_session("a")
+    create(manager, "c")
+    assert set(manager.sessions) == {"a", "c"}
+
+
+@pytest.fixture
+def stored_manager(tmp_path):
+    return SessionManager(
+        store=FileSessionStore(str(tmp_path)),
+        restore_bot=lambda snapshot: bot(),
+        max_sessions=1,
+    )
+
+
+def test_evicted_session_goes_cold_and_is_rehydrated(stored_manager):
+    create(stored_manager, "a")
+    create(stored_manager, "b")
+    assert stored_manager.get_tier_counts() == {"in_memory": 1, "offloaded": 1}
+    assert stored_manager.get_session("a") is not None
+    assert "a" in stored_manager.sessions
+
+
+def test_update_brings_back_a_session_evicted_during_its_turn(stored_manager):
+    session = create(stored_manager, "a")
+    stored_manager.get_session("a", pin=True)
+    stored_manager.release(session)
+    create(stored_manager, "b")
+    assert "a" not in stored_manager.sessions
+
+    stored_manager.update_session("a", {"stage": "specialist_handoff"}, session)
+    assert stored_manager.sessions["a"] is session
+    assert session.stage == "specialist_handoff"
+
+
+def test_ended_session_is_not_brought_back(stored_manager):
+    session = create(stored_manager, "a")
+    stored_manager.end_session("a")
+    stored_manager.update_session("a", {"stage": "history_taking"}, session)
+    assert "a" not in stored_manager.sessions
+    assert stored_manager.get_session("a") is None
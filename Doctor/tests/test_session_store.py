@@ -0,0 +1,58 @@
+import os
+import pickle
+
+import pytest
+
+from server_bot import ServerMedicalBot
+from session_store import FileSessionStore, decode_snapshot
+
+
+@pytest.fixture
+def store(tmp_path):
+    return FileSessionStore(str(tmp_path))
+
+
+@pytest.mark.parametrize("session_id", [123, None, ["a"], "../escape", ".hidden", ""])
+def test_invalid_session_ids_are_not_found(store, session_id):
+    assert store.load(session_id) is None
+    assert store.mtime(session_id) is None
+    store.delete(session_id)
+    with pytest.raises(ValueError):
+        store.save(session_id, {})
+
+
+class Payload:
+    pass
+
+
+def test_bot_snapshot_round_trip(store):
+    bot = ServerMedicalBot()
+    bot.session_state = {"session_id": "s1", "stage": "history_taking", "question_count": 2, "emergency_alerts": ["cardiac"]}
+    bot.conversation_memory = [{"role": "user", "content": "My chest hurts"}]
+    bot.logger.log_patient_message("My chest hurts")
+    bot.idempotency_cache().seed("key-1", "fingerprint", (b'{"success": true}', 200, [("Content-Type", "application/json")]))
+    store.save("s1", {"stage": "history_taking", "bot": bot.to_snapshot()})
+
+    restored = ServerMedicalBot.from_snapshot(store.load("s1")["bot"])
+    assert restored.session_state == bot.session_state
+    assert restored.conversation_memory == bot.conversation_memory
+    assert restored.logger.messages == bot.logger.messages
+    # An Idempotency-Key answered before the snapshot is replayed after it
+    result, replayed = restored.idempotency_cache().run("key-1", "fingerprint", lambda: None)
+    assert replayed and result[1] == 200
+
+
+@pytest.mark.parametrize("payload", [Payload(), os.getcwd, {"nested": [Payload()]}])
+def test_snapshot_with_other_objects_is_refused(store, payload):
+    blob = pickle.dumps({"v": 2, "data": payload})
+    with pytest.raises(pickle.UnpicklingError):
+        decode_snapshot(blob)
+    with open(store._path("s1"), "wb") as f:
+        f.write(blob)
+    assert store.load("s1") is None
+
+
+def test_snapshot_of_another_version_is_ignored(store):
+    with open(store._path("s1"), "wb") as f:
+        f.write(pickle.dumps({"v": 1, "data": {}}))
+    assert store.load("s1") is None
@@ -0,0 +1,85 @@
+import threading
+
+import pytest
+
+from utils.single_flight import LeaderAbandoned, SingleFlight
+
+
+class LeaderGaveUp(Exception):
+    pass
+
+
+def run_with_follower(flight, fn, **kwargs):
+    """Run fn as leader on a thread while the calling thread joins it as a follower"""
+    started, release = threading.Event(), threading.Event()
+
+    def leader_fn():
+        started.set()
+        release.wait(2)
+        return fn()
+
+    outcome = {}
+
+    def lead():
+        try:
+            outcome["leader"] = flight.do("key", leader_fn, **kwargs)
+        except BaseException as e:
+            outcome["leader"] = e
+
+    leader = threading.Thread(target=lead)
+    leader.start()
+    assert started.wait(2)
+    threading.Timer(0.05, release.set).start()
+    try:
+        outcome["follower"] = flight.do("key", lambda: pytest.fail("the follower must not run the call"), **kwargs)
+    except BaseException as e:
+        outcome["follower"] = e
+    leader.join()
+    return outcome["leader"], outcome["follower"]
+
+
+def test_followers_share_the_result():
+    flight = SingleFlight()
+    assert run_with_follower(flight, lambda: "reply") == ("reply", "reply")
+    assert flight.in_flight() == 0
+
+
+def test_followers_receive_the_call_error():
+    error = RuntimeError("provider failed")
+
+    def fail():
+        raise error
+
+    leader, follower = run_with_follower(SingleFlight(), fail)
+    assert leader is error and follower is error
+
+
+def test_leader_only_errors_are_not_passed_on():
+    error = LeaderGaveUp()
+
+    def give_up():
+        raise error
+
+    leader, follower = run_with_follower(SingleFlight(), give_up, leader_only=(LeaderGaveUp,))
+    assert leader is error
+    assert isinstance(follower, LeaderAbandoned) and follower.__cause__ is error
+
+
+def test_follower_gives_up_after_its_timeout():
+    flight = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+
+    def slow():
+        started.set()
+        release.wait(2)
+        return "late"
+
+    leader = threading.Thread(target=lambda: flight.do("key", slow))
+    leader.start()
+    assert started.wait(2)
+    with pytest.raises(TimeoutError):
+        flight.do("key", slow, timeout=0.01)
+    release.set()
+    leader.join()
+    # Once finished nothing is cached: the next call runs again
+    assert flight.do("key", lambda: "fresh") == "fresh"
@@ -0,0 +1,35 @@
+import pytest
+
+pytest.importorskip("flask")
+
+import app as server
+from server_bot import ServerMedicalBot
+
+
+def ask_a_question(self, message, fast_path=False, deadline=None):
+    self.session_state["question_count"] = self.session_state.get("question_count", 0) + 1
+    return {"doctor_response": "How long has it hurt?"}
+
+
+def start(client, address, key="start-1"):
+    return client.post(
+        "/api/start-consultation", json={"message": "My knee hurts"},
+        headers={"Idempotency-Key": key}, environ_base={"REMOTE_ADDR": address}
+    )
+
+
+def test_start_key_is_replayed_only_to_its_caller(monkeypatch):
+    monkeypatch.setattr(ServerMedicalBot, "_run_turn", ask_a_question)
+    client = server.app.test_client()
+
+    first = start(client, "10.0.0.1")
+    retry = start(client, "10.0.0.1")
+    assert first.status_code == retry.status_code == 200
+    assert retry.headers.get("Idempotent-Replayed") == "true"
+    assert retry.get_json()["session_id"] == first.get_json()["session_id"]
+
+    # Another caller that reuses the key starts its own session instead of receiving the first one
+    other = start(client, "10.0.0.2")
+    assert other.status_code == 200
+    assert "Idempotent-Replayed" not in other.headers
+    assert other.get_json()["session_id"] != first.get_json()["session_id"]
@@ -0,0 +1,35 @@
+import time
+
+from utils.transcript_log import TranscriptLog
+
+
+def session(session_id, note="first"):
+    return {"session_id": session_id, "messages": [{"agent": "Patient", "message": note}]}
+
+
+def test_only_the_newest_segment_is_indexed_in_memory(tmp_path):
+    # Every record fills a segment, so each append rotates
+    log = TranscriptLog(str(tmp_path), max_segment_bytes=1)
+    for session_id in ("a", "b", "c"):
+        log.append(session(session_id))
+        time.sleep(0.001)
+    log.append(session("a", note="again"))
+
+    assert len(log._index) == 1
+    assert log.get("b") == session("b")
+    # The later record wins over the one in the rotated-out segment
+    assert log.get("a") == session("a", note="again")
+    assert log.get("missing") is None
+    assert len(log) == 3
+
+
+def test_other_processes_entries_are_found(tmp_path):
+    writer = TranscriptLog(str(tmp_path), max_segment_bytes=1)
+    reader = TranscriptLog(str(tmp_path), max_segment_bytes=1)
+    writer.append(session("a"))
+    time.sleep(0.001)
+    writer.append(session("b"))
+
+    assert reader.get("a") == session("a")
+    assert reader.get("b") == session("b")
+    assert list(reader._index) == ["b"]
@@ -0,0 +1,193 @@
+import os
+import math
+import time
+import threading
+from contextlib import ExitStack, contextmanager
+from typing import Optional
+
+from utils.metrics import metrics
+from utils.red_flags import PRIORITIES
+
+# Class for batch work: queued behind every interactive request and displaced by any of them
+BATCH_PRIORITY = "batch"
+
+# Service time assumed for Retry-After before any request has finished
+INITIAL_SERVICE_SECONDS = 5.0
+# Weight of the newest request in the service time moving average
+SERVICE_TIME_ALPHA = 0.2
+
+
+class Overloaded(Exception):
+    """No slot became free in time; the client should retry after `retry_after` seconds"""
+
+    def __init__(self, reason: str, retry_after: int):
+        super().__init__(f"Server overloaded ({reason}), retry after {retry_after}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("event", "admitted", "displaced", "order")
+
+    def __init__(self, rank: int, sequence: int):
+        self.event = threading.Event()
+        self.admitted = False
+        self.displaced = False
+        # Served lowest first: most urgent class, then arrival order
+        self.order = (rank, sequence)
+
+
+class AdmissionController:
+    """Caps concurrent LLM-bound requests, with a bounded, time-limited priority wait queue.
+
+    `priorities` names the classes from most to least urgent. A finished
+    request hands its slot straight to the most urgent waiter (oldest first
+    within a class), so arrivals cannot overtake the queue. A full queue
+    takes an arrival that outranks its least urgent waiter by displacing
+    that waiter. Otherwise, when the queue is full or a waiter is not
+    admitted within max_queue_seconds, Overloaded is raised with a
+    Retry-After estimated from the recent service time.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_queue_seconds: float,
+                 priorities: tuple = PRIORITIES, name: str = "admission"):
+        self.name = name
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.max_queue_seconds = max_queue_seconds
+        self.priorities = priorities
+        self._lock = threading.Lock()
+        self._active = 0
+        self._waiters = []  # at most max_queue, so scanning beats keeping a heap in order
+        self._sequence = 0
+        self._service_seconds = None  # moving average, from the first finished request
+
+    @contextmanager
+    def admit(self, max_wait: Optional[float] = None, priority: Optional[str] = None):
+        """Hold a slot for the duration of the block.
+
+        max_wait shortens the queue time, e.g. to what is left of the
+        request's deadline. priority defaults to the least urgent class.
+        """
+        priority = priority if priority in self.priorities else self.priorities[-1]
+        start = time.monotonic()
+        self._acquire(
+            self.max_queue_seconds if max_wait is None else min(max_wait, self.max_queue_seconds),
+            self.priorities.index(priority)
+        )
+        admitted_at = time.monotonic()
+        metrics.increment(f"{self.name}_admitted.{priority}")
+        metrics.observe(f"{self.name}_queue_wait_seconds.{priority}", admitted_at - start)
+        try:
+            yield
+        finally:
+            self._release(time.monotonic() - admitted_at)
+
+    def _acquire(self, max_wait: float, rank: int):
+        with self._lock:
+            if self._active < self.max_concurrent and not self._waiters:
+                self._active += 1
+                return
+            self._sequence += 1
+            waiter = _Waiter(rank, self._sequence)
+            if len(self._waiters) >= self.max_queue:
+                if not self._waiters:
+                    # No queue at all (max_queue=0): nobody to displace
+                    raise self._reject("queue_full", rank)
+                last = max(self._waiters, key=lambda w: w.order)
+                if last.order[0] <= rank:
+                    raise self._reject("queue_full", rank)
+                self._waiters.remove(last)
+                last.displaced = True
+                last.event.set()
+            self._waiters.append(waiter)
+
+        waiter.event.wait(max_wait)
+        with self._lock:
+            # Checked under the lock: a slot may have been handed over just as the wait timed out
+            if waiter.admitted:
+                return
+            if waiter.displaced:
+                raise self._reject("displaced", rank)
+            self._waiters.remove(waiter)
+            raise self._reject("queue_timeout", rank)
+
+    def _release(self, service_seconds: float):
+        with self._lock:
+            if self._service_seconds is None:
+                self._service_seconds = service_seconds
+            else:
+                self._service_seconds += SERVICE_TIME_ALPHA * (service_seconds - self._service_seconds)
+            if self._waiters:
+                # The slot passes to the next waiter without ever being free
+                waiter = min(self._waiters, key=lambda w: w.order)
+                self._waiters.remove(waiter)
+                waiter.admitted = True
+                waiter.event.set()
+            else:
+                self._active -= 1
+
+    def _reject(self, reason: str, rank: int) -> Overloaded:
+        metrics.increment(f"{self.name}_rejected.{reason}.{self.priorities[rank]}")
+        return Overloaded(reason, self._retry_after(rank))
+
+    def _retry_after(self, rank: int) -> int:
+        # Time for the requests that would be served first to drain through the slots, in whole seconds
+        ahead = sum(1 for waiter in self._waiters if waiter.order[0] <= rank)
+        waves = (ahead + 1) / max(1, self.max_concurrent)
+        service_seconds = self._service_seconds if self._service_seconds is not None else INITIAL_SERVICE_SECONDS
+        return max(1, math.ceil(service_seconds * waves))
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = {
+                "active": self._active,
+                "queued": len(self._waiters),
+                "service_seconds": round(self._service_seconds or 0.0, 3),
+            }
+            for rank, priority in enumerate(self.priorities):
+                stats[f"queued.{priority}"] = sum(1 for waiter in self._waiters if waiter.order[0] == rank)
+            return stats
+
+
+@contextmanager
+def background_slot(priority: str):
+    """Admission slot for work nobody is waiting on, retried after Retry-After for as long as it is rejected.
+
+    Background work thus counts against the same limit as requests instead
+    of running beside it.
+    """
+    admission = get_admission_controller()
+    if admission is None:
+        yield
+        return
+    with ExitStack() as stack:
+        while True:
+            try:
+                stack.enter_context(admission.admit(priority=priority))
+                break
+            except Overloaded as e:
+                metrics.increment(f"{admission.name}_background_retries.{priority}")
+                time.sleep(e.retry_after)
+        yield
+
+
+_controller = None
+_controller_pid = None
+_controller_lock = threading.Lock()
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """This worker's controller for consultation requests, or None when ADMISSION_MAX_CONCURRENT is 0"""
+    global _controller, _controller_pid
+    with _controller_lock:
+        if _controller_pid != os.getpid():
+            max_concurrent = int(os.getenv("ADMISSION_MAX_CONCURRENT", 4))
+            _controller = AdmissionController(
+                max_concurrent,
+                max_queue=int(os.getenv("ADMISSION_MAX_QUEUE", 8)),
+                max_queue_seconds=float(os.getenv("ADMISSION_MAX_QUEUE_SECONDS", 5)),
+                priorities=PRIORITIES + (BATCH_PRIORITY,),
+            ) if max_concurrent > 0 else None
+            _controller_pid = os.getpid()
+        return _controller
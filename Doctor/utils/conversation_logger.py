@@ -1,79 +1,137 @@
-import json
+import sys
+import time
+import uuid
+import logging
 import datetime
 from typing import Dict, List
-import os
+
+from utils.transcript_log import get_transcript_log
+from utils.conversation_store import get_conversation_store
+
+PATIENT = "Patient"
 
 
 class ConversationLogger:
-    def __init__(self, log_file="conversation_log.json"):
-        self.log_file = log_file
-        self.conversation_history = []
-        self.current_session = {
-            "session_id": datetime.datetime.now().strftime("%Y%m%d_%H%M%S"),
-            "start_time": datetime.datetime.now().isoformat(),
-            "messages": [],
-        }
+    # One logger lives per session, so keep it slotted and its entries as tuples
+    __slots__ = ("transcript_log", "session_id", "start_time", "messages")
+
+    def __init__(self, session_id: str = None, transcript_log=None):
+        # None means the process-wide log from get_transcript_log()
+        self.transcript_log = transcript_log
+        # The server passes its session UUID; a timestamp would collide across sessions
+        self.session_id = session_id or str(uuid.uuid4())
+        self.start_time = time.time()
+        # (timestamp, agent, message, type) tuples
+        self.messages: List[tuple] = []
 
     def log_message(
-        self, agent_name: str, message: str, message_type: str = "response"
+        self, agent_name: str, message: str, message_type: str = "response", usage: Dict = None,
+        echo: bool = True, question_count: int = None
     ):
-        log_entry = {
-            "timestamp": datetime.datetime.now().isoformat(),
-            "agent": agent_name,
-            "message": message,
-            "type": message_type,
+        timestamp = time.time()
+        self.messages.append(
+            (timestamp, sys.intern(agent_name), message, sys.intern(message_type))
+        )
+        store = get_conversation_store()
+        if store is not None:
+            store.record_message(self.session_id, timestamp, agent_name, message_type, message, usage, question_count)
+
+        # Print to console with colors, unless the reply was already streamed there
+        if echo:
+            self._print_colored_message(agent_name, message, message_type)
+
+    def log_patient_message(self, message: str):
+        """Record a patient turn so the consultation can be replayed; it is not echoed"""
+        timestamp = time.time()
+        self.messages.append((timestamp, PATIENT, message, "patient"))
+        store = get_conversation_store()
+        if store is not None:
+            store.record_message(self.session_id, timestamp, PATIENT, "patient", message)
+
+    def log_stage(self, from_stage: str, to_stage: str, question_count: int = 0, specialist: str = None):
+        """Record a consultation stage transition in the conversation store, if one is enabled"""
+        store = get_conversation_store()
+        if store is not None:
+            store.record_stage(self.session_id, time.time(), from_stage, to_stage, question_count, specialist)
+
+    @property
+    def current_session(self) -> Dict:
+        """The session in the JSON log format"""
+        return {
+            "session_id": self.session_id,
+            "start_time": _iso(self.start_time),
+            "messages": [
+                {
+                    "timestamp": _iso(timestamp),
+                    "agent": agent,
+                    "message": message,
+                    "type": message_type,
+                }
+                for timestamp, agent, message, message_type in self.messages
+            ],
         }
-        self.current_session["messages"].append(log_entry)
 
-        # Print to console with colors
-        self._print_colored_message(agent_name, message, message_type)
+    def to_snapshot(self) -> Dict:
+        return {
+            "session_id": self.session_id,
+            "start_time": self.start_time,
+            "messages": [list(entry) for entry in self.messages],
+        }
+
+    def restore_snapshot(self, snapshot: Dict):
+        self.session_id = snapshot["session_id"]
+        self.start_time = snapshot["start_time"]
+        self.messages = [
+            (timestamp, sys.intern(agent), message, sys.intern(message_type))
+            for timestamp, agent, message, message_type in snapshot["messages"]
+        ]
 
     def _print_colored_message(self, agent_name: str, message: str, message_type: str):
-        try:
-            from colorama import Fore, Style, init
-
-            init()
-
-            color_map = {
-                "Dr. Sarah Chen": Fore.CYAN,
-                "Dr. Michael Rodriguez": Fore.RED,
-                "Dr. Lisa Patel": Fore.GREEN,
-                "Dr. James Thompson": Fore.YELLOW,
-                "Dr. Maria Garcia": Fore.MAGENTA,
-                "Dr. David Kim": Fore.BLUE,
-                "Patient": Fore.WHITE,
-            }
-
-            color = color_map.get(agent_name, Fore.WHITE)
-            print(f"\n{color}🩺 {agent_name}:{Style.RESET_ALL}")
-            print(f"{message}")
-            print("-" * 80)
-
-        except ImportError:
-            print(f"\n🩺 {agent_name}:")
-            print(f"{message}")
-            print("-" * 80)
+        print(format_agent_header(agent_name))
+        print(f"{message}")
+        print("-" * 80)
 
     def save_session(self):
-        self.current_session["end_time"] = datetime.datetime.now().isoformat()
+        session = self.current_session
+        session["end_time"] = datetime.datetime.now().isoformat()
+        store = get_conversation_store()
+        if store is not None:
+            store.record_session_end(self.session_id, time.time())
 
-        # Load existing data if file exists
-        if os.path.exists(self.log_file):
-            try:
-                with open(self.log_file, "r") as f:
-                    existing_data = json.load(f)
-            except:
-                existing_data = []
-        else:
-            existing_data = []
+        # Appends one record to the rotated, indexed log instead of rewriting a JSON file
+        transcript_log = self.transcript_log if self.transcript_log is not None else get_transcript_log()
+        try:
+            transcript_log.append(session)
+        except OSError as e:
+            logging.getLogger(__name__).warning(f"Failed to save conversation log: {e}")
 
-        # Append current session
-        existing_data.append(self.current_session)
+    def get_conversation_summary(self) -> str:
+        return f"Session {self.session_id}: {len(self.messages)} messages exchanged"
 
-        # Save to file
-        with open(self.log_file, "w") as f:
-            json.dump(existing_data, f, indent=2)
 
-    def get_conversation_summary(self) -> str:
-        messages = self.current_session["messages"]
-        return f"Session {self.current_session['session_id']}: {len(messages)} messages exchanged"
+def _iso(timestamp: float) -> str:
+    return datetime.datetime.fromtimestamp(timestamp).isoformat()
+
+
+def format_agent_header(agent_name: str) -> str:
+    """The "🩺 Name:" line printed before an agent's message, in the agent's color"""
+    try:
+        from colorama import Fore, Style, init
+
+        init()
+
+        color_map = {
+            "Dr. Sarah Chen": Fore.CYAN,
+            "Dr. Michael Rodriguez": Fore.RED,
+            "Dr. Lisa Patel": Fore.GREEN,
+            "Dr. James Thompson": Fore.YELLOW,
+            "Dr. Maria Garcia": Fore.MAGENTA,
+            "Dr. David Kim": Fore.BLUE,
+            PATIENT: Fore.WHITE,
+        }
+
+        color = color_map.get(agent_name, Fore.WHITE)
+        return f"\n{color}🩺 {agent_name}:{Style.RESET_ALL}"
+
+    except ImportError:
+        return f"\n🩺 {agent_name}:"
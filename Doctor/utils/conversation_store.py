@@ -0,0 +1,293 @@
+import os
+import time
+import queue
+import atexit
+import sqlite3
+import logging
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS agents (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL UNIQUE
+);
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY,
+    session_id TEXT NOT NULL UNIQUE,
+    started_at REAL NOT NULL,
+    ended_at REAL,
+    stage TEXT,
+    question_count INTEGER NOT NULL DEFAULT 0,
+    specialist TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    id INTEGER PRIMARY KEY,
+    session_row INTEGER NOT NULL REFERENCES sessions(id),
+    agent_row INTEGER NOT NULL REFERENCES agents(id),
+    created_at REAL NOT NULL,
+    type TEXT NOT NULL,
+    content TEXT NOT NULL,
+    input_tokens INTEGER,
+    output_tokens INTEGER
+);
+CREATE TABLE IF NOT EXISTS stage_transitions (
+    id INTEGER PRIMARY KEY,
+    session_row INTEGER NOT NULL REFERENCES sessions(id),
+    created_at REAL NOT NULL,
+    from_stage TEXT,
+    to_stage TEXT NOT NULL,
+    question_count INTEGER NOT NULL DEFAULT 0,
+    specialist TEXT
+);
+CREATE INDEX IF NOT EXISTS messages_by_session ON messages(session_row, created_at);
+CREATE INDEX IF NOT EXISTS messages_by_agent ON messages(agent_row, created_at);
+-- Covering indexes so time-window reports never touch the table rows
+CREATE INDEX IF NOT EXISTS messages_by_time ON messages(created_at, agent_row, input_tokens, output_tokens);
+CREATE INDEX IF NOT EXISTS transitions_by_session ON stage_transitions(session_row, created_at);
+CREATE INDEX IF NOT EXISTS transitions_by_stage ON stage_transitions(to_stage, created_at, specialist);
+CREATE INDEX IF NOT EXISTS sessions_by_start ON sessions(started_at);
+CREATE INDEX IF NOT EXISTS sessions_by_questions ON sessions(question_count);
+"""
+
+_STOP = object()
+
+
+class SQLiteConversationStore:
+    """Normalized conversation store in SQLite, written in batches by a background thread.
+
+    Callers only enqueue rows, so logging never waits on the disk. The writer
+    commits up to batch_size rows, or whatever arrived within flush_interval,
+    in one transaction. WAL mode lets reporting queries run while it writes,
+    and several worker processes can share one database file.
+    """
+
+    def __init__(self, path: str, batch_size: int = 500, flush_interval: float = 0.5,
+                 max_queue: int = 100_000, session_cache_size: int = 10_000):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue = queue.Queue(maxsize=max_queue)
+        # Row ids of recently seen sessions and agents; only the writer thread touches these
+        self._session_rows: "OrderedDict[str, int]" = OrderedDict()
+        self._session_cache_size = session_cache_size
+        self._agent_rows: Dict[str, int] = {}
+
+        connection = self._connect()
+        connection.executescript(SCHEMA)
+        connection.close()
+
+        self._thread = threading.Thread(target=self._run, name="conversation-store", daemon=True)
+        self._thread.start()
+
+    def _connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.path, timeout=10)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    # Producers
+
+    def record_message(self, session_id: str, created_at: float, agent: str, message_type: str,
+                       content: str, usage: Optional[dict] = None, question_count: Optional[int] = None):
+        """Queue a message; question_count, when given, is the session's count as of this message"""
+        usage = usage or {}
+        self._put(("message", session_id, created_at, agent, message_type, content,
+                   usage.get("input_tokens"), usage.get("output_tokens"), question_count))
+
+    def record_stage(self, session_id: str, created_at: float, from_stage: Optional[str], to_stage: str,
+                     question_count: int = 0, specialist: Optional[str] = None):
+        self._put(("stage", session_id, created_at, from_stage, to_stage, question_count, specialist))
+
+    def record_session_end(self, session_id: str, ended_at: float):
+        self._put(("end", session_id, ended_at))
+
+    def _put(self, item):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Reporting data is best effort; never hold up a consultation for it
+            metrics.increment("conversation_store_dropped")
+
+    def flush(self, timeout: float = None) -> bool:
+        """Wait until everything queued so far has been committed"""
+        done = threading.Event()
+        self._queue.put(done)
+        return done.wait(timeout)
+
+    def close(self, timeout: float = 10):
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    # Writer thread
+
+    def _run(self):
+        connection = self._connect()
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+
+            rows = [item for item in batch if isinstance(item, tuple)]
+            if rows:
+                self._write(connection, rows)
+            for item in batch:
+                if item is _STOP:
+                    stopping = True
+                elif isinstance(item, threading.Event):
+                    item.set()
+        connection.close()
+
+    def _write(self, connection: sqlite3.Connection, rows: List[tuple]):
+        start = time.perf_counter()
+        messages, transitions, updates, counts, ends = [], [], [], [], []
+        try:
+            with connection:
+                for kind, session_id, created_at, *fields in rows:
+                    session_row = self._session_row(connection, session_id, created_at)
+                    if kind == "message":
+                        agent, message_type, content, input_tokens, output_tokens, question_count = fields
+                        messages.append((session_row, self._agent_row(connection, agent), created_at,
+                                         message_type, content, input_tokens, output_tokens))
+                        if question_count is not None:
+                            # History taking writes no stage rows, so the count is kept current here
+                            counts.append((question_count, session_row))
+                    elif kind == "stage":
+                        from_stage, to_stage, question_count, specialist = fields
+                        transitions.append((session_row, created_at, from_stage, to_stage, question_count, specialist))
+                        updates.append((to_stage, question_count, specialist, session_row))
+                    else:
+                        ends.append((created_at, session_row))
+
+                connection.executemany(
+                    "INSERT INTO messages (session_row, agent_row, created_at, type, content, input_tokens, output_tokens) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?)", messages)
+                connection.executemany(
+                    "INSERT INTO stage_transitions (session_row, created_at, from_stage, to_stage, question_count, specialist) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", transitions)
+                connection.executemany(
+                    "UPDATE sessions SET stage = ?, question_count = ?, specialist = COALESCE(?, specialist) "
+                    "WHERE id = ?", updates)
+                connection.executemany(
+                    "UPDATE sessions SET question_count = MAX(question_count, ?) WHERE id = ?", counts)
+                connection.executemany("UPDATE sessions SET ended_at = ? WHERE id = ?", ends)
+        except sqlite3.Error as e:
+            # Row ids cached during the failed transaction were rolled back with it
+            self._session_rows.clear()
+            self._agent_rows.clear()
+            metrics.increment("conversation_store_failed_rows", len(rows))
+            logger.warning(f"Failed to write {len(rows)} rows to the conversation store: {e}")
+            return
+        metrics.increment("conversation_store_rows_written", len(rows))
+        metrics.observe("conversation_store_batch_seconds", time.perf_counter() - start)
+
+    def _session_row(self, connection: sqlite3.Connection, session_id: str, started_at: float) -> int:
+        row = self._session_rows.get(session_id)
+        if row is None:
+            connection.execute(
+                "INSERT OR IGNORE INTO sessions (session_id, started_at) VALUES (?, ?)", (session_id, started_at)
+            )
+            row = connection.execute("SELECT id FROM sessions WHERE session_id = ?", (session_id,)).fetchone()[0]
+            self._session_rows[session_id] = row
+            if len(self._session_rows) > self._session_cache_size:
+                self._session_rows.popitem(last=False)
+        else:
+            self._session_rows.move_to_end(session_id)
+        return row
+
+    def _agent_row(self, connection: sqlite3.Connection, agent: str) -> int:
+        row = self._agent_rows.get(agent)
+        if row is None:
+            connection.execute("INSERT OR IGNORE INTO agents (name) VALUES (?)", (agent,))
+            row = connection.execute("SELECT id FROM agents WHERE name = ?", (agent,)).fetchone()[0]
+            self._agent_rows[agent] = row
+        return row
+
+    # Reporting
+
+    def query(self, sql: str, params: tuple = ()) -> List[tuple]:
+        """Run a read-only query on its own connection"""
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True, timeout=10)
+        try:
+            return connection.execute(sql, params).fetchall()
+        finally:
+            connection.close()
+
+    def consultations_per_specialist_per_hour(self, since: float) -> List[tuple]:
+        """(specialist, hour start epoch, consultations) for specialist consultations since a time"""
+        return self.query(
+            "SELECT specialist, CAST(created_at / 3600 AS INTEGER) * 3600 AS hour, COUNT(*) "
+            "FROM stage_transitions "
+            "WHERE to_stage = 'specialist_consultation' AND created_at >= ? "
+            "GROUP BY specialist, hour ORDER BY hour, specialist",
+            (since,),
+        )
+
+    def sessions_at_question_limit(self, max_questions: int, limit: int = 100) -> List[tuple]:
+        """(session_id, question_count, stage, specialist) for sessions that used the whole question budget"""
+        return self.query(
+            "SELECT session_id, question_count, stage, specialist FROM sessions "
+            "WHERE question_count >= ? ORDER BY question_count DESC, id DESC LIMIT ?",
+            (max_questions, limit),
+        )
+
+    def tokens_per_agent(self, since: float) -> List[tuple]:
+        """(agent, messages, input tokens, output tokens) since a time"""
+        return self.query(
+            "SELECT a.name, t.messages, t.input_tokens, t.output_tokens FROM ("
+            "SELECT agent_row, COUNT(*) AS messages, COALESCE(SUM(input_tokens), 0) AS input_tokens, "
+            "COALESCE(SUM(output_tokens), 0) AS output_tokens "
+            # Without ANALYZE statistics the planner would scan messages_by_agent instead
+            "FROM messages INDEXED BY messages_by_time WHERE created_at >= ? GROUP BY agent_row"
+            ") t JOIN agents a ON a.id = t.agent_row ORDER BY a.name",
+            (since,),
+        )
+
+    def session_messages(self, session_id: str) -> List[tuple]:
+        """(created_at, agent, type, content) for one session in order"""
+        return self.query(
+            "SELECT m.created_at, a.name, m.type, m.content "
+            "FROM messages m JOIN agents a ON a.id = m.agent_row "
+            "WHERE m.session_row = (SELECT id FROM sessions WHERE session_id = ?) ORDER BY m.created_at",
+            (session_id,),
+        )
+
+
+_store = None
+_store_pid = None
+_store_lock = threading.Lock()
+
+
+def get_conversation_store() -> Optional[SQLiteConversationStore]:
+    """The process-wide conversation store, or None unless CONVERSATION_DB is set"""
+    global _store, _store_pid
+    if _store_pid == os.getpid():
+        return _store
+    with _store_lock:
+        if _store_pid != os.getpid():
+            # The writer thread does not survive a fork, so each worker opens its own
+            path = os.getenv("CONVERSATION_DB")
+            _store = None
+            if path:
+                _store = SQLiteConversationStore(
+                    path,
+                    batch_size=int(os.getenv("CONVERSATION_DB_BATCH_SIZE", 500)),
+                    flush_interval=float(os.getenv("CONVERSATION_DB_FLUSH_SECONDS", 0.5)),
+                )
+                atexit.register(_store.close)
+            _store_pid = os.getpid()
+        return _store
@@ -0,0 +1,125 @@
+import os
+import time
+import select
+import socket
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Callable, Optional
+
+from utils.metrics import metrics
+
+# Budget for a request that does not bring its own; below the Backend's 30 s FLASK_API_TIMEOUT
+DEFAULT_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_SECONDS", 25))
+# Upper bound on a budget asked for in the header
+MAX_TIMEOUT_SECONDS = float(os.getenv("REQUEST_TIMEOUT_MAX_SECONDS", 110))
+# Kept back from the caller's budget so the reply can reach it before it gives up
+RESPONSE_MARGIN_SECONDS = 0.5
+
+TIMEOUT_HEADER = "X-Request-Timeout-Ms"
+
+_current: ContextVar[Optional["Deadline"]] = ContextVar("request_deadline", default=None)
+
+
+class RequestAbandoned(Exception):
+    """Raised instead of starting (or waiting on) LLM work nobody will receive"""
+
+    def __init__(self, reason: str):
+        super().__init__(f"Request abandoned: {reason}")
+        self.reason = reason
+
+
+class Deadline:
+    """Time budget of one request, optionally tied to the client's connection.
+
+    Checked before every LLM call: once the budget is spent or the client has
+    hung up, the call is skipped and RequestAbandoned unwinds the turn. A call
+    already in flight cannot be interrupted, but its HTTP timeout is the
+    budget remaining when it started.
+    """
+
+    def __init__(self, seconds: float, is_disconnected: Callable[[], bool] = None):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+        self._is_disconnected = is_disconnected
+        self.abandoned = None
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+    def check(self, stage: str) -> float:
+        """Seconds left for work at `stage`; raises RequestAbandoned if none should start"""
+        if self.abandoned is None:
+            if self.expired():
+                self.abandoned = "deadline"
+            elif self._is_disconnected is not None and self._is_disconnected():
+                self.abandoned = "disconnect"
+            else:
+                return self.remaining()
+            metrics.increment(f"requests_abandoned.{self.abandoned}")
+        metrics.increment(f"llm_calls_abandoned.{stage}")
+        raise RequestAbandoned(self.abandoned)
+
+    def timed_out(self, stage: str) -> RequestAbandoned:
+        """Record an LLM call cut off by its timeout and return the error to raise"""
+        if self.abandoned is None:
+            self.abandoned = "deadline"
+            metrics.increment("requests_abandoned.deadline")
+        metrics.increment(f"llm_calls_timed_out.{stage}")
+        return RequestAbandoned(self.abandoned)
+
+
+def current_deadline() -> Optional[Deadline]:
+    """Deadline of the request being served on this context, if any"""
+    return _current.get()
+
+
+@contextmanager
+def deadline_scope(deadline: Optional[Deadline]):
+    """Make `deadline` current for LLM calls made within, including graph worker threads.
+
+    LangGraph copies the context into the threads that run its nodes, so the
+    deadline follows parallel specialists too.
+    """
+    token = _current.set(deadline)
+    try:
+        yield deadline
+    finally:
+        _current.reset(token)
+
+
+def request_deadline(headers, environ) -> Deadline:
+    """Deadline for an incoming request from its timeout header, or the default budget"""
+    seconds = DEFAULT_TIMEOUT_SECONDS
+    value = headers.get(TIMEOUT_HEADER)
+    if value:
+        try:
+            seconds = min(float(value) / 1000, MAX_TIMEOUT_SECONDS)
+        except ValueError:
+            metrics.increment("request_timeout_header_invalid")
+    return Deadline(max(0.0, seconds - RESPONSE_MARGIN_SECONDS), disconnect_probe(environ))
+
+
+def disconnect_probe(environ) -> Optional[Callable[[], bool]]:
+    """Callable telling whether the client has closed its connection, or None if the server hides the socket.
+
+    A closed connection reads as end-of-file; pipelined bytes from a live one
+    are only peeked at, never consumed.
+    """
+    sock = environ.get("gunicorn.socket") or environ.get("werkzeug.socket")
+    if sock is None:
+        return None
+
+    def is_disconnected() -> bool:
+        try:
+            readable, _, _ = select.select([sock], [], [], 0)
+            return bool(readable) and sock.recv(1, socket.MSG_PEEK) == b""
+        except ValueError:
+            # TLS sockets do not support peeking; assume the client is still there
+            return False
+        except OSError:
+            return True
+
+    return is_disconnected
@@ -0,0 +1,140 @@
+"""Zero-LLM emergency detector for patient messages.
+
+A curated, versioned set of high-precision phrases, compiled into one regex,
+flags messages that clearly describe a medical emergency so the patient can
+be told to seek emergency care within milliseconds, before any LLM call. It
+complements the broader red-flag scorer in utils/red_flags.py, which only
+orders work: a phrase here must on its own be enough to send someone to
+emergency care. Bump EMERGENCY_RULES_VERSION whenever the rules change; it is
+reported with every alert.
+"""
+import re
+from typing import NamedTuple, Optional
+
+from utils.red_flags import negated
+
+EMERGENCY_RULES_VERSION = "2026.10.1"
+
+EMERGENCY_NUMBER = "your local emergency number (911 in the US, 112 in Europe, 999 in the UK)"
+
+# category -> (what the patient described, first step while help is on the way, patterns)
+EMERGENCY_RULES = {
+    "cardiac": (
+        "chest pain that may be a heart attack",
+        "Stop what you are doing, sit down and rest, and unlock your door if you are alone.",
+        [
+            r"crushing (?:chest )?pain|crushing (?:feeling|pressure) in (?:my|the) chest",
+            r"chest (?:pain|pressure|tightness)\b[^.]{0,60}\b(?:spread\w*|radiat\w*|going|goes) (?:down |up |in)?(?:to |into )?"
+            r"(?:my |the )?(?:left arm|arm|jaw|neck)",
+            r"chest (?:pain|pressure|tightness)\b[^.]{0,60}\b(?:sweating|cold sweat|can'?t breathe|about to pass out)",
+            r"(?:having|think i'?m having|might be having) a heart attack",
+        ],
+    ),
+    "cardiac_arrest": (
+        "someone who may not be breathing or has no pulse",
+        "Start CPR if you know how: push hard and fast in the centre of the chest.",
+        [
+            r"(?:is|isn'?t|not|stopped) breathing and (?:is )?(?:not|un)responsive|no pulse|cardiac arrest",
+            r"collapsed and (?:won'?t|can'?t|isn'?t|is not) (?:wake|waking|respond\w*|breath\w*)",
+        ],
+    ),
+    "stroke": (
+        "signs of a stroke",
+        "Note the time the symptoms started; doctors will need it.",
+        [
+            r"(?:face|mouth|smile) (?:is |has )?(?:droop\w*|drooping|lopsided)|droop\w* (?:face|mouth|smile)",
+            r"slurr\w* (?:speech|words)|speech (?:is |became |has become )?slurr\w*",
+            r"sudden\w* (?:can'?t|cannot|unable to) (?:move|feel|lift) (?:my |the |his |her )?(?:left|right|one) (?:side|arm|leg)",
+            r"sudden (?:numbness|weakness|paralysis) (?:on|in|of) (?:one|my left|my right|the left|the right) side",
+            r"worst headache of my life|thunderclap headache|(?:having|think i'?m having) a stroke",
+        ],
+    ),
+    "anaphylaxis": (
+        "a severe allergic reaction",
+        "Use an adrenaline (epinephrine) auto-injector now if you have one.",
+        [
+            r"throat (?:is |feels )?(?:closing|swelling|swollen)(?: up)?",
+            r"(?:tongue|lips) (?:are |is )?(?:swelling|swollen)\b[^.]{0,60}\b(?:breath\w*|swallow\w*)",
+            r"anaphyla\w*",
+        ],
+    ),
+    "breathing": (
+        "serious trouble breathing",
+        "Sit upright and stay as calm as you can; loosen anything tight around your neck or chest.",
+        [
+            r"can'?t (?:breathe|catch (?:my|a) breath) at all|gasping for (?:air|breath)",
+            r"(?:lips|face|skin) (?:are |is |turning )+blue|turning blue",
+            r"(?:is )?choking and can'?t",
+        ],
+    ),
+    "bleeding": (
+        "heavy bleeding",
+        "Press firmly on the wound with a clean cloth and keep the pressure on.",
+        [
+            r"bleeding (?:won'?t|will not|doesn'?t) stop|(?:won'?t|can'?t) stop (?:the )?bleeding|bleeding heavily",
+            r"(?:vomiting|throwing up|coughing up) (?:a lot of |lots of )?blood",
+        ],
+    ),
+    "self_harm": (
+        "thoughts of ending your life",
+        "You are not alone. In the US you can call or text 988, or contact your local crisis line, right now.",
+        [
+            r"(?:want|going|plan\w*) to (?:kill myself|end my life|die)",
+            r"suicid\w*|kill myself|end it all",
+            r"(?:took|taken|swallowed) (?:a lot of|too many|all (?:my|the)) (?:pills|tablets)|overdos\w*",
+        ],
+    ),
+    "seizure": (
+        "a seizure or loss of consciousness",
+        "Move hard objects away, turn the person on their side and do not put anything in their mouth.",
+        [
+            r"seizure (?:that )?(?:won'?t stop|is lasting|lasting (?:more|over))|fitting and won'?t stop",
+            r"(?:is |went |passed out and is )?unconscious|(?:won'?t|can'?t) wake (?:him|her|them|up)",
+        ],
+    ),
+}
+
+EMERGENCY_TEMPLATE = (
+    "⚠️ What you describe ({description}) can be a medical emergency. "
+    "Please call {number} or go to the nearest emergency department now. Do not wait for this consultation "
+    "and do not drive yourself. {first_step}\n\n"
+    "This assistant is for education only and cannot help in an emergency. "
+    "If you are safe and want to, you can keep chatting while you wait for help."
+)
+
+
+class EmergencyMatch(NamedTuple):
+    category: str
+    phrase: str
+    message: str
+    rules_version: str
+
+
+def _compile():
+    # One alternation with a named group per rule, so a message is scanned once
+    groups = []
+    for category, (_, _, patterns) in EMERGENCY_RULES.items():
+        for index, pattern in enumerate(patterns):
+            groups.append(f"(?P<{category}__{index}>{pattern})")
+    return re.compile("|".join(groups), re.IGNORECASE)
+
+
+_MATCHER = _compile()
+
+
+def detect_emergency(message: str, already_alerted=()) -> Optional[EmergencyMatch]:
+    """The first affirmed emergency in a message, skipping categories the session was already alerted to"""
+    if not message:
+        return None
+    for match in _MATCHER.finditer(message):
+        category = match.lastgroup.split("__")[0]
+        if category in already_alerted or negated(message, match.start()):
+            continue
+        description, first_step, _ = EMERGENCY_RULES[category]
+        return EmergencyMatch(
+            category=category,
+            phrase=match.group(0),
+            message=EMERGENCY_TEMPLATE.format(description=description, number=EMERGENCY_NUMBER, first_step=first_step),
+            rules_version=EMERGENCY_RULES_VERSION,
+        )
+    return None
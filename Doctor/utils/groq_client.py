@@ -1,29 +1,290 @@
 import os
-from langchain_groq import ChatGroq
+import json
+import hashlib
+import logging
+import threading
+import time
+from functools import partial
 from dotenv import load_dotenv
+from utils.single_flight import LeaderAbandoned, SingleFlight
+from utils.metrics import metrics
+from utils.deadline import RequestAbandoned, current_deadline
+from utils.http_pool import get_async_http_client, get_http_client, warm_connection
+from utils.model_registry import (
+    MODELS,
+    load_routing,
+    load_max_tokens,
+    resolve_model,
+    resolve_max_tokens,
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+# Process-wide so identical requests from different sessions share one completion
+llm_flight = SingleFlight("llm_singleflight")
+
+# Retries of a deadline-bounded call, made here rather than by the SDK so each one fits the budget
+DEADLINE_MAX_RETRIES = int(os.getenv("LLM_DEADLINE_MAX_RETRIES", 2))
+RETRY_BACKOFF_SECONDS = 0.5
+RETRY_BACKOFF_MAX_SECONDS = 8.0
+# Provider statuses worth retrying, as the SDK's own retry policy
+RETRYABLE_STATUSES = frozenset({408, 409, 429})
+
+
+class CoalescedLLM:
+    """Chat model wrapper that shares one in-flight completion between identical requests"""
+
+    def __init__(self, llm, params: dict, model_key: str = None, stage: str = "default", tools=None,
+                 tool_choice: str = None, deadline_llm=None):
+        self._llm = llm
+        # Same model without SDK retries, for calls bounded by a request deadline
+        self._deadline_llm = deadline_llm or llm
+        self.params = params
+        self.model_key = model_key
+        self.stage = stage
+        self.tools = tools or []
+        self.tool_choice = tool_choice
+        self._bound = self._bind(llm)
+        self._deadline_bound = self._bind(self._deadline_llm)
+
+    def _bind(self, llm):
+        if self.tools:
+            return llm.bind_tools(self.tools, tool_choice=self.tool_choice, max_tokens=self.params["max_tokens"])
+        return llm.bind(max_tokens=self.params["max_tokens"])
+
+    def bind_tools(self, tools, tool_choice: str = None):
+        return CoalescedLLM(
+            self._llm, self.params, model_key=self.model_key, stage=self.stage, tools=tools,
+            tool_choice=tool_choice, deadline_llm=self._deadline_llm
+        )
+
+    def invoke(self, messages):
+        deadline = current_deadline()
+        key = self._request_key(messages)
+        metrics.increment("llm_requests")
+        while True:
+            if deadline is None:
+                timeout = None
+                call = partial(self._invoke_and_record, messages)
+            else:
+                # Skip the call once the request is abandoned; otherwise it may use what is left of the budget
+                timeout = deadline.check(self.stage)
+                call = partial(self._invoke_within, messages, deadline)
+            try:
+                # A leader that ran out of its own budget or lost its client does not fail the
+                # requests that joined it: each tries again, as the leader if need be, on its own budget
+                return llm_flight.do(key, call, timeout=timeout, leader_only=(RequestAbandoned,))
+            except LeaderAbandoned:
+                continue
+            except RequestAbandoned:
+                raise
+            except Exception as e:
+                if deadline is not None and deadline.expired():
+                    raise deadline.timed_out(self.stage) from e
+                raise
+
+    async def ainvoke(self, messages, on_token=None):
+        """Stream the completion on the event loop, passing each text chunk to on_token.
+
+        Streams are not coalesced: every caller wants its own tokens, and
+        cancelling the awaiting task aborts the request.
+        """
+        metrics.increment("llm_requests")
+        start = time.perf_counter()
+        response = None
+        async for chunk in self._bound.astream(messages):
+            if response is None:
+                metrics.observe(f"llm_ttft_seconds.{self.stage}", time.perf_counter() - start)
+                response = chunk
+            else:
+                response = response + chunk
+            if on_token is not None and chunk.content:
+                on_token(chunk.content)
+        return self._record(response)
+
+    def _invoke_and_record(self, messages):
+        return self._record(self._bound.invoke(messages))
+
+    def _invoke_within(self, messages, deadline):
+        """Call the model with retries that all fit in the deadline.
+
+        Every attempt is given only the time left as its HTTP timeout, and a
+        retry is skipped once its backoff would not leave any time to run.
+        """
+        attempt = 0
+        while True:
+            timeout = deadline.check(self.stage)
+            try:
+                return self._record(self._deadline_bound.invoke(messages, timeout=timeout))
+            except Exception as e:
+                # Cut off by this request's own budget: RequestAbandoned, so requests sharing the call retry
+                if deadline.expired():
+                    raise deadline.timed_out(self.stage) from e
+                backoff = min(RETRY_BACKOFF_SECONDS * 2 ** attempt, RETRY_BACKOFF_MAX_SECONDS)
+                if attempt >= DEADLINE_MAX_RETRIES or not _retryable(e) or deadline.remaining() <= backoff:
+                    raise
+            attempt += 1
+            metrics.increment(f"llm_retries.{self.stage}")
+            time.sleep(backoff)
+
+    def _record(self, response):
+        usage = getattr(response, "usage_metadata", None) or {}
+        if usage:
+            input_tokens = usage.get("input_tokens", 0)
+            output_tokens = usage.get("output_tokens", 0)
+            metrics.increment(f"llm_input_tokens.{self.model_key}", input_tokens)
+            metrics.increment(f"llm_output_tokens.{self.model_key}", output_tokens)
+            metrics.increment(f"llm_output_tokens_by_stage.{self.stage}", output_tokens)
+
+        finish_reason = (getattr(response, "response_metadata", None) or {}).get("finish_reason")
+        if finish_reason == "length":
+            metrics.increment(f"llm_truncated.{self.stage}")
+            logger.warning(
+                f"LLM output truncated at max_tokens={self.params['max_tokens']} "
+                f"(stage={self.stage}, model={self.model_key})"
+            )
+        return response
+
+    def _request_key(self, messages) -> str:
+        payload = {
+            "params": self.params,
+            "tools": [_tool_name(t) for t in self.tools],
+            "tool_choice": self.tool_choice,
+            "messages": messages,
+        }
+        raw = json.dumps(payload, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _retryable(error: Exception) -> bool:
+    status = getattr(error, "status_code", None)
+    if status is not None:
+        return status in RETRYABLE_STATUSES or status >= 500
+    # Connection failures and timeouts carry no status
+    return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def _tool_name(tool) -> str:
+    if isinstance(tool, dict):
+        return tool.get("function", {}).get("name", str(tool))
+    return getattr(tool, "name", str(tool))
+
+
+class ModelRouter:
+    """Hands each agent the chat model and generation cap assigned to it for a consultation stage.
+
+    The router itself is configuration and may be built before fork; the chat
+    models it caches hold the pooled HTTP clients, so each process builds its own.
+    """
+
+    def __init__(self, api_key: str, routing: dict, max_tokens: dict):
+        self.api_key = api_key
+        self.routing = routing
+        self.max_tokens = max_tokens
+        self._models = {}
+        self._models_pid = os.getpid()
+
+    def for_stage(self, stage: str, agent: str = None) -> CoalescedLLM:
+        model_key = resolve_model(self.routing, stage, agent)
+        metrics.increment(f"llm_routed.{stage}.{model_key}")
+        params = {
+            "model_name": MODELS[model_key]["model_name"],
+            "temperature": 0.3,
+            "max_tokens": resolve_max_tokens(self.max_tokens, stage, agent),
+        }
+        return CoalescedLLM(
+            self.get_model(model_key), params, model_key=model_key, stage=stage,
+            deadline_llm=self.get_model(model_key, max_retries=0)
+        )
+
+    def get_model(self, model_key: str, max_retries: int = None):
+        """Chat model for a model key; max_retries overrides the SDK's retry count"""
+        cache_key = (model_key, max_retries)
+        if self._models_pid != os.getpid():
+            # Forked from the process that built these: their connections are not ours to use
+            self._models = {}
+            self._models_pid = os.getpid()
+        if cache_key not in self._models:
+            # Deferred so importing this module does not pull in langchain
+            from langchain_groq import ChatGroq
+
+            options = {} if max_retries is None else {"max_retries": max_retries}
+            # Every model shares the process-wide pooled HTTP clients, sync and async
+            self._models[cache_key] = ChatGroq(
+                groq_api_key=self.api_key,
+                model_name=MODELS[model_key]["model_name"],
+                temperature=0.3,
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client(),
+                **options,
+            )
+        return self._models[cache_key]
+
+    def invoke(self, messages):
+        return self.for_stage("default").invoke(messages)
+
+    def routed_models(self):
+        """Model keys that the routing table can hand out"""
+        return sorted(set(self.routing.values()))
+
 
 class GroqClient:
-    def __init__(self):
+    def __init__(self, routing_profile: str = None, uniform_max_tokens: int = None):
         self.api_key = os.getenv("GROQ_API_KEY")
         if not self.api_key:
             raise ValueError("GROQ_API_KEY not found in environment variables")
 
-        self.llm = ChatGroq(
-            groq_api_key=self.api_key,
-            model_name="openai/gpt-oss-120b",
-            temperature=0.3,
-            max_tokens=1000,
+        self.llm = ModelRouter(
+            self.api_key,
+            load_routing(routing_profile),
+            load_max_tokens(uniform_max_tokens),
         )
 
     def get_llm(self):
         return self.llm
 
+    def warm_up(self, timeout: float = None):
+        """Build every routed model and open a pooled provider connection.
+
+        TLS and connection setup are paid here, before the first patient
+        request, using a model-list call so no tokens are spent; timeout
+        bounds that call.
+        """
+        start = time.perf_counter()
+        try:
+            for model_key in self.llm.routed_models():
+                self.llm.get_model(model_key)
+                self.llm.get_model(model_key, max_retries=0)
+            warm_connection(self.api_key, timeout)
+            metrics.increment("llm_warmups")
+        except Exception as e:
+            metrics.increment("llm_warmup_failures")
+            logger.warning(f"LLM warm-up failed: {str(e)}")
+        finally:
+            metrics.observe("llm_warmup_seconds", time.perf_counter() - start)
+
     def test_connection(self):
         try:
             response = self.llm.invoke("Hello, this is a test.")
             return True, "Connection successful"
         except Exception as e:
             return False, f"Connection failed: {str(e)}"
+
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+def get_shared_client() -> GroqClient:
+    """Return the process-wide GroqClient, creating it on first use.
+
+    It holds no connections itself (see ModelRouter), so a client built in a
+    preloading master is inherited by every worker forked from it.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = GroqClient()
+        return _shared_client
@@ -0,0 +1,157 @@
+"""JSON serialization and response compression for the API.
+
+Consultation payloads carry kilobytes of specialist markdown on every
+specialist-stage call, so responses are serialized with orjson when it is
+installed and compressed (brotli when installed and accepted, else gzip)
+once they pass COMPRESSION_MIN_BYTES. Static endpoints precompute their body,
+ETag and compressed variants once. Serialization and compression CPU time
+and bytes before and after compression are recorded in metrics.
+"""
+import os
+import gzip
+import json
+import time
+import hashlib
+from typing import Optional
+
+from utils.metrics import metrics
+
+try:
+    import orjson
+except ImportError:  # stdlib json fallback
+    orjson = None
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Smaller bodies fit in one packet anyway, so compressing them only costs CPU
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", 1024))
+# Fast settings: most of the size win for a fraction of the CPU of the maximum levels
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+COMPRESSIBLE_MIMETYPES = frozenset({"application/json", "application/x-ndjson", "text/plain", "text/html"})
+
+
+def dumps(obj) -> bytes:
+    """Compact UTF-8 JSON, without the key sorting and ASCII escaping of Flask's default encoder"""
+    start = time.thread_time()
+    if orjson is not None:
+        try:
+            body = orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS)
+        except TypeError:
+            # Types orjson does not know (e.g. sets) go through the stdlib encoder
+            body = _stdlib_dumps(obj)
+    else:
+        body = _stdlib_dumps(obj)
+    metrics.observe("json_serialize_cpu_seconds", time.thread_time() - start)
+    return body
+
+
+def _stdlib_dumps(obj) -> bytes:
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def _default(obj):
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    return str(obj)
+
+
+def loads(data):
+    return orjson.loads(data) if orjson is not None else json.loads(data)
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    start = time.thread_time()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=BROTLI_QUALITY)
+    else:
+        compressed = gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+    metrics.observe(f"compress_cpu_seconds.{encoding}", time.thread_time() - start)
+    return compressed
+
+
+def negotiate(accept_encodings) -> Optional[str]:
+    """Best encoding the client accepts (a werkzeug Accept of Accept-Encoding), or None"""
+    if brotli is not None and accept_encodings.quality("br") > 0:
+        return "br"
+    if accept_encodings.quality("gzip") > 0:
+        return "gzip"
+    return None
+
+
+class StaticJSON:
+    """A JSON body that never changes, encoded, tagged and compressed once"""
+
+    def __init__(self, payload, max_age: int = 300):
+        self.body = dumps(payload)
+        self.etag = hashlib.sha256(self.body).hexdigest()[:20]
+        self.max_age = max_age
+        self.variants = {"gzip": compress(self.body, "gzip")}
+        if brotli is not None:
+            self.variants["br"] = compress(self.body, "br")
+
+    def response(self, request, response_class):
+        """200 with the best precompressed variant, or 304 when the client already has it"""
+        # Weak: the tag names the content, which is served in several encodings
+        headers = {
+            "ETag": f'W/"{self.etag}"',
+            "Cache-Control": f"public, max-age={self.max_age}",
+            "Vary": "Accept-Encoding",
+        }
+        if request.if_none_match.contains_weak(self.etag):
+            metrics.increment("static_json_not_modified")
+            return response_class(status=304, headers=headers)
+
+        encoding = negotiate(request.accept_encodings)
+        if encoding not in self.variants:
+            # Uncompressed bodies are counted by the after_request hook
+            return response_class(self.body, mimetype="application/json", headers=headers)
+        headers["Content-Encoding"] = encoding
+        metrics.increment("http_bytes_raw", len(self.body))
+        metrics.increment("http_bytes_sent", len(self.variants[encoding]))
+        return response_class(self.variants[encoding], mimetype="application/json", headers=headers)
+
+
+def install(app):
+    """Serve every jsonify response with the fast encoder and compress large responses"""
+    from flask import request
+    from flask.json.provider import DefaultJSONProvider
+
+    class FastJSONProvider(DefaultJSONProvider):
+        def dumps(self, obj, **kwargs) -> str:
+            return dumps(obj).decode("utf-8")
+
+        def loads(self, s, **kwargs):
+            return loads(s)
+
+        def response(self, *args, **kwargs):
+            obj = self._prepare_response_obj(args, kwargs)
+            # Bytes straight through: no str round trip and no trailing newline
+            return self._app.response_class(dumps(obj), mimetype=self.mimetype)
+
+    app.json = FastJSONProvider(app)
+
+    @app.after_request
+    def compress_response(response):
+        if (response.direct_passthrough or response.is_streamed or response.status_code < 200
+                or response.status_code in (204, 304) or "Content-Encoding" in response.headers
+                or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+            return response
+
+        body = response.get_data()
+        metrics.increment("http_bytes_raw", len(body))
+        encoding = negotiate(request.accept_encodings) if len(body) >= COMPRESSION_MIN_BYTES else None
+        if encoding is not None:
+            body = compress(body, encoding)
+            response.set_data(body)
+            response.headers["Content-Encoding"] = encoding
+            metrics.increment(f"http_compressed.{encoding}")
+        response.vary.add("Accept-Encoding")
+        metrics.increment("http_bytes_sent", len(body))
+        return response
+
+    return app
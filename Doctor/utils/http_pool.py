@@ -0,0 +1,165 @@
+import os
+import threading
+import importlib.util
+from typing import Dict, Any, Optional
+
+from utils.metrics import metrics
+
+GROQ_BASE_URL = os.getenv("GROQ_BASE_URL", "https://api.groq.com")
+
+
+def _pool_settings() -> Dict[str, Any]:
+    return {
+        "max_connections": int(os.getenv("LLM_POOL_MAX_CONNECTIONS", 20)),
+        "max_keepalive_connections": int(os.getenv("LLM_POOL_MAX_KEEPALIVE", 10)),
+        "keepalive_expiry": float(os.getenv("LLM_POOL_KEEPALIVE_EXPIRY", 120)),
+        "connect_timeout": float(os.getenv("LLM_CONNECT_TIMEOUT", 5)),
+        "read_timeout": float(os.getenv("LLM_READ_TIMEOUT", 60)),
+        "pool_timeout": float(os.getenv("LLM_POOL_TIMEOUT", 10)),
+        # HTTP/2 needs the optional h2 package; fall back to HTTP/1.1 keep-alive
+        "http2": (
+            os.getenv("LLM_HTTP2", "true").lower() == "true"
+            and importlib.util.find_spec("h2") is not None
+        ),
+    }
+
+
+def _trace(event_name: str, info: dict):
+    # httpcore reports connection lifecycle events through the "trace" extension
+    if event_name == "connection.connect_tcp.complete":
+        metrics.increment("llm_http_connections_opened")
+    elif event_name == "connection.start_tls.complete":
+        metrics.increment("llm_http_tls_handshakes")
+    elif event_name == "connection.close.complete":
+        metrics.increment("llm_http_connections_closed")
+
+
+class _InFlight:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+
+    def __enter__(self):
+        with self._lock:
+            self.count += 1
+        metrics.increment("llm_http_requests")
+
+    def __exit__(self, *exc):
+        with self._lock:
+            self.count -= 1
+
+
+_client = None
+_client_pid = None
+_async_client = None
+_async_client_pid = None
+_in_flight = _InFlight()
+_lock = threading.Lock()
+
+
+def _limits_and_timeout(httpx, settings):
+    limits = httpx.Limits(
+        max_connections=settings["max_connections"],
+        max_keepalive_connections=settings["max_keepalive_connections"],
+        keepalive_expiry=settings["keepalive_expiry"],
+    )
+    timeout = httpx.Timeout(
+        settings["read_timeout"],
+        connect=settings["connect_timeout"],
+        pool=settings["pool_timeout"],
+    )
+    return limits, timeout
+
+
+def _build_client():
+    import httpx
+
+    class CountingTransport(httpx.HTTPTransport):
+        def handle_request(self, request):
+            request.extensions["trace"] = _trace
+            with _in_flight:
+                return super().handle_request(request)
+
+    settings = _pool_settings()
+    limits, timeout = _limits_and_timeout(httpx, settings)
+    return httpx.Client(transport=CountingTransport(http2=settings["http2"], limits=limits), timeout=timeout)
+
+
+def _build_async_client():
+    import httpx
+
+    async def _async_trace(event_name: str, info: dict):
+        _trace(event_name, info)
+
+    class CountingAsyncTransport(httpx.AsyncHTTPTransport):
+        async def handle_async_request(self, request):
+            request.extensions["trace"] = _async_trace
+            with _in_flight:
+                return await super().handle_async_request(request)
+
+    settings = _pool_settings()
+    limits, timeout = _limits_and_timeout(httpx, settings)
+    return httpx.AsyncClient(transport=CountingAsyncTransport(http2=settings["http2"], limits=limits), timeout=timeout)
+
+
+def get_http_client():
+    """Return the pooled HTTP client shared by all LLM traffic in this process.
+
+    Keyed by PID so a forked worker never inherits its parent's sockets.
+    """
+    global _client, _client_pid
+    with _lock:
+        if _client is None or _client_pid != os.getpid():
+            _client = _build_client()
+            _client_pid = os.getpid()
+        return _client
+
+
+def get_async_http_client():
+    """Return the pooled async HTTP client shared by streaming and async LLM calls in this process.
+
+    Its connections belong to the event loop that first uses them, so async
+    LLM traffic in a process must run on one loop (the CLI's BackgroundLoop).
+    """
+    global _async_client, _async_client_pid
+    with _lock:
+        if _async_client is None or _async_client_pid != os.getpid():
+            _async_client = _build_async_client()
+            _async_client_pid = os.getpid()
+        return _async_client
+
+
+def warm_connection(api_key: str, timeout: Optional[float] = None):
+    """Open a pooled connection to the provider without spending tokens; timeout overrides the pool's"""
+    options = {} if timeout is None else {"timeout": timeout}
+    response = get_http_client().get(
+        f"{GROQ_BASE_URL}/openai/v1/models",
+        headers={"Authorization": f"Bearer {api_key}"},
+        **options,
+    )
+    response.raise_for_status()
+
+
+def pool_stats() -> Dict[str, Any]:
+    """Current pool utilization for this process"""
+    settings = _pool_settings()
+    stats = {
+        "max_connections": settings["max_connections"],
+        "http2": settings["http2"],
+        "in_flight_requests": _in_flight.count,
+        "open_connections": 0,
+        "idle_connections": 0,
+        "utilization": 0.0,
+    }
+    if _client is None or _client_pid != os.getpid():
+        return stats
+
+    # httpcore exposes the pool's connections; guard in case internals change
+    try:
+        connections = _client._transport._pool.connections
+        stats["open_connections"] = len(connections)
+        stats["idle_connections"] = sum(1 for c in connections if c.is_idle())
+    except AttributeError:
+        pass
+    stats["utilization"] = stats["open_connections"] / settings["max_connections"]
+    return stats
@@ -0,0 +1,107 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from utils.metrics import metrics
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+
+
+class IdempotencyConflict(Exception):
+    """The key was already used for a different request"""
+
+
+class _Entry:
+    __slots__ = ("fingerprint", "done", "result")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.done = threading.Event()
+        self.result = None
+
+
+class IdempotencyCache:
+    """Bounded map from Idempotency-Key to the result its request produced.
+
+    The first request with a key runs; a duplicate that arrives while it is
+    running waits for it, and one that arrives later gets the stored result
+    without running again. Results the caller marks as retryable (e.g. server
+    errors) are not kept, so a retry after them runs afresh. The oldest keys
+    are forgotten beyond max_entries.
+    """
+
+    def __init__(self, max_entries: int, name: str = "idempotency"):
+        self.max_entries = max_entries
+        self.name = name
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, _Entry]" = OrderedDict()
+
+    def run(self, key: str, fingerprint: str, fn: Callable[[], Any],
+            retryable: Callable[[Any], bool] = lambda result: False, timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        """(result, replayed) for the request identified by key.
+
+        Raises IdempotencyConflict if the key was used with another
+        fingerprint, and TimeoutError if a duplicate gives up waiting.
+        """
+        while True:
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is None:
+                    entry = self._entries[key] = _Entry(fingerprint)
+                    if len(self._entries) > self.max_entries:
+                        self._entries.popitem(last=False)
+                    break
+                if entry.fingerprint != fingerprint:
+                    metrics.increment(f"{self.name}_conflicts")
+                    raise IdempotencyConflict(f"{IDEMPOTENCY_HEADER} {key} was used for a different request")
+
+            if entry.done.is_set():
+                metrics.increment(f"{self.name}_replayed")
+                return entry.result, True
+            metrics.increment(f"{self.name}_waited")
+            if not entry.done.wait(timeout):
+                raise TimeoutError(f"Gave up waiting for the original request with {IDEMPOTENCY_HEADER} {key}")
+            # A retryable original was dropped; loop to run it again ourselves
+            if entry.result is not None:
+                metrics.increment(f"{self.name}_replayed")
+                return entry.result, True
+
+        result = None
+        try:
+            result = fn()
+            return result, False
+        finally:
+            with self._lock:
+                if result is None or retryable(result):
+                    # Failed or worth retrying: forget the key so a retry runs again
+                    if self._entries.get(key) is entry:
+                        del self._entries[key]
+                else:
+                    entry.result = result
+            entry.done.set()
+
+    def completed(self) -> Dict[str, Tuple[str, Any]]:
+        """(fingerprint, result) of every finished request by key, oldest first, e.g. for a session snapshot"""
+        with self._lock:
+            return {
+                key: (entry.fingerprint, entry.result)
+                for key, entry in self._entries.items()
+                if entry.done.is_set() and entry.result is not None
+            }
+
+    def seed(self, key: str, fingerprint: str, result):
+        """Add a finished request's result, e.g. from a snapshot; a key already known is left as it is"""
+        with self._lock:
+            if key in self._entries:
+                return
+            entry = self._entries[key] = _Entry(fingerprint)
+            entry.result = result
+            entry.done.set()
+            if len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+
+def request_fingerprint(path: str, body: bytes) -> str:
+    """Identity of a request for conflict checks: its endpoint and exact body"""
+    return hashlib.sha256(path.encode("utf-8") + b"\0" + body).hexdigest()
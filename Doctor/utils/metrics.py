@@ -0,0 +1,78 @@
+import threading
+from collections import defaultdict, deque
+from typing import Dict, Any
+
+
+class Metrics:
+    """Thread-safe in-process counters, gauges and timings for the server"""
+
+    def __init__(self, timing_window: int = 1024):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, int] = defaultdict(int)
+        self.gauges: Dict[str, float] = {}
+        self.timing_window = timing_window
+        self.timings: Dict[str, Dict[str, Any]] = {}
+
+    def increment(self, name: str, value: int = 1):
+        """Increase a counter"""
+        with self._lock:
+            self.counters[name] += value
+
+    def set_gauge(self, name: str, value: float):
+        """Record the current value of a gauge"""
+        with self._lock:
+            self.gauges[name] = value
+
+    def observe(self, name: str, seconds: float):
+        """Record one duration sample for a timing"""
+        with self._lock:
+            timing = self.timings.get(name)
+            if timing is None:
+                timing = {
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "recent": deque(maxlen=self.timing_window),
+                }
+                self.timings[name] = timing
+            timing["count"] += 1
+            timing["total"] += seconds
+            timing["max"] = max(timing["max"], seconds)
+            timing["recent"].append(seconds)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return a JSON-serializable copy of all metrics"""
+        with self._lock:
+            timings = {}
+            for name, timing in self.timings.items():
+                recent = sorted(timing["recent"])
+                timings[name] = {
+                    "count": timing["count"],
+                    "avg": timing["total"] / timing["count"],
+                    "max": timing["max"],
+                    "p50": _percentile(recent, 0.50),
+                    "p95": _percentile(recent, 0.95),
+                }
+            return {
+                "counters": dict(self.counters),
+                "gauges": dict(self.gauges),
+                "timings": timings,
+            }
+
+    def reset(self):
+        """Clear all recorded metrics"""
+        with self._lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.timings.clear()
+
+
+def _percentile(sorted_samples: list, fraction: float) -> float:
+    if not sorted_samples:
+        return 0.0
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+# Shared by every session and agent in this worker process
+metrics = Metrics()
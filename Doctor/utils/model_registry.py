@@ -0,0 +1,137 @@
+import os
+import json
+from typing import Dict, Optional
+
+# Models available to the agents. Costs are USD per million tokens (Groq list
+# prices at the time of writing) and are only used for reporting.
+MODELS: Dict[str, dict] = {
+    "large": {
+        "model_name": "openai/gpt-oss-120b",
+        "input_cost_per_million": 0.15,
+        "output_cost_per_million": 0.75,
+    },
+    "fast": {
+        "model_name": "openai/gpt-oss-20b",
+        "input_cost_per_million": 0.10,
+        "output_cost_per_million": 0.50,
+    },
+    "instant": {
+        "model_name": "llama-3.1-8b-instant",
+        "input_cost_per_million": 0.05,
+        "output_cost_per_million": 0.08,
+    },
+}
+
+# Consultation stages an agent can ask a model for
+STAGES = ("history_taking", "triage", "specialist", "summary", "fast_consult")
+
+# Routing profiles map "<agent>.<stage>", "<stage>", "<agent>" or "default" to a
+# model key. The most specific entry wins.
+ROUTING_PROFILES: Dict[str, Dict[str, str]] = {
+    "single": {
+        "default": "large",
+    },
+    "fast_history": {
+        "default": "large",
+        "history_taking": "fast",
+    },
+    "fast_history_triage": {
+        "default": "large",
+        "history_taking": "fast",
+        "triage": "fast",
+    },
+    "instant_history": {
+        "default": "large",
+        "history_taking": "instant",
+    },
+}
+
+DEFAULT_PROFILE = "single"
+DEFAULT_MODEL = "large"
+
+# Generation caps per stage, resolved like the routing table. gpt-oss models
+# spend part of this budget on reasoning, so the history-taking cap leaves room
+# for the triage assessment and a referral tool call as well as a single
+# follow-up question.
+MAX_TOKENS: Dict[str, int] = {
+    "default": 1000,
+    "history_taking": 640,
+    "triage": 800,
+    "specialist": 1500,
+    "summary": 700,
+    # Clinical summary, assessment and patient summary in one structured reply
+    "fast_consult": 2200,
+}
+
+
+def load_routing(profile: Optional[str] = None) -> Dict[str, str]:
+    """Build the routing table from a profile name plus MODEL_ROUTING_OVERRIDES.
+
+    The profile defaults to the MODEL_ROUTING environment variable. Overrides
+    are a JSON object such as {"neurologist.specialist": "large"}.
+    """
+    profile = profile or os.getenv("MODEL_ROUTING", DEFAULT_PROFILE)
+    if profile not in ROUTING_PROFILES:
+        raise ValueError(
+            f"Unknown model routing profile '{profile}'. "
+            f"Available: {', '.join(ROUTING_PROFILES)}"
+        )
+
+    routing = dict(ROUTING_PROFILES[profile])
+    overrides = os.getenv("MODEL_ROUTING_OVERRIDES")
+    if overrides:
+        routing.update(json.loads(overrides))
+
+    unknown = [key for key in routing.values() if key not in MODELS]
+    if unknown:
+        raise ValueError(f"Unknown model(s) in routing: {', '.join(unknown)}")
+    return routing
+
+
+def load_max_tokens(uniform: Optional[int] = None) -> Dict[str, int]:
+    """Build the per-stage max_tokens table, applying STAGE_MAX_TOKENS overrides.
+
+    Passing ``uniform`` returns a single cap for every stage.
+    """
+    if uniform is not None:
+        return {"default": uniform}
+
+    limits = dict(MAX_TOKENS)
+    overrides = os.getenv("STAGE_MAX_TOKENS")
+    if overrides:
+        limits.update({key: int(value) for key, value in json.loads(overrides).items()})
+    return limits
+
+
+def _lookup(table: dict, stage: str, agent: Optional[str], fallback):
+    candidates = []
+    if agent:
+        candidates.append(f"{agent}.{stage}")
+    candidates.append(stage)
+    if agent:
+        candidates.append(agent)
+    candidates.append("default")
+
+    for candidate in candidates:
+        if candidate in table:
+            return table[candidate]
+    return fallback
+
+
+def resolve_model(routing: Dict[str, str], stage: str, agent: Optional[str] = None) -> str:
+    """Return the model key assigned to an agent at a given stage"""
+    return _lookup(routing, stage, agent, DEFAULT_MODEL)
+
+
+def resolve_max_tokens(limits: Dict[str, int], stage: str, agent: Optional[str] = None) -> int:
+    """Return the generation cap for an agent at a given stage"""
+    return _lookup(limits, stage, agent, MAX_TOKENS["default"])
+
+
+def estimate_cost(model_key: str, input_tokens: int, output_tokens: int) -> float:
+    """Estimate the USD cost of a completion"""
+    model = MODELS[model_key]
+    return (
+        input_tokens * model["input_cost_per_million"]
+        + output_tokens * model["output_cost_per_million"]
+    ) / 1_000_000
@@ -0,0 +1,81 @@
+"""Local red-flag scorer that assigns a scheduling priority to a consultation.
+
+Runs in microseconds with no LLM call, so it can order requests before they
+are admitted. Each category adds up weighted cue patterns over everything the
+patient has said so far, so cues spread across several answers still add up
+and a session never drops to a lower priority. A cue preceded in its clause
+by a negation ("no chest pain", "I don't have a rash") does not count.
+"""
+import re
+from typing import Dict, Iterable
+
+# Scheduling classes, served in this order when requests have to queue
+PRIORITIES = ("urgent", "elevated", "routine")
+URGENT_SCORE = 3
+ELEVATED_SCORE = 1
+
+# category -> [(weight, pattern)]
+RED_FLAGS = {
+    "chest_pain": [
+        (2, r"chest (?:pain|pressure|tightness|discomfort)|(?:pain|pressure|tightness) in (?:my|the) chest"),
+        (2, r"crushing|squeezing|elephant"),
+        (1, r"(?:spread\w*|radiat\w*|goes|going|moves) (?:down |up |in)?(?:to |into )?(?:my |the )?(?:left arm|jaw|neck)"),
+        (1, r"sweat\w*|clammy|short(?:ness)? of breath|can'?t catch my breath"),
+    ],
+    "stroke": [
+        (3, r"face (?:is )?(?:droop\w*|drooping|numb)|droop\w* (?:face|mouth)|one side of (?:my|his|her) face"),
+        (3, r"slurr\w* (?:speech|words)|speech (?:is )?slurr\w*|can'?t (?:speak|talk|get (?:my|the) words out)|words (?:come|came) out wrong"),
+        (2, r"(?:sudden\w*|can'?t (?:lift|move))\b.*\b(?:arm|leg|weak\w*|numb\w*)|weak\w* on one side|numb\w* on one side"),
+        (2, r"worst headache|thunderclap|sudden\w* (?:vision loss|blind\w*|double vision)"),
+    ],
+    "anaphylaxis": [
+        (3, r"throat (?:is )?(?:closing|tight\w*|swell\w*)|swell\w* (?:of )?(?:my |the )?(?:throat|tongue|lips)"
+            r"|(?:tongue|lips) (?:are |is )?swell\w*"),
+        (2, r"can'?t breathe|trouble breathing|hard to breathe|wheez\w*"),
+        (1, r"hives|allergic reaction|bee sting|stung|peanut|epipen"),
+    ],
+    "dka": [
+        (2, r"fruity (?:breath|smell)|ketones?|blood sugar (?:is )?(?:over|above|very high|\d{3})"),
+        (1, r"diabet\w*|type 1"),
+        (1, r"(?:very|extremely|always) thirsty|peeing (?:a lot|constantly)|urinat\w* (?:a lot|constantly)"),
+        (1, r"vomit\w*|throwing up|confus\w*|drowsy|deep (?:fast )?breathing"),
+    ],
+}
+
+_NEGATION = re.compile(r"\b(?:no|not|never|without|denies|deny|don'?t|doesn'?t|didn'?t|haven'?t|hasn'?t)\b[^.,;!?]*$")
+_COMPILED = {
+    category: [(weight, re.compile(pattern, re.IGNORECASE)) for weight, pattern in cues]
+    for category, cues in RED_FLAGS.items()
+}
+
+
+def score_red_flags(statements: Iterable[str]) -> Dict[str, int]:
+    """Score per category for the cues found in the patient's statements (categories with no cues are left out)"""
+    # Each statement ends its own clause, so a negation never reaches into the next one
+    text = ". ".join(statement for statement in statements if statement)
+    scores = {}
+    for category, cues in _COMPILED.items():
+        score = sum(weight for weight, pattern in cues if _affirmed(pattern, text))
+        if score:
+            scores[category] = score
+    return scores
+
+
+def _affirmed(pattern: re.Pattern, text: str) -> bool:
+    return any(not negated(text, match.start()) for match in pattern.finditer(text))
+
+
+def negated(text: str, position: int) -> bool:
+    """Whether a negation earlier in the same clause applies to the text at `position`"""
+    # A clause is short, so only the text just before the cue can negate it
+    return bool(_NEGATION.search(text[max(0, position - 120):position].lower()))
+
+
+def triage_priority(statements: Iterable[str]) -> str:
+    """Scheduling class for a consultation from its red-flag scores"""
+    top = max(score_red_flags(statements).values(), default=0)
+    if top >= URGENT_SCORE:
+        return "urgent"
+    if top >= ELEVATED_SCORE:
+        return "elevated"
+    return "routine"
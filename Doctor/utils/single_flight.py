@@ -0,0 +1,74 @@
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple, Type
+
+from utils.metrics import metrics
+
+
+class LeaderAbandoned(Exception):
+    """The call a waiter joined failed for a reason that was only the leader's own"""
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution.
+
+    The first caller for a key runs the function; callers that arrive while it
+    is still running wait for it and receive the same result (or exception).
+    Nothing is cached once the call finishes. A waiter may give up after
+    `timeout` seconds; the leader keeps running for the others. Errors of the
+    `leader_only` types belong to the leader's caller rather than to the call
+    (its deadline, its hang-up), so waiters get LeaderAbandoned instead and
+    may run the call themselves.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None,
+           leader_only: Tuple[Type[BaseException], ...] = ()) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = _Call()
+                self._calls[key] = call
+            else:
+                call.waiters += 1
+
+        if not leader:
+            metrics.increment(f"{self.name}_coalesced")
+            if not call.done.wait(timeout):
+                metrics.increment(f"{self.name}_wait_timeouts")
+                raise TimeoutError(f"Gave up waiting on a shared call after {timeout:.1f}s")
+            if isinstance(call.error, leader_only):
+                metrics.increment(f"{self.name}_leader_abandoned")
+                raise LeaderAbandoned(str(call.error)) from call.error
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        metrics.increment(f"{self.name}_executed")
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Number of distinct keys currently executing"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,220 @@
+import os
+import json
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Iterator, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows: appends are only serialized within this process
+    fcntl = None
+
+SEGMENT_PREFIX = "conversations-"
+SEGMENT_SUFFIX = ".jsonl"
+SEGMENT_TIME_FORMAT = "%Y%m%d_%H%M%S_%f"
+INDEX_FILE = "index.tsv"
+LOCK_FILE = ".lock"
+
+
+class TranscriptLog:
+    """Append-only conversation log split into rotated JSONL segments.
+
+    Each saved session is one line in the newest segment, and a tab-separated
+    index maps the session id to (segment, byte offset, length). Only the
+    newest segment's entries are held in memory, so fetching a recent
+    transcript is one dict lookup and one seek, while memory stays bounded by
+    the segment size however large the logs grow; older sessions are looked up
+    in the index file. Worker processes can share a directory: appends take a
+    file lock, and each process picks up the others' index entries by reading
+    the tail of the index. If a session is saved more than once the latest
+    record wins.
+    """
+
+    def __init__(self, directory: str, max_segment_bytes: int = 64 * 2**20,
+                 max_segment_age: float = 24 * 3600, max_segments: Optional[int] = None):
+        self.directory = directory
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.max_segments = max_segments
+        os.makedirs(directory, exist_ok=True)
+        self._index_path = os.path.join(directory, INDEX_FILE)
+        # session id -> (segment, offset, length), for _index_segment only
+        self._index: Dict[str, Tuple[str, int, int]] = {}
+        self._index_segment = None
+        self._index_offset = 0
+        self._index_inode = None
+        self._lock = threading.Lock()
+
+    def append(self, session: dict):
+        """Write one session record and index it under its session id"""
+        session_id = session["session_id"]
+        if not session_id or "\t" in session_id or "\n" in session_id:
+            raise ValueError(f"Invalid session id: {session_id!r}")
+        line = (json.dumps(session, ensure_ascii=False) + "\n").encode("utf-8")
+
+        with self._lock, self._file_lock():
+            segment = self._current_segment(len(line))
+            with open(os.path.join(self.directory, segment), "ab") as f:
+                # Append mode starts at the end of the file, and the lock keeps it there
+                offset = f.tell()
+                f.write(line)
+            with open(self._index_path, "a", encoding="utf-8") as f:
+                f.write(f"{session_id}\t{segment}\t{offset}\t{len(line)}\n")
+            self._remember(session_id, segment, offset, len(line))
+
+    def get(self, session_id: str) -> Optional[dict]:
+        """Read one session's record, or None if it was never logged"""
+        with self._lock:
+            self._refresh_index()
+            location = self._index.get(session_id)
+        if location is None:
+            location = self._find_in_index_file(session_id)
+        if location is None:
+            return None
+        segment, offset, length = location
+        try:
+            with open(os.path.join(self.directory, segment), "rb") as f:
+                f.seek(offset)
+                return json.loads(f.read(length))
+        except (FileNotFoundError, ValueError):
+            # The segment was pruned by retention
+            return None
+
+    def iter_sessions(self) -> Iterator[dict]:
+        """Yield every logged session record, oldest segment first"""
+        for segment in self._segments():
+            with open(os.path.join(self.directory, segment), "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        yield json.loads(line)
+
+    def __len__(self) -> int:
+        """Number of distinct sessions logged; reads the whole index file"""
+        session_ids = set()
+        for line in self._index_lines():
+            session_ids.add(line.split("\t", 1)[0])
+        return len(session_ids)
+
+    @contextmanager
+    def _file_lock(self):
+        if fcntl is None:
+            yield
+            return
+        with open(os.path.join(self.directory, LOCK_FILE), "a") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(f, fcntl.LOCK_UN)
+
+    def _segments(self):
+        return sorted(
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        )
+
+    def _current_segment(self, incoming: int) -> str:
+        """Newest segment, or a new one once it is too large or too old"""
+        segments = self._segments()
+        if segments:
+            newest = segments[-1]
+            size = os.path.getsize(os.path.join(self.directory, newest))
+            started = datetime.strptime(newest[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)], SEGMENT_TIME_FORMAT)
+            age = (datetime.now() - started).total_seconds()
+            if (size == 0 or size + incoming <= self.max_segment_bytes) and age <= self.max_segment_age:
+                return newest
+
+        if self.max_segments and len(segments) >= self.max_segments:
+            self._prune(segments[:len(segments) - self.max_segments + 1])
+        return f"{SEGMENT_PREFIX}{datetime.now().strftime(SEGMENT_TIME_FORMAT)}{SEGMENT_SUFFIX}"
+
+    def _prune(self, expired):
+        """Delete the oldest segments and rewrite the index without them"""
+        expired = set(expired)
+        for segment in expired:
+            os.unlink(os.path.join(self.directory, segment))
+        if not os.path.exists(self._index_path):
+            return
+
+        tmp_path = self._index_path + ".tmp"
+        with open(self._index_path, "r", encoding="utf-8") as src, open(tmp_path, "w", encoding="utf-8") as dst:
+            for line in src:
+                if line.endswith("\n") and line.split("\t", 2)[1] not in expired:
+                    dst.write(line)
+        # Other processes notice the new inode and reload the index
+        os.replace(tmp_path, self._index_path)
+        self._index_inode = None
+
+    def _refresh_index(self):
+        """Read index entries appended since the last refresh"""
+        try:
+            stat = os.stat(self._index_path)
+        except FileNotFoundError:
+            self._index, self._index_offset, self._index_inode = {}, 0, None
+            self._index_segment = None
+            return
+        if stat.st_ino != self._index_inode:
+            self._index, self._index_offset, self._index_inode = {}, 0, stat.st_ino
+            self._index_segment = None
+        if stat.st_size <= self._index_offset:
+            return
+
+        with open(self._index_path, "rb") as f:
+            f.seek(self._index_offset)
+            data = f.read(stat.st_size - self._index_offset)
+        # Stop before a line another process is still writing
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("utf-8").splitlines():
+            session_id, segment, offset, length = line.split("\t")
+            self._remember(session_id, segment, int(offset), int(length))
+        self._index_offset += end
+
+    def _remember(self, session_id: str, segment: str, offset: int, length: int):
+        """Keep an index entry in memory, forgetting those of the segment it rotated out"""
+        if segment != self._index_segment:
+            # Segments only ever advance: entries of the previous one are left to the index file
+            if self._index_segment is not None and segment < self._index_segment:
+                return
+            self._index, self._index_segment = {}, segment
+        self._index[session_id] = (segment, offset, length)
+
+    def _find_in_index_file(self, session_id: str) -> Optional[Tuple[str, int, int]]:
+        """Latest location of a session from the index file, for sessions in older segments"""
+        prefix = f"{session_id}\t"
+        location = None
+        for line in self._index_lines():
+            if line.startswith(prefix):
+                _, segment, offset, length = line.split("\t")
+                location = (segment, int(offset), int(length))
+        return location
+
+    def _index_lines(self) -> Iterator[str]:
+        """Complete lines of the index file, without their newline"""
+        try:
+            with open(self._index_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    if line.endswith("\n"):
+                        yield line[:-1]
+        except FileNotFoundError:
+            return
+
+
+_log = None
+_log_pid = None
+_log_lock = threading.Lock()
+
+
+def get_transcript_log() -> TranscriptLog:
+    """The process-wide transcript log, configured from the environment"""
+    global _log, _log_pid
+    with _log_lock:
+        if _log is None or _log_pid != os.getpid():
+            _log = TranscriptLog(
+                os.getenv("CONVERSATION_LOG_DIR", "conversation_logs"),
+                max_segment_bytes=int(float(os.getenv("CONVERSATION_LOG_MAX_MB", 64)) * 2**20),
+                max_segment_age=float(os.getenv("CONVERSATION_LOG_ROTATE_HOURS", 24)) * 3600,
+                max_segments=int(os.getenv("CONVERSATION_LOG_MAX_SEGMENTS", 0)) or None,
+            )
+            _log_pid = os.getpid()
+        return _log
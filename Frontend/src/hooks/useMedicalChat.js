@@ -1,6 +1,12 @@
 import { useState, useCallback } from 'react'
 import { apiService } from '../services/apiService'
 
+// After an emergency reply the consultation's own reply is still being prepared; poll for it
+const PENDING_POLL_MS = 2000
+const PENDING_POLL_LIMIT = 90
+
+const sleep = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
 export const useMedicalChat = (selectedLanguage, translate) => {
   const [messages, setMessages] = useState([])
   const [isLoading, setIsLoading] = useState(false)
@@ -16,6 +22,33 @@ export const useMedicalChat = (selectedLanguage, translate) => {
     }])
   }, [])
 
+  const doctorMessage = useCallback((response) => ({
+    text: response.doctor_response,
+    sender: 'doctor',
+    doctorName: response.specialist_name || response.doctor_name || 'AI Doctor',
+    medications: response.medications,
+    recommendations: response.recommendations,
+    isSpecialist: response.is_specialist || false
+  }), [])
+
+  const awaitPendingReply = useCallback(async (pendingSessionId) => {
+    for (let attempt = 0; attempt < PENDING_POLL_LIMIT; attempt++) {
+      await sleep(PENDING_POLL_MS)
+      try {
+        const status = await apiService.getSessionStatus(pendingSessionId)
+        if (!status.consultation_pending) {
+          if (status.pending_response) {
+            setConsultationStage(status.pending_response.consultation_stage)
+            addMessage(doctorMessage(status.pending_response))
+          }
+          return
+        }
+      } catch (error) {
+        console.error('Error fetching pending reply:', error)
+      }
+    }
+  }, [addMessage, doctorMessage])
+
   const startNewConsultation = useCallback(async (message) => {
     setIsLoading(true)
     setQuestionCount(1) // First question
@@ -32,14 +65,10 @@ export const useMedicalChat = (selectedLanguage, translate) => {
         setSessionId(response.session_id)
         setConsultationStage(response.consultation_stage)
         
-        addMessage({
-          text: response.doctor_response,
-          sender: 'doctor',
-          doctorName: response.doctor_name,
-          medications: response.medications,
-          recommendations: response.recommendations,
-          isSpecialist: response.is_specialist || false
-        })
+        addMessage(doctorMessage(response))
+        if (response.consultation_pending) {
+          awaitPendingReply(response.session_id)
+        }
       } else {
         addMessage({
           text: translate('Sorry, there was an error starting the consultation. Please try again.', selectedLanguage),
@@ -57,7 +86,7 @@ export const useMedicalChat = (selectedLanguage, translate) => {
     } finally {
       setIsLoading(false)
     }
-  }, [addMessage, selectedLanguage, translate])
+  }, [addMessage, doctorMessage, awaitPendingReply, selectedLanguage, translate])
 
   const sendMessage = useCallback(async (message) => {
     if (!sessionId) return
@@ -77,14 +106,10 @@ export const useMedicalChat = (selectedLanguage, translate) => {
       if (response.success) {
         setConsultationStage(response.consultation_stage)
         
-        addMessage({
-          text: response.doctor_response,
-          sender: 'doctor',
-          doctorName: response.specialist_name || response.doctor_name || 'AI Doctor',
-          medications: response.medications,
-          recommendations: response.recommendations,
-          isSpecialist: response.is_specialist || false
-        })
+        addMessage(doctorMessage(response))
+        if (response.consultation_pending) {
+          awaitPendingReply(sessionId)
+        }
 
         // Show specialist option after 5 questions
         if (newQuestionCount >= 5 && !showSpecialistOption) {
@@ -107,7 +132,7 @@ export const useMedicalChat = (selectedLanguage, translate) => {
     } finally {
       setIsLoading(false)
     }
-  }, [sessionId, addMessage, selectedLanguage, translate, questionCount, showSpecialistOption])
+  }, [sessionId, addMessage, doctorMessage, awaitPendingReply, selectedLanguage, translate, questionCount, showSpecialistOption])
 
   const connectToSpecialist = useCallback(async (specialistData) => {
     try {